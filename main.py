@@ -1,3 +1,5 @@
+import argparse
+import logging
 import sys
 import os
 
@@ -8,12 +10,70 @@ import os
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
-from melody_generator.gui.app import start_app
+from melody_generator.core.profiles import DEFAULT_PROFILE_NAME, ProfileError, default_store
+from melody_generator.core.log_events import json_lines_handler
+
+def self_check(store, iterations=200):
+    """
+    変換操作の不変条件のファジングと、各プロファイルでの（全小節を検査する）生成を行います。
+
+    Returns:
+        bool: すべての検査に合格したかどうか。
+    """
+    from melody_generator.core.generator import MelodyGenerator
+    from melody_generator.core.invariants import InvariantError, fuzz_transforms
+
+    passed = True
+    try:
+        fuzz_transforms(iterations, seed=0)
+        print(f"変換操作のファジング: OK ({iterations}回)")
+    except InvariantError as e:
+        print(f"変換操作のファジング: NG: {e}")
+        passed = False
+    for name in store.names():
+        try:
+            for seed in range(10):
+                MelodyGenerator(store.get(name).config(seed=seed), invariant_check_rate=1.0).generate()
+            print(f"プロファイル '{name}' の生成: OK")
+        except (InvariantError, ProfileError) as e:
+            print(f"プロファイル '{name}' の生成: NG: {e}")
+            passed = False
+    return passed
 
 def main():
     """GUIアプリケーションを起動する。"""
+    parser = argparse.ArgumentParser(description="メロディー生成ツール")
+    parser.add_argument('--profile', default=DEFAULT_PROFILE_NAME,
+                        help=f"起動時に読み込む設定プロファイル名（既定: {DEFAULT_PROFILE_NAME}）")
+    parser.add_argument('--list-profiles', action='store_true', help="利用可能なプロファイルを表示して終了する")
+    parser.add_argument('--log-json', metavar='PATH',
+                        help="生成のログを JSON Lines 形式で PATH に追記する（1行1イベント）")
+    parser.add_argument('--self-check', nargs='?', type=int, const=200, metavar='N',
+                        help="変換操作の不変条件をN回ファジングし、各プロファイルで検査付きの生成を行って終了する")
+    args = parser.parse_args()
+
+    if args.log_json:
+        # GUI の生成ログ（MelodyGeneratorLogger）も含め、すべてのロガーの INFO 以上のイベントを書き出す
+        root = logging.getLogger()
+        root.addHandler(json_lines_handler(args.log_json))
+        root.setLevel(logging.INFO)
+
+    store = default_store()
+    if args.list_profiles:
+        for name in store.names():
+            print(f"{name}\t{store.get(name).description}")
+        return
+    if args.self_check is not None:
+        sys.exit(0 if self_check(store, args.self_check) else 1)
+    try:
+        store.get(args.profile)
+    except ProfileError as e:
+        parser.error(str(e))
+
+    # tkinter の読み込みは、GUIを起動するときだけ行う
+    from melody_generator.gui.app import start_app
     print("GUIアプリケーションを起動します...")
-    start_app()
+    start_app(args.profile)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,47 +1,47 @@
-from .core import accompaniment
+"""
+既定の設定値。
+
+値は既定のプロファイル（melody_generator/profiles/default.toml）から読み込みます。
+設定を変更・切り替える場合は、このファイルではなくプロファイルを編集するか、
+core/profiles.py の get_profile() で別のプロファイルを選んでください。
+ここにある定数は、プロファイル導入前のコードとの互換のために残しています。
+"""
+from .core.profiles import DEFAULT_PROFILE_NAME, get_profile
+
+_profile = get_profile(DEFAULT_PROFILE_NAME)
 
 # --- メロディー生成に関する設定 ---
 
-# 1拍あたりのTick数。分解能を表します。480が一般的です。
-TICKS_PER_BEAT = 480
+# 1拍あたりのTick数。分解能を表します。
+TICKS_PER_BEAT = _profile.settings['ticks_per_beat']
 
-# 1小節あたりの拍数
-BEATS_PER_MEASURE = 4
+# 1小節あたりの拍数（拍子の分子）
+BEATS_PER_MEASURE = _profile.settings['beats_per_measure']
+
+# 拍子の分母（4なら4分音符を1拍として数える）
+BEAT_UNIT = _profile.settings.get('beat_unit', 4)
 
 # 生成するキー
-INPUT_KEY = 'C_major'
+INPUT_KEY = _profile.settings['key']
 
 # 生成する小節数
-NUMBER_OF_MEASURES = 8
+NUMBER_OF_MEASURES = _profile.settings['num_measures']
 
 # --- モチーフとコード進行 ---
 
-# メロディーの元となるモチーフ
-# 形式: [(MIDIノート番号, 継続時間(ticks)), ...]
-# 例：ド（C4、四分音符）、レ（D4、八分音符）、ミ（E4、四分音符）
-INPUT_MOTIF = [
-    (76, 480),      # E5 (元の64 + 12)
-    (74, 240),      # D5 (元の62 + 12)
-    (72, 480+240),  # C5 (元の60 + 12)
-    (74, 480)       # D5 (元の62 + 12)
-]
-
-# 使用するコード進行 (8小節分)
-# ポップスでよく使われる「カノン進行」を少しアレンジしたものです
-INPUT_CHORD_PROGRESSION = [
-    'C', 'G', 'Am', 'Em',
-    'F', 'C', 'F',  'G'
-]
+# メロディーの元となるモチーフ。形式: [(MIDIノート番号, 継続時間(ticks)), ...]
+INPUT_MOTIF = [tuple(note) for note in _profile.settings['motif_notes']]
+
+# 使用するコード進行
+INPUT_CHORD_PROGRESSION = list(_profile.settings['chord_progression'])
 
 # --- 生成オプション ---
 
 # 伴奏コードをMIDIファイルに含めるか
-PLAY_CHORDS = True
+PLAY_CHORDS = _profile.settings.get('play_chords', True)
 
-# 使用する伴奏の生成スタイルを選択
-# 'random': 利用可能なスタイルからランダムに選択
-# 'block_chords', 'arpeggio_up', 'alberti_bass': 特定のスタイルを指定
-ACCOMPANIMENT_GENERATOR = 'random'
+# 使用する伴奏の生成スタイル（'random' または特定のスタイル名）
+ACCOMPANIMENT_GENERATOR = _profile.settings.get('accompaniment_generator', 'random')
 
 # --- 出力設定 ---
-OUTPUT_PATH = "C:\\Users\\masuda\\Desktop\\DTM\\strategy_random_output.mid"
\ No newline at end of file
+OUTPUT_PATH = _profile.output_path or 'melody_output.mid'
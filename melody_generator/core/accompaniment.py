@@ -1,20 +1,26 @@
-from .music_theory import CHORDS
+from .voice_leading import choose_voicings
+from .meter import get_meter
 
-def generate_block_chords(chord_name, ticks_per_measure, key, scale):
+def _resolve_meter(meter, ticks_per_measure):
+    """meter が省略された場合は、従来どおり 4/4 拍子として扱います。"""
+    return meter if meter is not None else get_meter(4, 4, ticks_per_measure // 4)
+
+def generate_block_chords(chord, ticks_per_measure, key, scale, meter=None):
     """
     指定されたコードを全音符（ベタ打ち）で演奏する音符データを生成します。
 
     Args:
-        chord_name (str): コード名 (例: 'C', 'Am')。
+        chord (Chord): 伴奏するコード。
         ticks_per_measure (int): 1小節のティック数。
         key (str): 曲のキー（この関数では未使用）。
         scale (list): 曲のスケール（この関数では未使用）。
+        meter (Meter, optional): 拍子。省略時は 4/4 拍子とみなします。
 
     Returns:
         list: 1小節分の音符データのリスト。
     """
     notes_data = []
-    chord_notes = CHORDS.get(chord_name)
+    chord_notes = chord.voicing
 
     if chord_notes:
         for pitch in chord_notes:
@@ -25,26 +31,26 @@ def generate_block_chords(chord_name, ticks_per_measure, key, scale):
             })
     return notes_data
 
-def generate_arpeggio_up(chord_name, ticks_per_measure, key, scale):
+def generate_arpeggio_up(chord, ticks_per_measure, key, scale, meter=None):
     """
-    指定されたコードで、シンプルな上昇アルペジオ（四分音符）を生成します。
-    パターン: ルート -> 3度 -> 5度 -> オクターブ上のルート
+    指定されたコードで、シンプルな上昇アルペジオ（各拍に1音）を生成します。
+    パターン: ルート -> 3度 -> 5度 -> オクターブ上のルート（拍数に合わせて先頭から使います）
 
     Args:
-        chord_name (str): コード名 (例: 'C', 'Am')。
+        chord (Chord): 伴奏するコード。
         ticks_per_measure (int): 1小節のティック数。
         key (str): 曲のキー（この関数では未使用）。
         scale (list): 曲のスケール（この関数では未使用）。
+        meter (Meter, optional): 拍子。省略時は 4/4 拍子とみなします。
 
     Returns:
         list: 1小節分の音符データのリスト。
     """
     notes_data = []
-    chord_notes = CHORDS.get(chord_name)
+    chord_notes = chord.voicing
 
     if chord_notes and len(chord_notes) >= 3:
-        # 4/4拍子を想定し、四分音符の長さを計算
-        ticks_per_beat = ticks_per_measure // 4
+        meter = _resolve_meter(meter, ticks_per_measure)
 
         # アルペジオのパターンを定義
         # ルート、3度、5度、オクターブ上のルート
@@ -55,34 +61,36 @@ def generate_arpeggio_up(chord_name, ticks_per_measure, key, scale):
             chord_notes[0]        # ルート (元の高さ)
         ]
 
-        for i, pitch in enumerate(pattern_pitches):
+        for i, (beat_start, beat_length) in enumerate(zip(meter.beat_starts, meter.beat_lengths)):
             notes_data.append({
-                'pitch': pitch,
-                'time': i * ticks_per_beat, # 各拍の頭から開始
-                'duration': ticks_per_beat
+                'pitch': pattern_pitches[i % len(pattern_pitches)],
+                'time': beat_start, # 各拍の頭から開始
+                'duration': beat_length
             })
     return notes_data
 
-def generate_alberti_bass(chord_name, ticks_per_measure, key, scale):
+def generate_alberti_bass(chord, ticks_per_measure, key, scale, meter=None):
     """
-    指定されたコードで、アルベルティ・バス（16分音符）を生成します。
+    指定されたコードで、アルベルティ・バス（単純拍子では16分音符、複合拍子では8分音符）を生成します。
     パターン: ルート -> 5度 -> 3度 -> 5度 を繰り返します。
 
     Args:
-        chord_name (str): コード名 (例: 'C', 'Am')。
+        chord (Chord): 伴奏するコード。
         ticks_per_measure (int): 1小節のティック数。
         key (str): 曲のキー（この関数では未使用）。
         scale (list): 曲のスケール（この関数では未使用）。
+        meter (Meter, optional): 拍子。省略時は 4/4 拍子とみなします。
 
     Returns:
         list: 1小節分の音符データのリスト。
     """
     notes_data = []
-    chord_notes = CHORDS.get(chord_name)
+    chord_notes = chord.voicing
 
     if chord_notes and len(chord_notes) >= 3:
-        # 4/4拍子を想定し、16分音符の長さを計算
-        ticks_per_16th = ticks_per_measure // 16
+        # 各拍を4分割（複合拍子では3分割）したグリッド
+        meter = _resolve_meter(meter, ticks_per_measure)
+        cells = meter.grid(3 if meter.is_compound else 4)
 
         # アルベルティ・バスのパターン (ルート, 5度, 3度, 5度)
         # 低い音域で演奏するため、1オクターブ下げる
@@ -93,13 +101,38 @@ def generate_alberti_bass(chord_name, ticks_per_measure, key, scale):
             chord_notes[2] - 12,  # 5度
         ]
 
-        # 1小節にパターンを4回繰り返す (16分音符 x 4 x 4 = 1小節)
-        for i in range(16):
+        # グリッドの各区間でパターンを繰り返す (4/4なら 16分音符 x 16 = 1小節)
+        for i, (cell_start, cell_length) in enumerate(cells):
             pitch = pattern_pitches[i % 4]
             notes_data.append({
                 'pitch': pitch,
-                'time': i * ticks_per_16th,
-                'duration': ticks_per_16th
+                'time': cell_start,
+                'duration': cell_length
+            })
+    return notes_data
+
+def generate_voice_leading(chords, ticks_per_measure, key, scale, meter=None):
+    """
+    コード進行全体を見て、声部の移動が最小になるボイシングを選び、各小節で全音符として演奏します。
+    ボイシングの選択は voice_leading.choose_voicings（動的計画法）に委ねます。
+
+    Args:
+        chords (List[Chord]): コード進行全体。
+        ticks_per_measure (int): 1小節のティック数。
+        key (str): 曲のキー（この関数では未使用）。
+        scale (list): 曲のスケール（この関数では未使用）。
+        meter (Meter, optional): 拍子。省略時は 4/4 拍子とみなします。
+
+    Returns:
+        list: コード進行全体分の音符データのリスト（時間は曲頭からの絶対時間）。
+    """
+    notes_data = []
+    for i, voicing in enumerate(choose_voicings(chords)):
+        for pitch in voicing:
+            notes_data.append({
+                'pitch': pitch,
+                'time': i * ticks_per_measure,
+                'duration': ticks_per_measure
             })
     return notes_data
 
@@ -113,5 +146,11 @@ ACCOMPANIMENT_MAP = {
     'alberti_bass': generate_alberti_bass,
 }
 
+# コード進行全体を一度に受け取って伴奏を生成するスタイル。
+# 小節をまたいだ判断（声部連結など）が必要なスタイルはこちらに登録します。
+PROGRESSION_ACCOMPANIMENT_MAP = {
+    'voice_leading': generate_voice_leading,
+}
+
 # ランダム選択のために、利用可能なスタイル名のリストも用意します。
-ACCOMPANIMENT_STYLES = list(ACCOMPANIMENT_MAP.keys())
\ No newline at end of file
+ACCOMPANIMENT_STYLES = list(ACCOMPANIMENT_MAP.keys()) + list(PROGRESSION_ACCOMPANIMENT_MAP.keys())
\ No newline at end of file
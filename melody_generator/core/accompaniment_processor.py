@@ -1,17 +1,22 @@
 import random
 import logging
-from typing import List
+from typing import List, Optional
 
 from .melody_config import MelodyConfig
-from .accompaniment import ACCOMPANIMENT_MAP, ACCOMPANIMENT_STYLES
+from .accompaniment import ACCOMPANIMENT_MAP, PROGRESSION_ACCOMPANIMENT_MAP, ACCOMPANIMENT_STYLES
+from .music_theory import resolve_progression
+from .log_events import log_event
 
 class AccompanimentProcessor:
     """伴奏生成の具体的な処理を担当するクラス。"""
 
     def __init__(self, logger=None):
         self.logger = logger or logging.getLogger(__name__)
+        # 直近の生成で使った伴奏スタイル（'random' の場合は実際に選ばれたもの。伴奏なしなら None）
+        self.selected_style = None
 
-    def process(self, config: MelodyConfig, scale: List[int], ticks_per_measure: int) -> List[dict]:
+    def process(self, config: MelodyConfig, scale: List[int], ticks_per_measure: int,
+                style: Optional[str] = None) -> List[dict]:
         """
         設定に基づき、伴奏データを生成します。
 
@@ -19,29 +24,39 @@ class AccompanimentProcessor:
             config (MelodyConfig): メロディー生成のための設定。
             scale (List[int]): 曲のスケール。
             ticks_per_measure (int): 1小節のTick数。
+            style (str, optional): 使う伴奏スタイル。指定すると設定の accompaniment_generator より優先し、
+                                   'random' の抽選も行いません（マニフェストからの再レンダリング用）。
 
         Returns:
             List[dict]: 生成された全伴奏データ。
         """
+        self.selected_style = None
         if not config.play_chords:
             return []
 
         self.logger.info("\n--- 伴奏を生成します ---")
-        selected_style_name = config.accompaniment_generator
+        selected_style_name = style or config.accompaniment_generator
         if selected_style_name == 'random':
             selected_style_name = random.choice(ACCOMPANIMENT_STYLES)
         actual_generator = ACCOMPANIMENT_MAP.get(selected_style_name)
+        progression_generator = PROGRESSION_ACCOMPANIMENT_MAP.get(selected_style_name)
 
-        if not actual_generator:
+        if not actual_generator and not progression_generator:
             raise ValueError(f"伴奏スタイル '{selected_style_name}' は定義されていません。")
 
-        self.logger.info(f"使用する伴奏スタイル: {selected_style_name}")
+        self.selected_style = selected_style_name
+        log_event(self.logger, 'accompaniment_style', "使用する伴奏スタイル: %(style)s", style=selected_style_name)
+
+        # コード進行を最初に Chord の列へ変換し、各小節の伴奏を生成して結合する
+        chords = resolve_progression(config.chord_progression)
+        if progression_generator:
+            # 進行全体を一度に扱うスタイルには、Chord の列をまとめて渡す
+            return progression_generator(chords, ticks_per_measure, config.key, scale, meter=config.meter)
 
-        # コード進行をループし、各小節の伴奏を生成して結合する
         full_accompaniment_data = []
         current_accomp_time = 0
-        for chord_name in config.chord_progression:
-            measure_accomp_notes = actual_generator(chord_name, ticks_per_measure, config.key, scale)
+        for chord in chords:
+            measure_accomp_notes = actual_generator(chord, ticks_per_measure, config.key, scale, meter=config.meter)
             for note in measure_accomp_notes:
                 note['time'] += current_accomp_time
                 full_accompaniment_data.append(note)
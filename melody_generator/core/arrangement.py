@@ -0,0 +1,148 @@
+"""
+メロディーとコード進行から、複数パート（メロディー・ベース・パッド・ドラム）の編曲を作るモジュール。
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from .melody_config import MelodyConfig
+from .music_theory import resolve_progression
+from .voice_leading import choose_voicings
+from .log_events import lazy, log_event
+
+# General MIDI のドラムチャンネル（MIDIチャンネル10。0始まりで9）
+DRUM_CHANNEL = 9
+
+# General MIDI ドラムのノート番号
+KICK = 36
+SNARE = 38
+CLOSED_HIHAT = 42
+
+@dataclass
+class Part:
+    """
+    編曲の1パート分のデータ。MIDIファイルでは1トラックとして書き出されます。
+
+    Attributes:
+        name (str): パート名（トラック名として使用）。
+        channel (int): MIDIチャンネル (0〜15)。
+        program (int): プログラムチェンジ番号（音色）。ドラムチャンネルでは無視されます。
+        velocity_curve (Tuple[int, ...]): 拍ごとのベロシティ。小節内の拍位置に応じて繰り返し適用されます。
+        notes (List[dict]): 音符データのリスト。'velocity' のない音符には、ベロシティカーブの値が設定されます。
+    """
+    name: str
+    channel: int
+    program: int
+    velocity_curve: Tuple[int, ...] = (64,)
+    notes: List[dict] = field(default_factory=list)
+
+def generate_bass_part(config, chords, ticks_per_measure):
+    """
+    ベースライン: 各拍でルートを演奏し、1拍目以外の強拍（4/4なら3拍目）では5度を演奏します。
+    音域は E1〜D#2 付近（MIDI 28〜39）に置きます。
+    """
+    notes_data = []
+    meter = config.meter
+    for i, chord in enumerate(chords[:config.num_measures]):
+        bass_pc = chord.bass if chord.bass is not None else chord.root
+        root = 28 + (bass_pc - 4) % 12
+        fifth = root + 7
+        for beat_start, beat_length in zip(meter.beat_starts, meter.beat_lengths):
+            pitch = fifth if beat_start != 0 and beat_start in meter.strong_beats else root
+            notes_data.append({
+                'pitch': pitch,
+                'time': i * ticks_per_measure + beat_start,
+                'duration': beat_length
+            })
+    return notes_data
+
+def generate_pad_part(config, chords, ticks_per_measure):
+    """
+    パッド: 声部連結を考慮したボイシングを、各小節で全音符として持続させます。
+    """
+    notes_data = []
+    for i, voicing in enumerate(choose_voicings(chords[:config.num_measures], low=55, high=79)):
+        for pitch in voicing:
+            notes_data.append({'pitch': pitch, 'time': i * ticks_per_measure, 'duration': ticks_per_measure})
+    return notes_data
+
+def generate_drum_part(config, chords, ticks_per_measure):
+    """
+    ドラム: 拍の分割単位（4/4なら8分音符）のハイハットに、強拍のキックとそれ以外の拍のスネアを重ねた基本パターン。
+    """
+    notes_data = []
+    meter = config.meter
+    hihat_cells = meter.grid(meter.beat_lengths[0] // meter.division_ticks)
+    for i in range(config.num_measures):
+        measure_start = i * ticks_per_measure
+        for cell_start, cell_length in hihat_cells:
+            notes_data.append({'pitch': CLOSED_HIHAT, 'time': measure_start + cell_start, 'duration': cell_length})
+        for beat_start in meter.beat_starts:
+            pitch = KICK if beat_start in meter.strong_beats else SNARE
+            notes_data.append({'pitch': pitch, 'time': measure_start + beat_start, 'duration': meter.division_ticks})
+    return notes_data
+
+# --- パートのカタログ ---
+
+# パート名 -> (チャンネル, プログラム番号, 拍ごとのベロシティ, 生成関数)
+# メロディーは MelodyProcessor の結果をそのまま使うため、生成関数は None です。
+PART_MAP = {
+    'melody': (0, 0, (80, 64, 72, 64), None),                          # Acoustic Grand Piano
+    'bass':   (1, 33, (90, 70, 80, 70), generate_bass_part),           # Electric Bass (finger)
+    'pad':    (2, 89, (48,), generate_pad_part),                       # Pad 2 (warm)
+    'drums':  (DRUM_CHANNEL, 0, (100, 60, 85, 60), generate_drum_part),
+}
+
+DEFAULT_PARTS = list(PART_MAP.keys())
+
+class ArrangementProcessor:
+    """複数パートの生成と、ベロシティカーブの適用を担当するクラス。"""
+
+    def __init__(self, logger=None, max_workers=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_workers = max_workers
+
+    def process(self, config: MelodyConfig, melody_data: List[dict], part_names=None) -> List[Part]:
+        """
+        設定と生成済みメロディーから、指定されたパートを並行して生成します。
+
+        Args:
+            config (MelodyConfig): メロディー生成のための設定。
+            melody_data (List[dict]): MelodyProcessor が生成したメロディーデータ。
+            part_names (List[str], optional): 生成するパート名のリスト。省略時は全パート。
+
+        Returns:
+            List[Part]: 生成されたパートのリスト（part_names の順）。
+        """
+        part_names = part_names or DEFAULT_PARTS
+        for name in part_names:
+            if name not in PART_MAP:
+                raise ValueError(f"パート '{name}' は定義されていません。利用可能なパート: {DEFAULT_PARTS}")
+
+        log_event(self.logger, 'arrangement_started', "\n--- 編曲を生成します (%(parts)s) ---",
+                  parts=lazy(', '.join, part_names))
+        chords = resolve_progression(config.chord_progression)
+        ticks_per_measure = config.meter.ticks_per_measure
+
+        # メロディー以外のパートはスレッドプールで並行して生成する
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            for name in part_names:
+                generator = PART_MAP[name][3]
+                if generator is not None:
+                    futures[name] = executor.submit(generator, config, chords, ticks_per_measure)
+
+            parts = []
+            for name in part_names:
+                channel, program, velocity_curve, _ = PART_MAP[name]
+                notes = futures[name].result() if name in futures else [note.copy() for note in melody_data]
+                self._apply_velocity_curve(notes, velocity_curve, config.meter)
+                parts.append(Part(name, channel, program, velocity_curve, notes))
+        return parts
+
+    def _apply_velocity_curve(self, notes, velocity_curve, meter):
+        # ベロシティがすでにある音符（ヒューマナイズ済みのメロディーなど）はそのまま残し、強弱を上書きしない
+        for note in notes:
+            if note.get('velocity') is None:
+                note['velocity'] = velocity_curve[meter.beat_index(note['time']) % len(velocity_curve)]
@@ -0,0 +1,183 @@
+"""
+1つの設定からシードだけを変えた曲をまとめて生成し、フォルダへ保存するバッチ生成のモジュール。
+
+各曲の生成と品質指標の計算は sweep.run_config() をワーカープロセスで実行します。BatchJob は
+呼び出し元をブロックしない poll() で進捗と結果を返すため、GUI のイベントループから定期的に
+呼び出すだけで、画面を固めずに数百曲の候補を作れます。
+
+Example:
+    job = BatchJob(batch_configs(base, count=100, seed_start=1), 'batch_out')
+    job.start()
+    while not job.finished:
+        for row in job.poll():
+            ...
+        time.sleep(0.1)
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from .melody_config import MelodyConfig
+from .sweep import run_config
+
+# ファイル名のテンプレートの既定値と、テンプレートで使える項目
+DEFAULT_FILENAME_TEMPLATE = 'melody_{index:03d}_seed{seed}.mid'
+FILENAME_FIELDS = ('index', 'seed', 'key', 'style', 'hash')
+
+class BatchError(ValueError):
+    """バッチ生成の指定（件数・テンプレートなど）が不正であることを表すエラー。"""
+
+def batch_configs(base: MelodyConfig, count: int, seed_start: int = 0) -> List[MelodyConfig]:
+    """
+    base のシードだけを seed_start, seed_start + 1, ... と変えた設定を count 個返します。
+
+    Raises:
+        BatchError: count が1未満、または seed_start が負の場合。
+    """
+    if count < 1:
+        raise BatchError(f"生成する曲数は1以上である必要があります: {count}")
+    if seed_start < 0:
+        raise BatchError(f"シードは0以上である必要があります: {seed_start}")
+    return [base.replace(seed=seed) for seed in range(seed_start, seed_start + count)]
+
+def format_filename(template: str, index: int, config: MelodyConfig) -> str:
+    """
+    テンプレートから1曲分のファイル名を作ります。拡張子がなければ '.mid' を付けます。
+
+    テンプレートでは {index}（1始まりの通し番号）、{seed}、{key}、{style}（伴奏スタイル）、
+    {hash}（設定のハッシュの先頭8文字）を str.format() の書式で使えます。
+
+    Raises:
+        BatchError: テンプレートに未知の項目や書式の誤りがある場合、またはフォルダの区切りを含む場合。
+    """
+    values = {
+        'index': index,
+        'seed': config.seed,
+        'key': config.key,
+        'style': config.accompaniment_generator,
+        'hash': config.config_hash[:8],
+    }
+    try:
+        filename = template.format(**values)
+    except KeyError as e:
+        raise BatchError(f"ファイル名のテンプレートに未知の項目 {e} があります。使える項目: {list(FILENAME_FIELDS)}") from e
+    except (ValueError, IndexError) as e:
+        raise BatchError(f"ファイル名のテンプレート '{template}' が不正です: {e}") from e
+    if not filename or os.sep in filename or (os.altsep and os.altsep in filename):
+        raise BatchError(f"ファイル名のテンプレートからフォルダを含まないファイル名を作れません: '{filename}'")
+    if not os.path.splitext(filename)[1]:
+        filename += '.mid'
+    return filename
+
+class BatchJob:
+    """
+    バッチ生成の1回分の実行。ワーカープロセスで曲を生成し、poll() で完了した結果を受け取ります。
+
+    実行中の曲の数はワーカー数の数倍に抑え、残りは poll() のたびに投入します。cancel() すると
+    まだ始まっていない曲は取り消され、実行中の曲が終わった時点で finished になります。
+    """
+
+    def __init__(self, configs: List[MelodyConfig], output_dir: str, filename_template: str = DEFAULT_FILENAME_TEMPLATE,
+                 max_workers: int = None, mp_context=None):
+        """
+        Args:
+            configs (List[MelodyConfig]): 生成する曲の設定（batch_configs() の結果など）。
+            output_dir (str): MIDIファイルの保存先フォルダ。
+            filename_template (str): ファイル名のテンプレート（format_filename() を参照）。
+            max_workers (int, optional): ワーカープロセス数。省略時は CPU 数。
+            mp_context (multiprocessing.context.BaseContext, optional): ワーカーの起動方法。
+
+        Raises:
+            BatchError: テンプレートが不正な場合、または複数の曲が同じファイル名になる場合。
+        """
+        self.output_dir = output_dir
+        # ファイル名は開始前にすべて作り、テンプレートの誤りや名前の重複をここで検出する
+        self._items = []
+        paths = set()
+        for index, config in enumerate(configs, start=1):
+            path = os.path.join(output_dir, format_filename(filename_template, index, config))
+            if path in paths:
+                raise BatchError(f"複数の曲が同じファイル名 '{os.path.basename(path)}' になります。"
+                                 "テンプレートに {index} か {seed} を含めてください。")
+            paths.add(path)
+            self._items.append((index, config, path))
+        self.total = len(self._items)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.mp_context = mp_context
+        self.completed = 0
+        self.errors = 0
+        self.cancelled = False
+        self._next = 0
+        self._pending = {}  # Future -> (通し番号, 保存先のパス)
+        self._executor = None
+        self._started_at = None
+
+    @property
+    def finished(self) -> bool:
+        """すべての曲が完了した（取り消した場合は、実行中の曲が終わった）かどうか。"""
+        return self._started_at is not None and not self._pending and (self.cancelled or self._next >= self.total)
+
+    @property
+    def rate(self) -> float:
+        """開始からの平均の処理速度（曲/秒）。"""
+        if self._started_at is None:
+            return 0.0
+        elapsed = time.perf_counter() - self._started_at
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def start(self):
+        """ワーカープールを起動し、最初の曲を投入します。"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.mp_context)
+        self._started_at = time.perf_counter()
+        self._submit()
+
+    def _submit(self):
+        max_pending = self.max_workers * 4
+        while not self.cancelled and self._next < self.total and len(self._pending) < max_pending:
+            index, config, path = self._items[self._next]
+            self._next += 1
+            self._pending[self._executor.submit(run_config, config, None, None, path)] = (index, path)
+
+    def poll(self) -> List[dict]:
+        """
+        前回の呼び出し以降に完了した曲の結果を返し、空いた分の曲を投入します（ブロックしません）。
+
+        Returns:
+            List[dict]: sweep.run_config() の結果の行に、'index'（通し番号）と 'file'（ファイル名）を加えたもの。
+        """
+        rows = []
+        for future in [future for future in self._pending if future.done()]:
+            index, path = self._pending.pop(future)
+            if future.cancelled():
+                continue
+            try:
+                row = future.result()
+            except Exception as e:  # ワーカープロセスの異常終了など
+                row = {'status': 'error', 'error': f"{type(e).__name__}: {e}", 'midi_path': ''}
+            row['index'] = index
+            row['file'] = os.path.basename(path)
+            self.completed += 1
+            if row['status'] != 'ok':
+                self.errors += 1
+            rows.append(row)
+        self._submit()
+        if self.finished:
+            self.close()
+        return rows
+
+    def cancel(self):
+        """まだ始まっていない曲を取り消します。実行中の曲は最後まで生成されます。"""
+        self.cancelled = True
+        for future in list(self._pending):
+            if future.cancel():
+                del self._pending[future]
+        if self.finished:
+            self.close()
+
+    def close(self):
+        """ワーカープールを終了します（実行中の曲の完了は待ちません）。"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
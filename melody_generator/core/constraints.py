@@ -0,0 +1,139 @@
+"""
+制約充足によってメロディーの音高を決め直す「制約モード」の実装。
+
+通常の生成（各音をコードトーンへ最も近い音に補正する方式）では、同じ音の連続や不自然な跳躍が
+起きやすいため、リズムはそのままに、次の制約をすべて満たす音高の並びをバックトラッキングで探します。
+
+    - 強拍の音はその小節のコードトーン（それ以外の音はスケール音かコードトーン。最後の音は除く）
+    - 隣り合う音の跳躍は max_leap 半音以内
+    - 音域は low〜high
+    - 最後の音は主音
+    - 同じ音高の連続は max_repeats 回まで
+
+各音の候補（ドメイン）は、拍の種類とコードごとに 128 ビットのビットマスクとして事前計算し、
+元の音高に近い順に試します。探索は時間制限付きで、制限内に解が見つからなければ None を返し、
+呼び出し側は元のメロディーをそのまま使います（最悪時の処理時間が一定に収まります）。
+"""
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional
+
+from .music_theory import SCALES, SCALE_MASKS
+
+@dataclass
+class MelodyConstraints:
+    """
+    制約モードのパラメータ。
+
+    Attributes:
+        max_leap (int): 隣り合う音の最大の跳躍（半音）。
+        low (int): 音域の下限（MIDIノート番号）。
+        high (int): 音域の上限（MIDIノート番号）。
+        max_repeats (int): 同じ音高が連続してよい最大の回数。
+        end_on_tonic (bool): 最後の音を主音にするかどうか。
+        time_budget (float): 探索の制限時間（秒）。
+    """
+    max_leap: int = 7
+    low: int = 55
+    high: int = 84
+    max_repeats: int = 2
+    end_on_tonic: bool = True
+    time_budget: float = 0.05
+
+# 何ノード探索するごとに制限時間を確認するか
+_BUDGET_CHECK_INTERVAL = 256
+
+MELODY_MODES = ('snap', 'constraint')
+
+@lru_cache(maxsize=None)
+def domain_mask(pc_mask, low, high):
+    """ピッチクラスのビットマスク（12ビット）を、音域 low〜high の MIDIノート番号のビットマスクに展開します。"""
+    mask = 0
+    for pitch in range(low, high + 1):
+        if pc_mask >> (pitch % 12) & 1:
+            mask |= 1 << pitch
+    return mask
+
+@lru_cache(maxsize=4096)
+def _ordered_candidates(mask, target):
+    """ドメイン mask の音高を、target に近い順（同じ距離なら低い方が先）に並べたタプルを返します。"""
+    pitches = [pitch for pitch in range(128) if mask >> pitch & 1]
+    return tuple(sorted(pitches, key=lambda pitch: (abs(pitch - target), pitch)))
+
+def solve_pitches(notes_data, chords, key, meter, constraints: MelodyConstraints) -> Optional[List[int]]:
+    """
+    リズム（発音時刻と長さ）を固定したまま、制約をすべて満たす音高の並びを探します。
+
+    Args:
+        notes_data (list): 曲頭からの絶対時間の音符データ（時間順）。各音の 'pitch' は目標の音高として使います。
+        chords (List[Chord]): 小節ごとのコード。
+        key (str): 曲のキー（SCALE_MASKS のキー）。
+        meter (Meter): 拍子。強拍の判定に使います。
+        constraints (MelodyConstraints): 制約のパラメータ。
+
+    Returns:
+        List[int] or None: 各音の新しい音高。制限時間内に解が見つからない場合は None。
+    """
+    count = len(notes_data)
+    if count == 0:
+        return []
+    c = constraints
+    scale_mask = SCALE_MASKS[key]
+    tonic_pc = SCALES[key][0] % 12
+
+    # 各音のドメイン（強拍はコードトーン、それ以外はスケール音とコードトーン）
+    candidates = []
+    for index, note in enumerate(notes_data):
+        measure = note['time'] // meter.ticks_per_measure
+        chord_mask = chords[min(measure, len(chords) - 1)].mask
+        pc_mask = chord_mask if meter.is_strong(note['time']) else scale_mask | chord_mask
+        if c.end_on_tonic and index == count - 1:
+            pc_mask = 1 << tonic_pc  # 最後の音は、コードに関係なく主音で解決させる
+        mask = domain_mask(pc_mask, c.low, c.high)
+        if not mask:
+            return None
+        candidates.append(_ordered_candidates(mask, note['pitch']))
+
+    # 最後の音の候補に、残りの音数の跳躍で届くかどうかで枝刈りする
+    final_pitches = candidates[-1]
+    deadline = time.perf_counter() + c.time_budget
+    pitches = [0] * count
+    repeats = [0] * count
+    choice = [0] * count  # 各音で次に試す候補の位置
+    index = 0
+    nodes = 0
+
+    while 0 <= index < count:
+        nodes += 1
+        if nodes % _BUDGET_CHECK_INTERVAL == 0 and time.perf_counter() > deadline:
+            return None
+        options = candidates[index]
+        placed = False
+        while choice[index] < len(options):
+            pitch = options[choice[index]]
+            choice[index] += 1
+            if index > 0:
+                previous = pitches[index - 1]
+                if abs(pitch - previous) > c.max_leap:
+                    continue
+                run = repeats[index - 1] + 1 if pitch == previous else 1
+                if run > c.max_repeats:
+                    continue
+            else:
+                run = 1
+            remaining = count - 1 - index
+            if remaining and not any(abs(pitch - final) <= remaining * c.max_leap for final in final_pitches):
+                continue
+            pitches[index] = pitch
+            repeats[index] = run
+            placed = True
+            break
+
+        if placed:
+            index += 1
+            if index < count:
+                choice[index] = 0
+        else:
+            index -= 1  # この音の候補を使い切ったので、1つ前の音の次の候補へ戻る
+    return pitches if index == count else None
@@ -1,13 +1,34 @@
+import asyncio
 import logging
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
 
 # 新しく作成したファイルからクラスをインポート
 from melody_generator.core.melody_config import MelodyConfig
 from melody_generator.core.melody_processor import MelodyProcessor
 from melody_generator.core.accompaniment_processor import AccompanimentProcessor
+from melody_generator.core.arrangement import ArrangementProcessor
+from melody_generator.core.humanize import HumanizeProcessor
+from melody_generator.core.invariants import check_notes
+from melody_generator.core.profiles import get_profile
+from melody_generator.core.log_events import Stopwatch, log_event, new_run_id, run_context, run_id_var
+from melody_generator.core.manifest import build_manifest, manifest_text, write_sidecar
 
 # 既存のユーティリティと定義をインポート
 from melody_generator.core.music_theory import SCALES
-from melody_generator.utils.midi_utils import create_midi_file
+from melody_generator.utils.midi_utils import create_midi_file, create_arrangement_midi_file
+from melody_generator.utils.lmms_utils import create_lmms_project, DEFAULT_TEMPLATE_PATH
+from melody_generator.utils.synth import render_pcm, write_wav
+
+# シード付きの生成で、モジュール共通の乱数の状態を切り替える間だけ保持するロック
+_RANDOM_LOCK = threading.Lock()
+
+def _generate_in_process(config, invariant_check_rate):
+    """ProcessPoolExecutor のワーカーで生成を行い、音符データと（マニフェスト用の）構成・伴奏スタイルを返します。"""
+    generator = MelodyGenerator(config, invariant_check_rate=invariant_check_rate)
+    generator.generate()
+    return generator.melody_data, generator.accompaniment_data, generator.composition, generator.accompaniment_style
 
 class MelodyGenerator:
     """
@@ -15,7 +36,7 @@ class MelodyGenerator:
     GUIや他のクライアントコードから「部品」として利用されることを想定しています。
     """
 
-    def __init__(self, config: MelodyConfig, logger=None):
+    def __init__(self, config: MelodyConfig, logger=None, invariant_check_rate: float = 0.0, measure_cache=None):
         """
         コンストラクタ。メロディー生成に必要な設定オブジェクトを受け取ります。
 
@@ -23,40 +44,216 @@ class MelodyGenerator:
             config (MelodyConfig): 設定を保持するデータクラスのインスタンス。
             logger (logging.Logger, optional): ログ出力用のロガー。
                                                指定されない場合、標準出力にフォールバックします。
+            invariant_check_rate (float): generate() の結果を不変条件で検査する割合 (0.0〜1.0)。
+                                          1.0 ならデバッグ用に毎回すべての小節を検査し、
+                                          0.01 なら大量生成時に約1%の曲だけを抜き取り検査します。
+            measure_cache (MutableMapping, optional): 生成した小節を再利用するためのキャッシュ。
+                                                      MelodyProcessor にそのまま渡されます。
         """
         # --- ロガーの設定 ---
         self.logger = logger or logging.getLogger(__name__)
         # --- 設定の保持 ---
         self.config = config
+        if not 0.0 <= invariant_check_rate <= 1.0:
+            raise ValueError(f"invariant_check_rate は 0.0〜1.0 の範囲で指定してください: {invariant_check_rate}")
+        self.invariant_check_rate = invariant_check_rate
+        # 抜き取りの判定には専用の乱数を使い、生成結果の乱数系列に影響しないようにする
+        self._check_sampler = random.Random()
 
         # --- プロセッサの初期化 ---
         # 依存するプロセッサをコンストラクタで生成することで、依存関係を明確にします。
-        self.melody_processor = MelodyProcessor(logger=self.logger)
+        self.melody_processor = MelodyProcessor(logger=self.logger, measure_cache=measure_cache)
         self.accompaniment_processor = AccompanimentProcessor(logger=self.logger)
+        self.arrangement_processor = ArrangementProcessor(logger=self.logger)
+        self.humanize_processor = HumanizeProcessor(logger=self.logger)
 
         # --- 生成結果の初期化 ---
         self.melody_data = None
         self.accompaniment_data = None
+        self.parts = None
+        # 直近の generate() の実行ID（ログの各レコードに付き、1回の生成のログをまとめて追える）
+        self.run_id = None
+
+    @classmethod
+    def from_profile(cls, profile_name='default', logger=None, **overrides) -> 'MelodyGenerator':
+        """
+        設定プロファイル（core/profiles.py）から MelodyGenerator を作ります。
+
+        Args:
+            profile_name (str): プロファイル名。
+            logger (logging.Logger, optional): ログ出力用のロガー。
+            **overrides: プロファイルの値より優先する MelodyConfig の項目（seed=1 など）。
 
-    def generate(self):
+        Example:
+            generator = MelodyGenerator.from_profile('waltz', seed=1)
+        """
+        return cls(get_profile(profile_name).config(**overrides), logger=logger)
+
+    def generate(self, executor=None, composition=None, accompaniment_style=None):
         """
         保持している設定に基づき、メロディーと伴奏の内部データを生成します。
+
+        Args:
+            executor (concurrent.futures.Executor, optional): 指定すると、メロディーの各小節をこのエグゼキューターで
+                並列に生成します（MelodyProcessor.process() を参照）。数千小節の長い曲向けです。
+            composition (List, optional): 小節ごとの変換チェーン。指定すると生成戦略を使わずにこの構成で生成します
+                                          （マニフェストからの再レンダリング用。core/manifest.py の rerender() を参照）。
+            accompaniment_style (str, optional): 伴奏スタイル。指定すると 'random' の抽選を行わずにこのスタイルを使います。
+        """
+        for _ in self._generate_steps(executor, composition, accompaniment_style):
+            pass
+
+    @property
+    def composition(self):
+        """直近の generate() で使った構成（小節ごとの変換チェーン）。"""
+        return self.melody_processor.composition
+
+    @property
+    def accompaniment_style(self):
+        """直近の generate() で実際に使われた伴奏スタイル（伴奏なしなら None）。"""
+        return self.accompaniment_processor.selected_style
+
+    def manifest(self):
+        """
+        直近の generate() の結果を再現するためのマニフェスト（core/manifest.py）を返します。
+        """
+        if self.melody_data is None or self.composition is None:
+            raise RuntimeError("メロディーがまだ生成されていません。先に .generate() を呼び出してください。")
+        return build_manifest(self.config, self.composition, self.accompaniment_style)
+
+    def _generate_steps(self, executor=None, composition=None, accompaniment_style=None):
         """
-        self.logger.info(f"--- メロディー生成を開始します ({self.config.num_measures}小節) ---")
+        generate() の本体。メロディーを1小節生成するごとに (小節番号, 音符データ) を返し、
+        最後の小節を返した後に伴奏の生成と後処理を行います。
+
+        シードが指定されている場合、変換やコード選択で使うモジュール共通の乱数をこの生成専用の状態に
+        切り替えてから各ステップを実行します。そのため、複数の生成をスレッドで並行して進めても
+        結果はシードごとに再現されます。
+        """
+        # 呼び出し元が run_context() で実行IDを決めていればそれを使う
+        self.run_id = run_id = run_id_var.get() or new_run_id()
+        stopwatch = Stopwatch()
+        log_event(self.logger, 'generation_started', "--- メロディー生成を開始します (%(num_measures)d小節) ---",
+                  run_id=run_id, num_measures=self.config.num_measures, key=self.config.key, seed=self.config.seed)
 
         # 1. 準備
         scale = SCALES[self.config.key]
-        ticks_per_measure = self.config.ticks_per_beat * self.config.beats_per_measure
+        ticks_per_measure = self.config.meter.ticks_per_measure
+        random_state = None
+        if self.config.seed is not None:
+            with _RANDOM_LOCK:
+                saved_state = random.getstate()
+                random.seed(self.config.seed)
+                random_state = random.getstate()
+                random.setstate(saved_state)
+
+        def step(func, *args):
+            # 乱数の状態をこの生成のものに切り替え、ログに実行IDを付けて func を実行する
+            # （各ステップは別のスレッドで実行されることがあるため、実行IDはステップごとに設定する）
+            nonlocal random_state
+            with run_context(run_id):
+                if random_state is None:
+                    return func(*args)
+                with _RANDOM_LOCK:
+                    random.setstate(random_state)
+                    result = func(*args)
+                    random_state = random.getstate()
+                return result
 
         # 2. 各プロセッサに処理を委譲
-        self.melody_data = self.melody_processor.process(self.config)
-        self.accompaniment_data = self.accompaniment_processor.process(self.config, scale, ticks_per_measure)
+        check_invariants = self._check_sampler.random() < self.invariant_check_rate
+        measures = self.melody_processor.iter_measures(self.config, check_invariants=check_invariants, executor=executor,
+                                                       composition=composition)
+        melody_data = []
+        while True:
+            item = step(next, measures, None)
+            if item is None:
+                break
+            melody_data.extend(item[1])
+            yield item
+        self.melody_data = melody_data
+        self.accompaniment_data = step(self.accompaniment_processor.process, self.config, scale, ticks_per_measure,
+                                       accompaniment_style)
+        if check_invariants:
+            # 伴奏はコード進行のすべてのコードを演奏するため、num_measures より長いことがある
+            check_notes(self.accompaniment_data, 0, len(self.config.chord_progression) * ticks_per_measure,
+                        monophonic=False, context="伴奏")
+
+        # 3. 後処理: 強弱・アーティキュレーション・タイミングの揺らぎを加える
+        if self.config.humanize:
+            self.melody_data = self.humanize_processor.process(self.config, self.melody_data, base_velocity=64)
+            self.accompaniment_data = self.humanize_processor.process(
+                self.config, self.accompaniment_data, base_velocity=40, seed_offset=1
+            )
+
+        log_event(self.logger, 'generation_finished', "\nメロディーと伴奏の内部データ生成が完了しました。",
+                  run_id=run_id, elapsed_ms=stopwatch.elapsed_ms(), melody_notes=len(self.melody_data),
+                  accompaniment_notes=len(self.accompaniment_data or ()))
+
+    # --- asyncio 向けの API ---
+
+    async def agenerate(self, executor=None):
+        """
+        generate() の非同期版。生成処理を executor で実行し、イベントループをブロックしません。
+
+        Args:
+            executor (concurrent.futures.Executor, optional): 生成を実行するエグゼキューター。
+                省略時はイベントループ既定のスレッドプールを使います。ProcessPoolExecutor を渡すと
+                別プロセスで生成し、結果の音符データだけを受け取ります（CPUを並列に使えます）。
+        """
+        loop = asyncio.get_running_loop()
+        if isinstance(executor, ProcessPoolExecutor):
+            (self.melody_data, self.accompaniment_data, self.melody_processor.composition,
+             self.accompaniment_processor.selected_style) = await loop.run_in_executor(
+                executor, _generate_in_process, self.config, self.invariant_check_rate
+            )
+        else:
+            await loop.run_in_executor(executor, self.generate)
+
+    async def aiter_measures(self, executor=None):
+        """
+        メロディーを1小節生成するごとに (小節番号, 音符データ) を返す非同期イテレーター。
+        各小節の生成は executor（省略時は既定のスレッドプール）で実行します。
+
+        返される音符はヒューマナイズ前のものです。最後まで反復すると、generate() を呼んだ場合と
+        同じように melody_data と accompaniment_data が設定されます。
+
+        Example:
+            async for index, measure_data in generator.aiter_measures():
+                ...
+        """
+        loop = asyncio.get_running_loop()
+        steps = self._generate_steps()
+        while True:
+            item = await loop.run_in_executor(executor, next, steps, None)
+            if item is None:
+                return
+            yield item
+
+    def _manifest_texts(self):
+        # 生成せずに音符データを設定した場合（履歴からの書き出しなど）は、構成がないので埋め込まない
+        return [manifest_text(self.manifest())] if self.composition is not None else []
+
+    def _save_sidecar(self, output_path):
+        if self.composition is not None:
+            write_sidecar(self.manifest(), output_path)
+
+    async def asave_midi(self, output_path):
+        """save_midi() の非同期版。ファイルの書き出しを別スレッドで行います。"""
+        await asyncio.to_thread(self.save_midi, output_path)
 
-        self.logger.info("\nメロディーと伴奏の内部データ生成が完了しました。")
+    async def asave_lmms(self, output_path, template_path=DEFAULT_TEMPLATE_PATH, bpm=None):
+        """save_lmms() の非同期版。ファイルの書き出しを別スレッドで行います。"""
+        await asyncio.to_thread(self.save_lmms, output_path, template_path, bpm)
+
+    async def asave_wav(self, output_path, bpm=120, sample_rate=44100):
+        """save_wav() の非同期版。レンダリングとファイルの書き出しを別スレッドで行います。"""
+        await asyncio.to_thread(self.save_wav, output_path, bpm, sample_rate)
 
     def save_midi(self, output_path):
         """
         生成済みのメロディーデータをMIDIファイルとして保存します。
+        再現に必要な情報（マニフェスト）がテキストイベントとして埋め込まれます。
         """
         if self.melody_data is None:
             raise RuntimeError("メロディーがまだ生成されていません。先に .generate() を呼び出してください。")
@@ -65,6 +262,95 @@ class MelodyGenerator:
             melody_data=self.melody_data,
             output_filename=output_path,
             ticks_per_beat=self.config.ticks_per_beat,
-            accompaniment_data=self.accompaniment_data
+            accompaniment_data=self.accompaniment_data,
+            text_events=self._manifest_texts(),
+            time_signature=(self.config.meter.numerator, self.config.meter.denominator)
         )
-        self.logger.info(f"MIDIファイル '{output_path}' を保存しました。")
\ No newline at end of file
+        log_event(self.logger, 'file_saved', "MIDIファイル '%(path)s' を保存しました。",
+                  run_id=self.run_id, format='midi', path=output_path)
+
+    def save_lmms(self, output_path, template_path=DEFAULT_TEMPLATE_PATH, bpm=None):
+        """
+        生成済みのメロディーと伴奏を、LMMSプロジェクトファイル (.mmp) として保存します。
+        楽器・テンポなどの設定は template_path の .mmp から引き継ぎます。
+        """
+        if self.melody_data is None:
+            raise RuntimeError("メロディーがまだ生成されていません。先に .generate() を呼び出してください。")
+
+        create_lmms_project(
+            melody_data=self.melody_data,
+            output_filename=output_path,
+            ticks_per_beat=self.config.ticks_per_beat,
+            accompaniment_data=self.accompaniment_data,
+            chord_progression=self.config.chord_progression,
+            beats_per_measure=self.config.beats_per_measure,
+            beat_unit=self.config.beat_unit,
+            template_path=template_path,
+            bpm=bpm
+        )
+        self._save_sidecar(output_path)
+        log_event(self.logger, 'file_saved', "LMMSプロジェクト '%(path)s' を保存しました。",
+                  run_id=self.run_id, format='lmms', path=output_path)
+
+    def _preview_tracks(self, melody_instrument, accompaniment_instrument):
+        if self.melody_data is None:
+            raise RuntimeError("メロディーがまだ生成されていません。先に .generate() を呼び出してください。")
+        tracks = [(self.melody_data, melody_instrument)]
+        if self.accompaniment_data:
+            tracks.append((self.accompaniment_data, accompaniment_instrument))
+        return tracks
+
+    def render_preview(self, bpm=120, sample_rate=44100, melody_instrument='lead', accompaniment_instrument='pad'):
+        """
+        生成済みのメロディーと伴奏を内蔵シンセサイザーでレンダリングし、16bit PCM の波形を返します。
+
+        Returns:
+            numpy.ndarray: int16 のモノラル波形。
+        """
+        tracks = self._preview_tracks(melody_instrument, accompaniment_instrument)
+        return render_pcm(tracks, self.config.ticks_per_beat, bpm, sample_rate)
+
+    def save_wav(self, output_path, bpm=120, sample_rate=44100, melody_instrument='lead', accompaniment_instrument='pad'):
+        """
+        生成済みのメロディーと伴奏を内蔵シンセサイザーでレンダリングし、WAVファイルとして保存します。
+        """
+        tracks = self._preview_tracks(melody_instrument, accompaniment_instrument)
+        write_wav(tracks, output_path, self.config.ticks_per_beat, bpm, sample_rate)
+        self._save_sidecar(output_path)
+        log_event(self.logger, 'file_saved', "WAVファイル '%(path)s' を保存しました。",
+                  run_id=self.run_id, format='wav', path=output_path)
+
+    def save_to_archive(self, writer):
+        """
+        生成済みのメロディーと伴奏を、ノートアーカイブ（NoteArchiveWriter）に1曲として追加します。
+        設定のハッシュとシードも一緒に記録されます。
+        """
+        if self.melody_data is None:
+            raise RuntimeError("メロディーがまだ生成されていません。先に .generate() を呼び出してください。")
+        writer.add(self.melody_data, self.accompaniment_data, config_hash=self.config.config_hash,
+                   seed=self.config.seed, ticks_per_beat=self.config.ticks_per_beat)
+
+    def arrange(self, part_names=None):
+        """
+        生成済みのメロディーとコード進行から、複数パートの編曲を生成します。
+
+        Args:
+            part_names (list, optional): 生成するパート名のリスト（例: ['melody', 'bass', 'drums']）。
+                                         省略時は全パートを生成します。
+        """
+        if self.melody_data is None:
+            raise RuntimeError("メロディーがまだ生成されていません。先に .generate() を呼び出してください。")
+        self.parts = self.arrangement_processor.process(self.config, self.melody_data, part_names)
+
+    def save_arrangement(self, output_path):
+        """
+        生成済みの編曲を、パートごとのトラックを持つMIDIファイルとして保存します。
+        """
+        if self.parts is None:
+            raise RuntimeError("編曲がまだ生成されていません。先に .arrange() を呼び出してください。")
+
+        create_arrangement_midi_file(self.parts, output_path, ticks_per_beat=self.config.ticks_per_beat,
+                                     text_events=self._manifest_texts(),
+                                     time_signature=(self.config.meter.numerator, self.config.meter.denominator))
+        log_event(self.logger, 'file_saved', "MIDIファイル '%(path)s' を保存しました。",
+                  run_id=self.run_id, format='midi', path=output_path)
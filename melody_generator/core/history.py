@@ -0,0 +1,179 @@
+"""
+生成した曲の履歴を保持するモジュール。
+
+各エントリは設定（シードを含む）と音符データを持ちますが、音符は小節ごとの変更不可なタプルとして
+履歴全体で共有されます。同じ内容の小節（前の曲から変わらなかった小節や、曲中で繰り返される小節）は
+1つのオブジェクトを参照するだけなので、メモリ使用量はエントリ数ではなく曲どうしの差分に比例します。
+"""
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .melody_config import MelodyConfig
+from .generator import MelodyGenerator
+from .live import split_measures
+
+# 1つの音符: (小節頭からの時刻, 音高, 長さ, ベロシティ（なければ None）)
+NoteTuple = Tuple[int, int, int, Optional[int]]
+Measure = Tuple[NoteTuple, ...]
+
+@dataclass(frozen=True)
+class HistoryEntry:
+    """
+    履歴の1エントリ。
+
+    Attributes:
+        entry_id (int): セッション内で一意な番号（1始まり）。
+        config (MelodyConfig): 生成に使った設定。
+        melody_measures (Tuple[Measure, ...]): 小節ごとのメロディー（他のエントリと共有される）。
+        accompaniment_measures (Tuple[Measure, ...]): 小節ごとの伴奏（他のエントリと共有される）。
+        label (str): 表示用のラベル。
+        created_at (float): 記録した時刻（time.time()）。
+    """
+    entry_id: int
+    config: MelodyConfig
+    melody_measures: Tuple[Measure, ...] = field(repr=False)
+    accompaniment_measures: Tuple[Measure, ...] = field(repr=False)
+    label: str = ''
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def seed(self):
+        return self.config.seed
+
+    def melody_data(self) -> List[dict]:
+        """メロディーを曲頭からの絶対時間の音符データ（新しいリスト）として返します。"""
+        return _to_notes(self.melody_measures, self.config.meter.ticks_per_measure)
+
+    def accompaniment_data(self) -> List[dict]:
+        """伴奏を曲頭からの絶対時間の音符データ（新しいリスト）として返します。"""
+        return _to_notes(self.accompaniment_measures, self.config.meter.ticks_per_measure)
+
+    def to_generator(self, logger=None) -> MelodyGenerator:
+        """このエントリの音符を持つ MelodyGenerator を返します（save_midi() などでそのまま書き出せます）。"""
+        generator = MelodyGenerator(self.config, logger=logger)
+        generator.melody_data = self.melody_data()
+        generator.accompaniment_data = self.accompaniment_data()
+        return generator
+
+def _to_notes(measures, ticks_per_measure):
+    notes_data = []
+    for i, measure in enumerate(measures):
+        offset = i * ticks_per_measure
+        for time_in_measure, pitch, duration, velocity in measure:
+            note = {'pitch': pitch, 'time': offset + time_in_measure, 'duration': duration}
+            if velocity is not None:
+                note['velocity'] = velocity
+            notes_data.append(note)
+    return notes_data
+
+class SessionHistory:
+    """
+    生成した曲の履歴。小節単位のコピーオンライトで音符データを共有します。
+
+    Example:
+        history = SessionHistory()
+        entry = history.record(config, generator.melody_data, generator.accompaniment_data)
+        history.diff(history[0], entry)   # 内容が異なる小節の番号
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Args:
+            max_entries (int, optional): 保持するエントリ数の上限。超えた場合は古いものから破棄します。
+        """
+        self.max_entries = max_entries
+        self._entries: List[HistoryEntry] = []
+        self._ids = itertools.count(1)
+        # 小節の内容 -> (共有するタプル, 参照しているエントリ数)
+        self._measures: Dict[Measure, list] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, index) -> HistoryEntry:
+        return self._entries[index]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def get(self, entry_id) -> HistoryEntry:
+        """エントリ番号からエントリを取得します。"""
+        for entry in self._entries:
+            if entry.entry_id == entry_id:
+                return entry
+        raise KeyError(f"履歴 #{entry_id} は見つかりません。")
+
+    def record(self, config: MelodyConfig, melody_data, accompaniment_data, label='') -> HistoryEntry:
+        """
+        生成結果を履歴に追加します。音符データはコピーされるため、呼び出し元で変更しても影響しません。
+
+        Args:
+            config (MelodyConfig): 生成に使った設定（再現できるよう、シード付きのものを渡してください）。
+            melody_data (list): メロディーの音符データ。
+            accompaniment_data (list): 伴奏の音符データ。
+            label (str): 表示用のラベル。
+        """
+        ticks_per_measure = config.meter.ticks_per_measure
+        entry = HistoryEntry(
+            entry_id=next(self._ids),
+            config=config,
+            melody_measures=self._intern_all(melody_data, ticks_per_measure, config.num_measures),
+            accompaniment_measures=self._intern_all(accompaniment_data or [], ticks_per_measure, config.num_measures),
+            label=label,
+        )
+        self._entries.append(entry)
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self.remove(self._entries[0])
+        return entry
+
+    def remove(self, entry: HistoryEntry):
+        """エントリを履歴から取り除き、どのエントリからも参照されなくなった小節を解放します。"""
+        self._entries.remove(entry)
+        for measure in entry.melody_measures + entry.accompaniment_measures:
+            slot = self._measures[measure]
+            slot[1] -= 1
+            if slot[1] == 0:
+                del self._measures[measure]
+
+    def _intern_all(self, notes_data, ticks_per_measure, num_measures):
+        measures = []
+        for i, notes in enumerate(split_measures(notes_data, ticks_per_measure, num_measures)):
+            offset = i * ticks_per_measure
+            key = tuple(sorted(
+                (note['time'] - offset, note['pitch'], note['duration'], note.get('velocity')) for note in notes
+            ))
+            slot = self._measures.get(key)
+            if slot is None:
+                slot = self._measures[key] = [key, 0]
+            slot[1] += 1
+            measures.append(slot[0])
+        return tuple(measures)
+
+    @staticmethod
+    def diff(a: HistoryEntry, b: HistoryEntry) -> Tuple[int, ...]:
+        """
+        2つのエントリで内容が異なる小節の番号を返します（A/B 比較用）。
+        共有された小節は同一オブジェクトなので、ほとんどの比較は参照の一致だけで済みます。
+        """
+        parts_a = (a.melody_measures, a.accompaniment_measures)
+        parts_b = (b.melody_measures, b.accompaniment_measures)
+        count = max(len(a.melody_measures), len(b.melody_measures))
+        changed = []
+        for i in range(count):
+            for measures_a, measures_b in zip(parts_a, parts_b):
+                if i >= len(measures_a) or i >= len(measures_b) or measures_a[i] is not measures_b[i]:
+                    changed.append(i)
+                    break
+        return tuple(changed)
+
+    def stats(self) -> dict:
+        """共有の状況（エントリ数、保持している小節の総数と、そのうち実体のある小節の数）を返します。"""
+        references = sum(slot[1] for slot in self._measures.values())
+        return {
+            'entries': len(self._entries),
+            'measure_references': references,
+            'unique_measures': len(self._measures),
+        }
@@ -0,0 +1,110 @@
+"""
+生成された音符に強弱・アーティキュレーション・タイミングの揺らぎを加える後処理。
+
+すべての処理は曲全体の音符配列に対する NumPy のベクトル演算で行うため、
+長い曲でもほとんど処理時間が増えません。乱数は設定のシードから生成されるため再現可能です。
+"""
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .melody_config import MelodyConfig
+from melody_generator.utils.note_array import notes_to_array, array_to_notes
+
+@dataclass
+class HumanizeSettings:
+    """
+    ヒューマナイズ処理のパラメータ。
+
+    Attributes:
+        accent_pattern (Tuple[float, ...]): 拍の頭にある音符のベロシティ倍率（拍位置ごと）。
+        offbeat_accent (float): 拍の頭以外にある音符のベロシティ倍率。
+        section_dynamics (Tuple[float, ...]): 曲を均等に区切った各セクション（AA'BA''）のベロシティ倍率。
+            セクション間はなめらかに補間されます。
+        velocity_jitter (float): ベロシティの揺らぎ（標準偏差）。
+        timing_jitter (float): 発音タイミングの揺らぎ（標準偏差、ティック）。
+        articulation (str): 'normal'（そのまま）、'legato'（次の音までつなげる）、'staccato'（短く切る）。
+        staccato_ratio (float): スタッカート時に残す音価の割合。
+    """
+    accent_pattern: Tuple[float, ...] = (1.15, 0.9, 1.05, 0.9)
+    offbeat_accent: float = 0.85
+    section_dynamics: Tuple[float, ...] = (0.9, 0.95, 1.1, 0.85)
+    velocity_jitter: float = 4.0
+    timing_jitter: float = 8.0
+    articulation: str = 'normal'
+    staccato_ratio: float = 0.5
+
+ARTICULATIONS = ('normal', 'legato', 'staccato')
+
+class HumanizeProcessor:
+    """音符データへのヒューマナイズ処理を担当するクラス。"""
+
+    def __init__(self, settings: Optional[HumanizeSettings] = None, logger=None):
+        self.settings = settings or HumanizeSettings()
+        self.logger = logger or logging.getLogger(__name__)
+        if self.settings.articulation not in ARTICULATIONS:
+            raise ValueError(f"アーティキュレーション '{self.settings.articulation}' は定義されていません。利用可能: {ARTICULATIONS}")
+
+    def process(self, config: MelodyConfig, notes_data: List[dict], base_velocity: int = 64, seed_offset: int = 0) -> List[dict]:
+        """
+        音符データ全体にヒューマナイズ処理を適用した新しい音符データを返します。
+
+        Args:
+            config (MelodyConfig): メロディー生成のための設定。
+            notes_data (List[dict]): 処理対象の音符データ（曲頭からの絶対時間）。
+            base_velocity (int): 強弱を付ける前の基準ベロシティ。
+            seed_offset (int): 同じ設定で複数トラックを処理する際に、乱数系列をずらすための値。
+
+        Returns:
+            List[dict]: 'velocity' を含む新しい音符データのリスト（時間順）。
+        """
+        if not notes_data:
+            return []
+
+        settings = self.settings
+        seed = None if config.seed is None else config.seed + seed_offset
+        rng = np.random.default_rng(seed)
+        notes = notes_to_array(notes_data)
+        notes.sort(order='time', kind='stable')
+
+        meter = config.meter
+        time = notes['time'].astype(np.int64)
+        duration = notes['duration'].astype(np.int64)
+        count = len(notes)
+
+        # 1. 拍位置によるアクセント
+        accents = np.asarray(settings.accent_pattern)
+        beat_index, on_beat = meter.beat_index_array(time)
+        accent = np.where(on_beat, accents[beat_index % len(accents)], settings.offbeat_accent)
+
+        # 2. セクション（AA'BA''）単位の強弱を、各セクションの中心を結んで補間する
+        total_ticks = config.num_measures * meter.ticks_per_measure
+        sections = np.asarray(settings.section_dynamics)
+        centers = (np.arange(len(sections)) + 0.5) * total_ticks / len(sections)
+        phrase = np.interp(time, centers, sections)
+
+        velocity = base_velocity * accent * phrase + rng.normal(0.0, settings.velocity_jitter, count)
+        notes['velocity'] = np.clip(np.rint(velocity), 1, 127)
+
+        # 3. アーティキュレーション
+        if settings.articulation == 'legato':
+            # 次の（異なる時刻の）発音まで音価を伸ばす。最後の発音に属する音はそのまま
+            onsets = np.unique(time)
+            next_index = np.searchsorted(onsets, time, side='right')
+            next_onset = onsets[np.minimum(next_index, len(onsets) - 1)]
+            duration = np.where(next_index < len(onsets), np.maximum(duration, next_onset - time), duration)
+        elif settings.articulation == 'staccato':
+            duration = np.maximum(1, np.rint(duration * settings.staccato_ratio).astype(np.int64))
+
+        # 4. 発音タイミングの揺らぎ（音の終わりの位置は保つ）
+        if settings.timing_jitter > 0:
+            jitter = np.rint(rng.normal(0.0, settings.timing_jitter, count)).astype(np.int64)
+            jitter = np.clip(jitter, -time, duration - 1)
+            time = time + jitter
+            duration = duration - jitter
+
+        notes['time'] = time
+        notes['duration'] = duration
+        return array_to_notes(notes)
@@ -0,0 +1,129 @@
+"""
+生成された音符データが満たすべき不変条件（インバリアント）の検査。
+
+検査は NumPy のベクトル演算で行うため、小節ごとに毎回呼び出しても生成時間にほとんど影響しません。
+デバッグ時は全小節を、本番の大量生成では一部の曲だけをサンプリングして検査することを想定しています。
+
+検査する条件:
+    - ピッチが 0〜127 の範囲にある
+    - 音符の長さが1ティック以上ある
+    - 発音時刻がリストの順に単調増加（非減少）している
+    - 音符が指定された区間（小節など）の中に収まっている
+    - 同じ声部の音符が重なっていない（単旋律なら全音符、和音を含むパートでは同じピッチ同士）
+"""
+import inspect
+import random
+
+import numpy as np
+
+from melody_generator.utils.note_array import notes_to_array
+
+class InvariantError(ValueError):
+    """音符データが不変条件を満たしていない場合に送出される例外。"""
+
+def find_violations(notes_data, start=0, end=None, monophonic=True):
+    """
+    音符データの不変条件違反を調べ、違反内容の説明のリストを返します。
+
+    Args:
+        notes_data (list): {'pitch', 'time', 'duration'} 形式の辞書のリスト。
+        start (int): 音符が収まるべき区間の開始位置（ティック）。
+        end (int, optional): 音符が収まるべき区間の終了位置（ティック）。省略時は終端を検査しません。
+        monophonic (bool): True なら全音符を1声部として重なりを検査し、
+                           False ならピッチごとに別の声部として検査します（和音を含むパート向け）。
+
+    Returns:
+        List[str]: 違反内容の説明のリスト。違反がなければ空のリスト。
+    """
+    if not notes_data:
+        return []
+    notes = notes_to_array(notes_data)
+    pitch = notes['pitch'].astype(np.int64)
+    time = notes['time'].astype(np.int64)
+    duration = notes['duration'].astype(np.int64)
+    violations = []
+
+    def report(message, mask):
+        indices = np.flatnonzero(mask)
+        if len(indices):
+            violations.append(f"{message}: 音符 {indices[:5].tolist()}{' ...' if len(indices) > 5 else ''}")
+
+    report("ピッチが 0〜127 の範囲外です", (pitch < 0) | (pitch > 127))
+    report("音符の長さが0以下です", duration <= 0)
+    report("発音時刻が前の音符より前に戻っています", np.r_[False, np.diff(time) < 0])
+    report(f"音符が区間の開始 ({start}) より前にあります", time < start)
+    if end is not None:
+        report(f"音符が区間の終了 ({end}) を超えています", time + duration > end)
+
+    # 声部ごとに発音時刻順へ並べ、前の音符の終わりが次の音符の頭を越えていないかを見る
+    voice = np.zeros_like(pitch) if monophonic else pitch
+    order = np.lexsort((time, voice))
+    same_voice = voice[order][1:] == voice[order][:-1]
+    overlap = same_voice & ((time + duration)[order][:-1] > time[order][1:])
+    report("同じ声部の音符が重なっています", np.r_[False, overlap][np.argsort(order)])
+    return violations
+
+def check_notes(notes_data, start=0, end=None, monophonic=True, context=''):
+    """
+    音符データが不変条件を満たしているかを検査し、違反があれば例外を送出します。
+
+    Args:
+        notes_data (list): 検査する音符データ。
+        start (int): 音符が収まるべき区間の開始位置（ティック）。
+        end (int, optional): 音符が収まるべき区間の終了位置（ティック）。
+        monophonic (bool): 全音符を1声部として扱うかどうか（find_violations を参照）。
+        context (str): エラーメッセージの先頭に付ける説明（例: '3小節目'）。
+
+    Raises:
+        InvariantError: 不変条件の違反が見つかった場合。
+    """
+    violations = find_violations(notes_data, start, end, monophonic)
+    if violations:
+        prefix = f"{context}: " if context else ''
+        raise InvariantError(prefix + ' / '.join(violations))
+
+def fuzz_transforms(iterations=200, seed=None):
+    """
+    transformations モジュールのすべての transform_* 関数に、ランダムな拍子・モチーフを与えて
+    不変条件と「入力を書き換えない」ことを検査します。
+
+    Args:
+        iterations (int): 試行回数。各試行ですべての変換を1回ずつ実行します。
+        seed (int, optional): 乱数のシード。同じシードなら同じ入力列で検査します。
+
+    Raises:
+        InvariantError: いずれかの変換が不変条件を破った場合。入力・拍子・変換名をメッセージに含みます。
+    """
+    from . import transformations
+    from .meter import get_meter
+    from .music_theory import SCALES
+
+    transforms = [
+        func for name, func in inspect.getmembers(transformations, inspect.isfunction)
+        if name.startswith('transform_')
+    ]
+    rng = random.Random(seed)
+    meters = [(4, 4), (3, 4), (2, 4), (6, 8), (7, 8), (5, 4), (12, 8)]
+    keys = list(SCALES)
+
+    for _ in range(iterations):
+        numerator, denominator = rng.choice(meters)
+        meter = get_meter(numerator, denominator, 480)
+        scale = SCALES[rng.choice(keys)]
+
+        # 小節に収まるモチーフを、音価の単位（16分音符〜小節全体）をランダムに選んで作る
+        measure_data, position = [], 0
+        while position < meter.ticks_per_measure and rng.random() < 0.9:
+            duration = min(rng.choice([60, 120, 160, 240, 360, 480, 720, 960]), meter.ticks_per_measure - position)
+            measure_data.append({'pitch': rng.randint(36, 96), 'time': position, 'duration': duration})
+            position += duration
+
+        for func in transforms:
+            snapshot = [note.copy() for note in measure_data]
+            result = func(measure_data, None, scale, meter.ticks_per_beat, meter=meter)
+            context = f"{func.__name__} ({meter}, 入力 {snapshot})"
+            if measure_data != snapshot:
+                raise InvariantError(f"{context}: 入力の音符データが書き換えられました。")
+            if any(result_note is input_note for result_note in result for input_note in measure_data):
+                raise InvariantError(f"{context}: 入力と同じ音符オブジェクトが出力に含まれています。")
+            check_notes(result, 0, meter.ticks_per_measure, context=context)
@@ -0,0 +1,108 @@
+"""
+設定の編集に合わせて曲を作り直す「ライブモード」のためのセッション。
+
+ライブモードでは、同じセッションの間はシードを固定したまま、設定が変わるたびに曲を生成し直します。
+各小節は小節ごとに導出したシードで生成され（core/seeding.py）、生成済みの小節はコード・モチーフ・
+変換チェーンなどをキーにしてキャッシュされるため、実際に作り直されるのは内容が変わる小節だけです。
+"""
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .generator import MelodyGenerator
+from .melody_config import MelodyConfig
+
+@dataclass
+class LiveUpdate:
+    """
+    ライブモードでの1回の更新結果。
+
+    Attributes:
+        config (MelodyConfig): 生成に使った設定（シードはセッションのもの）。
+        melody_data (List[dict]): メロディーの音符データ。
+        accompaniment_data (List[dict]): 伴奏の音符データ。
+        changed_measures (Tuple[int, ...]): 前回の結果から音符が変わった小節の番号（0始まり）。
+        elapsed (float): 生成にかかった時間（秒）。
+    """
+    config: MelodyConfig
+    melody_data: List[dict]
+    accompaniment_data: List[dict]
+    changed_measures: Tuple[int, ...]
+    elapsed: float
+
+def split_measures(notes_data, ticks_per_measure, num_measures):
+    """曲頭からの絶対時間の音符データを、発音時刻で小節ごとのリストに振り分けます。"""
+    measures = [[] for _ in range(num_measures)]
+    for note in notes_data:
+        measures[min(note['time'] // ticks_per_measure, num_measures - 1)].append(note)
+    return measures
+
+class LiveSession:
+    """
+    設定の変更に合わせて、変わった小節だけを生成し直すライブモードのセッション。
+
+    Example:
+        session = LiveSession()
+        result = session.update(config)
+        result = session.update(config.replace(chord_progression=new_progression))
+        print(result.changed_measures)
+    """
+
+    def __init__(self, seed: Optional[int] = None, logger=None, max_cached_measures: int = 4096):
+        """
+        Args:
+            seed (int, optional): セッション中に使うシード。設定にシードがない場合に使います。
+                                  省略時はランダムに決めます。
+            logger (logging.Logger, optional): 生成処理のログ出力用のロガー。
+            max_cached_measures (int): キャッシュする小節数の上限。超えた場合はキャッシュを空にします。
+        """
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_cached_measures = max_cached_measures
+        self.measure_cache = {}
+        self.last_update: Optional[LiveUpdate] = None
+        self._last_measures = []
+
+    def update(self, config: MelodyConfig) -> LiveUpdate:
+        """
+        設定に基づいて曲を生成し直し、前回から変わった小節とともに返します。
+        設定が前回と同じ場合は、前回の結果をそのまま返します。
+        """
+        if config.seed is None:
+            config = config.replace(seed=self.seed)
+        if self.last_update is not None and config == self.last_update.config:
+            return self.last_update
+
+        started = time.perf_counter()
+        if len(self.measure_cache) > self.max_cached_measures:
+            self.measure_cache.clear()
+        generator = MelodyGenerator(config, logger=self.logger, measure_cache=self.measure_cache)
+        generator.generate()
+
+        ticks_per_measure = config.meter.ticks_per_measure
+        measures = list(zip(
+            split_measures(generator.melody_data, ticks_per_measure, config.num_measures),
+            split_measures(generator.accompaniment_data, ticks_per_measure, config.num_measures),
+        ))
+        changed = tuple(
+            i for i, measure in enumerate(measures)
+            if i >= len(self._last_measures) or measure != self._last_measures[i]
+        )
+        self._last_measures = measures
+        self.last_update = LiveUpdate(
+            config=config,
+            melody_data=generator.melody_data,
+            accompaniment_data=generator.accompaniment_data,
+            changed_measures=changed,
+            elapsed=time.perf_counter() - started,
+        )
+        return self.last_update
+
+    def reset(self, seed: Optional[int] = None):
+        """シードを選び直し、キャッシュと前回の結果を破棄します。"""
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.measure_cache.clear()
+        self.last_update = None
+        self._last_measures = []
@@ -0,0 +1,136 @@
+"""
+生成パイプラインの構造化ログ。
+
+ログは「イベント名 + フィールド」の形で記録します。log_event() はロガーのレベルを最初に確認し、
+出力されない場合は文字列を一切組み立てません。人が読むメッセージは logging の遅延フォーマット
+（'%(name)s' 形式）で、ハンドラが実際に出力するときに初めて作られます。
+
+生成1回ごとの実行ID（run_id）を contextvars で保持し、各レコードに付けます。JsonLinesFormatter
+（json_lines_handler()）を使うと、レコードを1行1つの JSON として機械的に処理できる形で出力できます。
+
+Example:
+    logger = logging.getLogger('melody_generator')
+    logger.addHandler(json_lines_handler('generation.jsonl'))
+    logger.setLevel(logging.INFO)
+    with run_context():
+        log_event(logger, 'measure_composed', '%(measure)d小節目', measure=1, chord='C')
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import time
+import uuid
+
+# 現在の実行ID（生成1回、スイープ1回などの単位）
+run_id_var = contextvars.ContextVar('melody_generator_run_id', default=None)
+
+def new_run_id() -> str:
+    """新しい実行IDを作ります。"""
+    return uuid.uuid4().hex[:12]
+
+@contextlib.contextmanager
+def run_context(run_id=None):
+    """
+    with ブロックの中で記録されるログに、実行IDを付けます。
+
+    Args:
+        run_id (str, optional): 使う実行ID。省略時は新しく作ります。
+
+    Yields:
+        str: 実行ID。
+    """
+    token = run_id_var.set(run_id or new_run_id())
+    try:
+        yield run_id_var.get()
+    finally:
+        run_id_var.reset(token)
+
+def log_event(logger, event, message=None, level=logging.INFO, **fields):
+    """
+    構造化されたイベントをログに記録します。ロガーが level を出力しない場合は何もしません。
+
+    Args:
+        logger (logging.Logger): 出力先のロガー。
+        event (str): イベント名（'measure_composed' など）。
+        message (str, optional): 人が読むためのメッセージ。'%(フィールド名)s' の形でフィールドを参照でき、
+                                 ハンドラが出力するときに初めてフォーマットされます。省略時はイベント名。
+        level (int): ログレベル。
+        **fields: イベントのフィールド。関数（lazy() の戻り値など）を渡すと、出力時にだけ呼び出されます。
+    """
+    if not logger.isEnabledFor(level):
+        return
+    run_id = fields.pop('run_id', None) or run_id_var.get()
+    # LogRecord は空の辞書を引数として展開しないため、フィールドがなければ引数なしで渡す
+    # （そうしないと getMessage() の '%' で TypeError になる）
+    args = (_Fields(fields),) if fields else ()
+    logger.log(level, message or event, *args,
+               extra={'event': event, 'event_fields': fields, 'run_id': run_id})
+
+def lazy(func, *args):
+    """log_event() のフィールドに渡す、出力時にだけ計算する値を作ります。"""
+    return _Lazy(func, args)
+
+class _Lazy:
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+
+    def __call__(self):
+        return self.func(*self.args)
+
+def _resolve(value):
+    return value() if isinstance(value, _Lazy) else value
+
+class _Fields(dict):
+    """遅延フォーマット用の引数。メッセージ中の '%(name)s' の参照時に、遅延値を計算します。"""
+
+    def __getitem__(self, key):
+        return _resolve(super().__getitem__(key))
+
+class JsonLinesFormatter(logging.Formatter):
+    """ログレコードを1行の JSON に変換するフォーマッター。"""
+
+    def format(self, record):
+        data = {
+            'time': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': getattr(record, 'event', None),
+            'run_id': getattr(record, 'run_id', None) or run_id_var.get(),
+        }
+        fields = getattr(record, 'event_fields', None)
+        if fields:
+            data.update({name: _resolve(value) for name, value in fields.items()})
+        data['message'] = record.getMessage()
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+def json_lines_handler(target, level=logging.NOTSET):
+    """
+    JSON Lines 形式で出力するハンドラを作ります。
+
+    Args:
+        target (str or file-like): 出力先のファイルパス（追記）またはストリーム。
+        level (int): ハンドラのログレベル。
+    """
+    if isinstance(target, str):
+        handler = logging.FileHandler(target, mode='a', encoding='utf-8')
+    else:
+        handler = logging.StreamHandler(target)
+    handler.setFormatter(JsonLinesFormatter())
+    handler.setLevel(level)
+    return handler
+
+class Stopwatch:
+    """経過時間をミリ秒で返す小さなヘルパー（イベントの elapsed_ms フィールド用）。"""
+    __slots__ = ('start',)
+
+    def __init__(self):
+        self.start = time.perf_counter()
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self.start) * 1000, 3)
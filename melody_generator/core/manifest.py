@@ -0,0 +1,203 @@
+"""
+生成結果の再現に必要な情報（マニフェスト）を記録し、そこから曲を再レンダリングするモジュール。
+
+マニフェストには設定（シードを含む）と設定のハッシュ、ライブラリのバージョン、小節ごとに選ばれた
+変換チェーン、実際に使われた伴奏スタイルを記録します。MIDIファイルにはテキストのメタイベントとして
+埋め込まれ、MIDI以外の出力（WAV・LMMS）には '<出力ファイル名>.manifest.json' のサイドカーとして保存されます。
+
+rerender() は生成戦略を使わず、記録された変換チェーンと伴奏スタイルをそのまま再生して曲を作り直します。
+各小節の乱数はシードから小節ごとに導出されるため、記録時と同じ音符データになります。
+
+Example:
+    manifest = read_manifest('dataset/00042.mid')
+    generator = rerender(manifest)
+    generator.save_wav('00042.wav')
+"""
+import json
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .melody_config import MelodyConfig
+from .accompaniment import ACCOMPANIMENT_MAP, PROGRESSION_ACCOMPANIMENT_MAP
+from .registry import get_transform, transform_info
+
+# マニフェストの形式のバージョン
+MANIFEST_VERSION = 1
+# 生成結果に影響するライブラリのバージョン（変換や伴奏の出力が変わる変更をしたら上げる）
+LIBRARY_VERSION = '1.0'
+# MIDIファイルのテキストイベントで、マニフェストであることを示す接頭辞
+MANIFEST_TEXT_PREFIX = 'melody_generator.manifest='
+SIDECAR_SUFFIX = '.manifest.json'
+
+class ManifestError(ValueError):
+    """マニフェストの読み込み・検証、またはマニフェストからの再現に失敗したことを表すエラー。"""
+
+@dataclass(frozen=True)
+class Manifest:
+    """
+    1曲分のマニフェスト。
+
+    Attributes:
+        config (dict): 生成に使った設定（MelodyConfig.to_dict() の形）。
+        config_hash (str): 設定のハッシュ。
+        seed (int, optional): シード。
+        chains (Tuple[Tuple[str, ...], ...]): 小節ごとの変換チェーン（変換操作の登録名）。
+        accompaniment_style (str, optional): 実際に使われた伴奏スタイル（伴奏なしなら None）。
+        library_version (str): 生成したライブラリのバージョン。
+        version (int): マニフェストの形式のバージョン。
+    """
+    config: dict
+    config_hash: str
+    seed: Optional[int]
+    chains: Tuple[Tuple[str, ...], ...]
+    accompaniment_style: Optional[str] = None
+    library_version: str = LIBRARY_VERSION
+    version: int = MANIFEST_VERSION
+
+    def to_json(self) -> str:
+        """区切りの空白を省いた JSON 文字列（ASCII のみ）に変換します。"""
+        data = {
+            'version': self.version,
+            'library_version': self.library_version,
+            'config_hash': self.config_hash,
+            'seed': self.seed,
+            'chains': [list(chain) for chain in self.chains],
+            'accompaniment_style': self.accompaniment_style,
+            'config': self.config,
+        }
+        return json.dumps(data, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text: str) -> 'Manifest':
+        """
+        to_json() の文字列からマニフェストを作ります。
+
+        Raises:
+            ManifestError: JSON として読めない場合、項目が欠けている場合、または未対応の形式の場合。
+        """
+        try:
+            data = json.loads(text)
+            if data['version'] > MANIFEST_VERSION:
+                raise ManifestError(f"未対応のマニフェストの形式です: version {data['version']}")
+            return cls(
+                config=dict(data['config']),
+                config_hash=data['config_hash'],
+                seed=data['seed'],
+                chains=tuple(tuple(chain) for chain in data['chains']),
+                accompaniment_style=data.get('accompaniment_style'),
+                library_version=data.get('library_version', ''),
+                version=data['version'],
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            if isinstance(e, ManifestError):
+                raise
+            raise ManifestError(f"マニフェストを読み込めませんでした: {e}") from e
+
+    def melody_config(self) -> MelodyConfig:
+        """
+        記録された設定から MelodyConfig を作ります。
+
+        Raises:
+            ManifestError: 設定が不正な場合、または設定のハッシュが記録と一致しない場合。
+        """
+        try:
+            config = MelodyConfig(**self.config)
+        except (TypeError, ValueError) as e:
+            raise ManifestError(f"マニフェストの設定が不正です: {e}") from e
+        if config.config_hash != self.config_hash:
+            raise ManifestError(f"設定のハッシュが記録と一致しません（記録: {self.config_hash}, 再計算: {config.config_hash}）。")
+        return config
+
+    def composition(self) -> List[list]:
+        """
+        記録された変換チェーンを、変換関数のリストの構成に戻します。
+
+        Raises:
+            ManifestError: 登録されていない変換操作が含まれる場合。
+        """
+        try:
+            return [[get_transform(name).func for name in chain] for chain in self.chains]
+        except ValueError as e:
+            raise ManifestError(f"マニフェストの変換チェーンを再現できません: {e}") from e
+
+def build_manifest(config: MelodyConfig, composition: List, accompaniment_style: Optional[str] = None) -> Manifest:
+    """
+    生成に使った設定と構成からマニフェストを作ります。
+
+    Args:
+        config (MelodyConfig): 生成に使った設定。
+        composition (List): 小節ごとの変換チェーン（変換関数のリスト）。
+        accompaniment_style (str, optional): 実際に使われた伴奏スタイル。
+    """
+    chains = tuple(tuple(transform_info(func).name for func in chain) for chain in composition)
+    return Manifest(config.to_dict(), config.config_hash, config.seed, chains, accompaniment_style)
+
+def manifest_text(manifest: Manifest) -> str:
+    """MIDIファイルのテキストイベントに埋め込む文字列を返します。"""
+    return MANIFEST_TEXT_PREFIX + manifest.to_json()
+
+def sidecar_path(output_path: str) -> str:
+    """出力ファイルに対応するサイドカーのパスを返します。"""
+    return output_path + SIDECAR_SUFFIX
+
+def write_sidecar(manifest: Manifest, output_path: str) -> str:
+    """マニフェストを出力ファイルのサイドカーとして保存し、そのパスを返します。"""
+    path = sidecar_path(output_path)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(manifest.to_json())
+        f.write('\n')
+    return path
+
+def read_manifest(path: str) -> Manifest:
+    """
+    ファイルからマニフェストを読み込みます。MIDIファイルの場合は埋め込まれたテキストイベントを、
+    それ以外の場合はサイドカー（path 自体がサイドカーならそのファイル）を読みます。
+
+    Raises:
+        ManifestError: マニフェストが見つからない、または読み込めない場合。
+    """
+    if os.path.splitext(path)[1].lower() in ('.mid', '.midi'):
+        from melody_generator.utils.midi_utils import read_text_events
+        for text in read_text_events(path):
+            if text.startswith(MANIFEST_TEXT_PREFIX):
+                return Manifest.from_json(text[len(MANIFEST_TEXT_PREFIX):])
+        if not os.path.exists(sidecar_path(path)):
+            raise ManifestError(f"'{path}' にマニフェストが埋め込まれていません。")
+    if not path.endswith(SIDECAR_SUFFIX):
+        path = sidecar_path(path)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return Manifest.from_json(f.read())
+    except OSError as e:
+        raise ManifestError(f"マニフェスト '{path}' を読み込めませんでした: {e}") from e
+
+def rerender(manifest: Manifest, logger=None, executor=None):
+    """
+    マニフェストから曲を再レンダリングします。生成戦略や伴奏スタイルの抽選は行わず、記録された
+    変換チェーンと伴奏スタイルをそのまま使います。
+
+    Args:
+        manifest (Manifest): 再現する曲のマニフェスト。
+        logger (logging.Logger, optional): ログ出力用のロガー。
+        executor (concurrent.futures.Executor, optional): 小節を並列に生成するエグゼキューター。
+
+    Returns:
+        MelodyGenerator: 生成済みの MelodyGenerator（save_midi() などでそのまま書き出せます）。
+
+    Raises:
+        ManifestError: シードがない（再現できない）場合、または設定・変換チェーン・伴奏スタイルが
+                       このライブラリに登録されていない場合。
+    """
+    from .generator import MelodyGenerator
+
+    if manifest.seed is None:
+        raise ManifestError("シードなしで生成された曲は再現できません。")
+    config = manifest.melody_config()
+    style = manifest.accompaniment_style
+    if config.play_chords and style not in ACCOMPANIMENT_MAP and style not in PROGRESSION_ACCOMPANIMENT_MAP:
+        raise ManifestError(f"記録された伴奏スタイル '{style}' は定義されていません。ライブラリのバージョンを確認してください "
+                            f"（記録: {manifest.library_version}, 現在: {LIBRARY_VERSION}）。")
+    generator = MelodyGenerator(config, logger=logger)
+    generator.generate(executor=executor, composition=manifest.composition(), accompaniment_style=style)
+    return generator
@@ -1,23 +1,127 @@
-from dataclasses import dataclass
-from typing import List, Tuple
+import dataclasses
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
 
-from .music_theory import SCALES
+from .music_theory import SCALES, KEY_NAMES, get_chord
+from .meter import Meter, get_meter
+from .strategies import get_strategy
+from .constraints import MELODY_MODES
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MelodyConfig:
-    """メロディー生成のための設定を保持するデータクラス。"""
+    """
+    メロディー生成のための設定を保持するデータクラス。
+
+    変更不可（frozen）で、リストで渡された値はタプルに変換して保持します。
+    そのため辞書のキーやキャッシュのキーとしてそのまま使え、パラメータを変えた設定は
+    replace() で安価に作れます（変更しない値は元の設定と共有されます）。
+    """
     key: str
-    chord_progression: List[str]
+    chord_progression: Tuple[str, ...]
     num_measures: int
     ticks_per_beat: int
     beats_per_measure: int
-    motif_notes: List[Tuple[int, int]]
+    motif_notes: Tuple[Tuple[int, int], ...]
     play_chords: bool = True
     accompaniment_generator: str = 'random'
+    humanize: bool = False
+    seed: Optional[int] = None
+    beat_unit: int = 4
+    beat_grouping: Optional[Tuple[int, ...]] = None
+    strategy: str = 'chord_progression'
+    # 'snap'（各音を最も近いコードトーンへ補正）または 'constraint'（制約を満たす音高を探索）
+    melody_mode: str = 'snap'
+    # 拍子から事前計算したグリッド（__post_init__ で設定）
+    meter: Meter = field(init=False, repr=False, compare=False)
+    # 設定内容から計算した安定したハッシュ値（プロセスや実行をまたいでも同じ値になる）
+    config_hash: str = field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
-        """初期化後のバリデーション。"""
+        """初期化後の正規化とバリデーション。"""
+        # frozen なので、正規化した値は object.__setattr__ で設定する
+        object.__setattr__(self, 'chord_progression', tuple(self.chord_progression))
+        object.__setattr__(self, 'motif_notes', tuple((int(p), int(d)) for p, d in self.motif_notes))
+        if self.beat_grouping:
+            object.__setattr__(self, 'beat_grouping', tuple(self.beat_grouping))
+
         if self.key not in SCALES:
-            raise ValueError(f"キー '{self.key}' は定義されていません。利用可能なキー: {list(SCALES.keys())}")
+            raise ValueError(f"キー '{self.key}' は定義されていません。利用可能なキー: {KEY_NAMES}")
+        if self.num_measures <= 0:
+            raise ValueError(f"小節数は1以上である必要があります: {self.num_measures}")
         if len(self.chord_progression) < self.num_measures:
-            raise ValueError("コード進行の長さが、生成する小節数より短いです。")
\ No newline at end of file
+            raise ValueError("コード進行の長さが、生成する小節数より短いです。")
+        for symbol in self.chord_progression:
+            get_chord(symbol)  # 未知のコードなら ValueError（結果はキャッシュされる）
+        object.__setattr__(self, 'meter', get_meter(
+            self.beats_per_measure, self.beat_unit, self.ticks_per_beat, self.beat_grouping or None
+        ))
+        self.meter.validate_motif(self.motif_notes)
+        get_strategy(self.strategy)  # 未知の生成戦略なら ValueError
+        if self.melody_mode not in MELODY_MODES:
+            raise ValueError(f"メロディーの生成モード '{self.melody_mode}' は定義されていません。利用可能: {MELODY_MODES}")
+
+        canonical = json.dumps(self.to_dict(), sort_keys=True, separators=(',', ':'))
+        object.__setattr__(self, 'config_hash', hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest())
+
+    def __hash__(self):
+        return hash(self.config_hash)
+
+    def __reduce__(self):
+        # プロセス間で送る際は入力値だけを送り、受け側で meter やハッシュを復元する
+        return (_config_from_values, (tuple(getattr(self, f.name) for f in _INIT_FIELDS),))
+
+    def replace(self, **changes) -> 'MelodyConfig':
+        """
+        一部の値だけを変更した新しい設定を返します（パラメータスイープ向け）。
+
+        Example:
+            variants = [base.replace(seed=s) for s in range(1000)]
+        """
+        return dataclasses.replace(self, **changes)
+
+    def to_dict(self) -> dict:
+        """JSON などで表現できる形（タプルはリスト）の辞書に変換します。"""
+        data = {}
+        for f in _INIT_FIELDS:
+            value = getattr(self, f.name)
+            if isinstance(value, tuple):
+                value = [list(v) if isinstance(v, tuple) else v for v in value]
+            data[f.name] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'MelodyConfig':
+        """to_dict() の結果（または同じ形の辞書）から設定を作ります。"""
+        unknown = set(data) - {f.name for f in _INIT_FIELDS}
+        if unknown:
+            raise ValueError(f"未知の設定項目があります: {sorted(unknown)}")
+        return cls(**data)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text: str) -> 'MelodyConfig':
+        return cls.from_dict(json.loads(text))
+
+    def to_msgpack(self) -> bytes:
+        """msgpack 形式に変換します（msgpack パッケージが必要です）。"""
+        return _require_msgpack().packb(self.to_dict(), use_bin_type=True)
+
+    @classmethod
+    def from_msgpack(cls, data: bytes) -> 'MelodyConfig':
+        return cls.from_dict(_require_msgpack().unpackb(data, raw=False))
+
+_INIT_FIELDS = tuple(f for f in dataclasses.fields(MelodyConfig) if f.init)
+
+def _config_from_values(values):
+    return MelodyConfig(*values)
+
+def _require_msgpack():
+    try:
+        import msgpack
+    except ImportError as e:
+        raise ImportError("msgpack 形式での保存には msgpack パッケージが必要です（pip install msgpack）。") from e
+    return msgpack
@@ -1,68 +1,262 @@
 import logging
-from typing import List
+import random
+from itertools import accumulate
+from typing import Iterator, List, MutableMapping, Optional, Tuple
 
 from .melody_config import MelodyConfig
-from .strategies import strategy_chord_progression
-from .music_theory import SCALES, CHORDS, snap_to_chord
+from .strategies import get_strategy
+from .music_theory import SCALES, resolve_progression, snap_to_mask
 from .transformations import transform_add_passing_notes
+from .invariants import check_notes
+from .registry import is_pure_chain
+from .constraints import MelodyConstraints, solve_pitches
+from .seeding import derive_seed, derived_random
+from .log_events import lazy, log_event
 
 class MelodyProcessor:
     """メロディー生成の具体的な処理を担当するクラス。"""
 
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, constraints: Optional[MelodyConstraints] = None,
+                 measure_cache: Optional[MutableMapping] = None):
+        """
+        Args:
+            logger (logging.Logger, optional): ログ出力用のロガー。
+            constraints (MelodyConstraints, optional): 制約モードのパラメータ。
+            measure_cache (MutableMapping, optional): 生成した小節を再利用するためのキャッシュ（辞書など）。
+                シード付きの設定では、各小節の結果はその小節のコード・モチーフ・変換チェーン・キー・拍子と
+                小節ごとに導出したシードだけで決まるため、これらが同じ小節は再生成せずにキャッシュから返します。
+                ライブモードのように、少しずつ変えた設定で何度も生成する場合に使います。
+        """
         self.logger = logger or logging.getLogger(__name__)
+        self.constraints = constraints or MelodyConstraints()
+        self.measure_cache = measure_cache
+        # 直近の生成で使った構成（小節ごとの変換チェーン）。生成結果のマニフェストに記録する
+        self.composition = None
 
-    def process(self, config: MelodyConfig) -> List[dict]:
+    def process(self, config: MelodyConfig, check_invariants: bool = False, executor=None,
+                composition: Optional[List] = None) -> List[dict]:
         """
         設定に基づき、メロディーデータを生成します。
 
         Args:
             config (MelodyConfig): メロディー生成のための設定。
+            check_invariants (bool): True の場合、生成した各小節が不変条件（音符の重なりや
+                                     小節からのはみ出しがないこと等）を満たすかを検査します。
+            executor (concurrent.futures.Executor, optional): 指定すると、小節をチャンクに分けて並列に生成します。
+                数千小節の長い曲向けです。シード付きの設定では、結果は逐次生成した場合と同じになります。
+                ProcessPoolExecutor を使う場合、構成に含まれる変換関数は pickle できる必要があります。
+            composition (List, optional): 小節ごとの変換チェーン。指定すると生成戦略を使わずにこの構成で生成します
+                                          （マニフェストからの再レンダリング用）。
 
         Returns:
             List[dict]: 生成されたメロディーデータのリスト。
         """
+        melody_data = []
+        for _, measure_data in self.iter_measures(config, check_invariants, executor=executor, composition=composition):
+            melody_data.extend(measure_data)
+        return melody_data
+
+    def iter_measures(self, config: MelodyConfig, check_invariants: bool = False,
+                      executor=None, composition: Optional[List] = None) -> Iterator[Tuple[int, List[dict]]]:
+        """
+        process() と同じメロディーを、1小節生成するごとに返すジェネレーター。
+
+        制約モードでは曲全体を見て音高を決めるため、全小節の生成と音高の探索が終わってから順に返します。
+        executor を指定した場合は、全小節を並列に生成してから順に返します。
+
+        Yields:
+            Tuple[int, List[dict]]: (小節番号（0始まり）, その小節の音符データ（曲頭からの絶対時間）)。
+        """
         # 1. 準備
         scale = SCALES[config.key]
-        ticks_per_measure = config.ticks_per_beat * config.beats_per_measure
-        # TODO: 将来的にはstrategyもconfigから選択できるようにする
-        composition = strategy_chord_progression(num_measures=config.num_measures)
+        ticks_per_measure = config.meter.ticks_per_measure
+        # シード付きの場合、構成は小節の内容と独立した乱数で決める（コードやモチーフを変えても構成は変わらない）
+        if composition is None:
+            composition = get_strategy(config.strategy)(
+                num_measures=config.num_measures, rng=derived_random(config.seed, 'composition')
+            )
+        elif len(composition) != config.num_measures:
+            raise ValueError(f"構成の小節数 ({len(composition)}) が、生成する小節数 ({config.num_measures}) と一致しません。")
+        self.composition = composition
         base_measure_data = self._initialize_motif_data(config)
 
-        # 2. メロディーの全小節を生成
-        melody_data = self._generate_melody_measures(
-            config, composition, base_measure_data, scale, ticks_per_measure
-        )
+        # 2. メロディーの各小節を生成
+        if executor is None:
+            measures = self._iter_melody_measures(
+                config, composition, base_measure_data, scale, ticks_per_measure, check_invariants
+            )
+        else:
+            measures = self._render_parallel(config, composition, executor, check_invariants)
+        if config.melody_mode != 'constraint':
+            yield from enumerate(measures)
+            return
+        measures = list(measures)
+        self._apply_constraints(config, [note for measure_data in measures for note in measure_data])
+        yield from enumerate(measures)
+
+    def _apply_constraints(self, config: MelodyConfig, melody_data: List[dict]) -> List[dict]:
+        """
+        リズムはそのままに、制約を満たす音高へ置き換えます。
+        制限時間内に解が見つからない場合は、通常の（コードトーンへ補正した）メロディーをそのまま返します。
+        """
+        chords = resolve_progression(config.chord_progression)
+        pitches = solve_pitches(melody_data, chords, config.key, config.meter, self.constraints)
+        if pitches is None:
+            log_event(self.logger, 'constraint_fallback',
+                      "制約を満たすメロディーが制限時間内に見つからなかったため、通常の生成結果を使用します。",
+                      level=logging.WARNING)
+            return melody_data
+        for note, pitch in zip(melody_data, pitches):
+            note['pitch'] = pitch
         return melody_data
 
+    def _log_measure(self, index: int, filter_chain: List, chord):
+        log_event(self.logger, 'measure_composed', "  - %(measure)d小節目: %(chain)s (コード: %(chord)s)",
+                  measure=index + 1, chain=lazy(_chain_names, filter_chain), chord=chord.symbol)
+
     def _initialize_motif_data(self, config: MelodyConfig) -> List[dict]:
-        base_measure_data = []
-        current_motif_time = 0
-        for pitch, duration in config.motif_notes:
-            base_measure_data.append({'pitch': pitch, 'time': current_motif_time, 'duration': duration})
-            current_motif_time += duration
-        return base_measure_data
-
-    def _generate_melody_measures(self, config: MelodyConfig, composition: List, base_measure_data: List[dict], scale: List[int], ticks_per_measure: int) -> List[dict]:
-        full_melody_data = []
+        return _motif_measure(config)
+
+    def _measure_key(self, config: MelodyConfig, index: int, filter_chain: List, chord) -> Optional[tuple]:
+        """小節キャッシュのキーを返します。キャッシュを使わない（使えない）小節の場合は None。"""
+        if self.measure_cache is None:
+            return None
+        measure_seed = _measure_seed(config, index)
+        if measure_seed is None and not is_pure_chain(filter_chain):
+            return None
+        meter = config.meter
+        meter_key = (meter.numerator, meter.denominator, meter.ticks_per_beat, meter.grouping)
+        return (tuple(filter_chain), chord.symbol, config.motif_notes, config.key, meter_key, measure_seed)
+
+    def _iter_melody_measures(self, config: MelodyConfig, composition: List, base_measure_data: List[dict], scale: List[int], ticks_per_measure: int, check_invariants: bool = False) -> Iterator[List[dict]]:
         current_total_time = 0
-        self.logger.info("今回のメロディー構成:")
+        # コード進行は最初に一度だけ Chord の列へ変換しておく
+        chords = resolve_progression(config.chord_progression)
+        # 乱数を使わない変換チェーンの結果は、同じ曲の中で再利用する（AA'BA'' の identity など）
+        pure_chain_cache = {}
+        # 小節ごとのログは、出力されるときだけ組み立てる（レベルの確認もループの外で一度だけ行う）
+        log_measures = self.logger.isEnabledFor(logging.INFO)
+        log_event(self.logger, 'composition', "今回のメロディー構成:", num_measures=len(composition))
         for i, filter_chain in enumerate(composition):
-            processed_data = [note.copy() for note in base_measure_data]
-            for transform_func in filter_chain:
-                processed_data = transform_func(processed_data, config.key, scale, config.ticks_per_beat)
-
-            current_chord_name = config.chord_progression[i]
-            chord_notes = CHORDS.get(current_chord_name)
-            chain_names = ' -> '.join([f.__name__ for f in filter_chain])
-            self.logger.info(f"  - {i+1}小節目: {chain_names} (コード: {current_chord_name})")
-            if chord_notes:
-                for note in processed_data:
-                    note['pitch'] = snap_to_chord(note['pitch'], chord_notes)
-
-            processed_data = transform_add_passing_notes(processed_data, config.key, scale, config.ticks_per_beat)
+            chord = chords[i]
+            if log_measures:
+                self._log_measure(i, filter_chain, chord)
+
+            measure_key = self._measure_key(config, i, filter_chain, chord)
+            cached = self.measure_cache.get(measure_key) if measure_key is not None else None
+            if cached is not None:
+                processed_data = [note.copy() for note in cached]
+            else:
+                processed_data = _render_measure(
+                    config, i, filter_chain, chord, base_measure_data, scale, pure_chain_cache, check_invariants
+                )
+                if measure_key is not None:
+                    self.measure_cache[measure_key] = [note.copy() for note in processed_data]
             for note in processed_data:
                 note['time'] += current_total_time
-                full_melody_data.append(note)
+            yield processed_data
             current_total_time += ticks_per_measure
-        return full_melody_data
\ No newline at end of file
+
+    def _render_parallel(self, config: MelodyConfig, composition: List, executor, check_invariants: bool = False,
+                         chunk_size: int = None) -> List[List[dict]]:
+        """
+        各小節を executor で並列に生成し、曲頭からの絶対時間の小節のリストを返します。
+
+        小節どうしの依存は開始時刻だけなので、小節をチャンクに分けてワーカーで小節頭からの相対時間のまま生成し、
+        各小節の開始時刻（小節の長さの累積和）を後から足して連結します。
+        """
+        chunk_size = chunk_size or PARALLEL_CHUNK_MEASURES
+        chords = resolve_progression(config.chord_progression)
+        log_measures = self.logger.isEnabledFor(logging.INFO)
+        log_event(self.logger, 'composition', "今回のメロディー構成:", num_measures=len(composition))
+        measures = [None] * len(composition)
+        keys = [None] * len(composition)
+        pending = []  # キャッシュにない小節の番号
+        for i, filter_chain in enumerate(composition):
+            if log_measures:
+                self._log_measure(i, filter_chain, chords[i])
+            keys[i] = self._measure_key(config, i, filter_chain, chords[i])
+            cached = self.measure_cache.get(keys[i]) if keys[i] is not None else None
+            if cached is not None:
+                measures[i] = [note.copy() for note in cached]
+            else:
+                pending.append(i)
+
+        futures = []
+        for start in range(0, len(pending), chunk_size):
+            indices = pending[start:start + chunk_size]
+            chains = [composition[i] for i in indices]
+            futures.append((indices, executor.submit(_render_chunk, config, indices, chains, check_invariants)))
+        for indices, future in futures:
+            for i, processed_data in zip(indices, future.result()):
+                measures[i] = processed_data
+                if keys[i] is not None:
+                    self.measure_cache[keys[i]] = [note.copy() for note in processed_data]
+
+        # 各小節の開始時刻 = それより前の小節の長さの累積和
+        offsets = accumulate((config.meter.ticks_per_measure for _ in measures), initial=0)
+        for measure_data, offset in zip(measures, offsets):
+            for note in measure_data:
+                note['time'] += offset
+        return measures
+
+# 並列生成で、1回のタスクとしてワーカーに渡す小節数
+PARALLEL_CHUNK_MEASURES = 64
+
+def _chain_names(filter_chain):
+    return ' -> '.join([f.__name__ for f in filter_chain])
+
+def _motif_measure(config: MelodyConfig) -> List[dict]:
+    """モチーフを1小節分の音符データ（小節頭からの相対時間）に変換します。"""
+    base_measure_data = []
+    current_motif_time = 0
+    for pitch, duration in config.motif_notes:
+        base_measure_data.append({'pitch': pitch, 'time': current_motif_time, 'duration': duration})
+        current_motif_time += duration
+    return base_measure_data
+
+def _measure_seed(config: MelodyConfig, index: int) -> Optional[int]:
+    # シード付きの場合、各小節の変換には小節番号から導出した乱数を使う
+    return derive_seed(config.seed, 'measure', index) if config.seed is not None else None
+
+def _render_measure(config: MelodyConfig, index: int, filter_chain: List, chord, base_measure_data: List[dict],
+                    scale: List[int], pure_chain_cache: dict, check_invariants: bool = False) -> List[dict]:
+    """
+    1小節分のメロディーを、小節頭からの相対時間で生成します。
+
+    結果はモチーフ・変換チェーン・コード・キー・拍子と小節ごとのシードだけで決まり、ほかの小節には依存しません。
+    pure_chain_cache には、乱数を使わない変換チェーンの（コードへの補正前の）結果を保存して再利用します。
+    """
+    chain_key = tuple(filter_chain)
+    cached = pure_chain_cache.get(chain_key)
+    if cached is not None:
+        processed_data = [note.copy() for note in cached]
+    else:
+        measure_seed = _measure_seed(config, index)
+        rng = random.Random(measure_seed) if measure_seed is not None else None
+        processed_data = [note.copy() for note in base_measure_data]
+        for transform_func in filter_chain:
+            processed_data = transform_func(processed_data, config.key, scale, config.ticks_per_beat,
+                                            meter=config.meter, rng=rng)
+        if is_pure_chain(filter_chain):
+            pure_chain_cache[chain_key] = [note.copy() for note in processed_data]
+
+    for note in processed_data:
+        note['pitch'] = snap_to_mask(note['pitch'], chord.mask)
+
+    processed_data = transform_add_passing_notes(processed_data, config.key, scale, config.ticks_per_beat, meter=config.meter)
+    if check_invariants:
+        check_notes(processed_data, 0, config.meter.ticks_per_measure,
+                    context=f"{index+1}小節目 ({_chain_names(filter_chain)})")
+    return processed_data
+
+def _render_chunk(config: MelodyConfig, indices: List[int], chains: List, check_invariants: bool = False) -> List[List[dict]]:
+    """並列生成のワーカーで、指定した番号の小節を生成し、小節頭からの相対時間の音符データのリストを返します。"""
+    scale = SCALES[config.key]
+    chords = resolve_progression(config.chord_progression)
+    base_measure_data = _motif_measure(config)
+    pure_chain_cache = {}
+    return [
+        _render_measure(config, i, chain, chords[i], base_measure_data, scale, pure_chain_cache, check_invariants)
+        for i, chain in zip(indices, chains)
+    ]
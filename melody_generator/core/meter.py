@@ -0,0 +1,154 @@
+"""
+拍子（メーター）と、それに基づくティックのグリッドを扱うモジュール。
+
+変換操作や伴奏スタイルは 4/4 拍子を前提にせず、このモジュールの Meter が
+事前計算した拍の位置・細分グリッドを参照します。
+"""
+from functools import lru_cache
+
+import numpy as np
+
+class Meter:
+    """
+    拍子記号と拍のまとまり（グルーピング）を表し、小節内のティックグリッドを事前計算して保持するクラス。
+
+    ここでの「拍」はグルーピングの1単位を指します（例: 6/8拍子なら付点4分音符が1拍）。
+
+    Attributes:
+        numerator (int): 拍子の分子。
+        denominator (int): 拍子の分母（2のべき乗）。
+        ticks_per_beat (int): MIDIの分解能（4分音符あたりのティック数）。
+        grouping (tuple): 分母の音符いくつで1拍とするかの並び（合計は分子と等しい）。
+        unit_ticks (int): 分母の音符1つ分のティック数。
+        ticks_per_measure (int): 1小節のティック数。
+        beat_starts (tuple): 小節頭からの各拍の開始位置。
+        beat_lengths (tuple): 各拍の長さ。
+        strong_beats (tuple): 強拍の開始位置。
+        is_compound (bool): 複合拍子（各拍が3分割される拍子）かどうか。
+        division_ticks (int): 拍の基本的な分割単位（単純拍子では拍の1/2、複合拍子では1/3）。
+    """
+    __slots__ = (
+        'numerator', 'denominator', 'ticks_per_beat', 'grouping', 'unit_ticks', 'ticks_per_measure',
+        'beat_starts', 'beat_lengths', 'strong_beats', 'is_compound', 'division_ticks', '_grids',
+    )
+
+    def __init__(self, numerator=4, denominator=4, ticks_per_beat=480, grouping=None):
+        if numerator <= 0:
+            raise ValueError(f"拍子の分子は1以上である必要があります: {numerator}")
+        if denominator <= 0 or denominator & (denominator - 1):
+            raise ValueError(f"拍子の分母は2のべき乗である必要があります: {denominator}")
+        if (ticks_per_beat * 4) % denominator:
+            raise ValueError(f"分解能 {ticks_per_beat} では 1/{denominator} 音符を表現できません。")
+        if grouping is None:
+            grouping = default_grouping(numerator, denominator)
+        grouping = tuple(grouping)
+        if sum(grouping) != numerator or any(g <= 0 for g in grouping):
+            raise ValueError(f"拍のグルーピング {grouping} の合計が拍子の分子 {numerator} と一致しません。")
+
+        self.numerator = numerator
+        self.denominator = denominator
+        self.ticks_per_beat = ticks_per_beat
+        self.grouping = grouping
+        self.unit_ticks = ticks_per_beat * 4 // denominator
+        self.ticks_per_measure = self.unit_ticks * numerator
+        self.beat_lengths = tuple(g * self.unit_ticks for g in grouping)
+        starts, position = [], 0
+        for length in self.beat_lengths:
+            starts.append(position)
+            position += length
+        self.beat_starts = tuple(starts)
+        # 1拍目は常に強拍。拍数が偶数なら後半の頭（4/4の3拍目など）も強拍とする
+        half = len(starts) // 2
+        self.strong_beats = (0, starts[half]) if len(starts) % 2 == 0 and half > 0 else (0,)
+        self.is_compound = all(g == 3 for g in grouping) and denominator >= 8
+        self.division_ticks = self.beat_lengths[0] // (3 if self.is_compound else 2)
+        self._grids = {}
+
+    def __repr__(self):
+        return f"Meter({self.numerator}/{self.denominator}, grouping={self.grouping})"
+
+    def __eq__(self, other):
+        return isinstance(other, Meter) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def _key(self):
+        return (self.numerator, self.denominator, self.ticks_per_beat, self.grouping)
+
+    def grid(self, parts_per_beat):
+        """
+        各拍を parts_per_beat 等分したグリッドを返します（連符のグリッドにも使えます）。
+        結果は分割数ごとにキャッシュされます。
+
+        Returns:
+            tuple: (開始位置, 長さ) のタプルの並び。端数は各拍の最後の区間で吸収します。
+        """
+        cells = self._grids.get(parts_per_beat)
+        if cells is None:
+            cells = []
+            for start, length in zip(self.beat_starts, self.beat_lengths):
+                step = length // parts_per_beat
+                for i in range(parts_per_beat):
+                    cell_start = start + i * step
+                    cell_length = step if i < parts_per_beat - 1 else start + length - cell_start
+                    cells.append((cell_start, cell_length))
+            cells = self._grids[parts_per_beat] = tuple(cells)
+        return cells
+
+    def beat_index(self, time):
+        """小節頭からの位置 time（ティック）が属する拍の番号を返します。"""
+        position = time % self.ticks_per_measure
+        for index in range(len(self.beat_starts) - 1, -1, -1):
+            if position >= self.beat_starts[index]:
+                return index
+        return 0
+
+    def is_strong(self, time):
+        """位置 time（ティック）が強拍の頭かどうかを返します。"""
+        return time % self.ticks_per_measure in self.strong_beats
+
+    def beat_index_array(self, times):
+        """beat_index のベクトル版。times（曲頭からのティックの配列）の各拍番号と、拍の頭かどうかを返します。"""
+        position = np.asarray(times) % self.ticks_per_measure
+        starts = np.asarray(self.beat_starts)
+        index = np.searchsorted(starts, position, side='right') - 1
+        return index, position == starts[index]
+
+    def validate_motif(self, motif_notes):
+        """
+        モチーフが1小節に収まるかを検証します。設定ごとに一度だけ呼び出されることを想定しています。
+
+        Args:
+            motif_notes (list): (ピッチ, 長さ) のタプルのリスト。
+
+        Returns:
+            int: モチーフの合計の長さ（ティック）。
+
+        Raises:
+            ValueError: 長さが0以下の音符がある場合や、モチーフが1小節を超える場合。
+        """
+        total = 0
+        for pitch, duration in motif_notes:
+            if duration <= 0:
+                raise ValueError(f"モチーフの音符 ({pitch}, {duration}) の長さが0以下です。")
+            total += duration
+        if total > self.ticks_per_measure:
+            raise ValueError(
+                f"モチーフの長さ ({total} ticks) が1小節 ({self.ticks_per_measure} ticks, "
+                f"{self.numerator}/{self.denominator}拍子) を超えています。"
+            )
+        return total
+
+def default_grouping(numerator, denominator):
+    """拍子記号から標準的な拍のまとまりを決めます（6/8, 9/8, 12/8 は3つずつ、5/8, 7/8 は2と3の組み合わせ）。"""
+    if denominator >= 8 and numerator % 3 == 0 and numerator > 3:
+        return (3,) * (numerator // 3)
+    if denominator >= 8 and numerator in (5, 7):
+        return (2,) * ((numerator - 3) // 2) + (3,)
+    return (1,) * numerator
+
+@lru_cache(maxsize=None)
+def get_meter(numerator=4, denominator=4, ticks_per_beat=480, grouping=None):
+    """同じ引数に対して同じ Meter を返します（グリッドの事前計算を共有するため）。"""
+    return Meter(numerator, denominator, ticks_per_beat, grouping)
@@ -0,0 +1,234 @@
+"""
+生成したメロディーの品質指標を、多数の曲についてまとめて計算するモジュール。
+
+曲の集合は、全曲の音符を連結した1つの構造化配列（NOTE_DTYPE）と、各曲の開始位置の配列 offsets
+（長さは曲数 + 1）で表します。指標はすべて NumPy のベクトル演算で計算するため、
+10万曲規模の評価も数秒で終わります。生成戦略の比較（ベンチマーク）や、バッチ生成で
+条件を満たす曲だけを残すフィルター（select()、core/sweep.py の metric_bounds）に使えます。
+
+計算する指標（曲ごと）:
+    notes                 音符数
+    pitch_min, pitch_max  最低音・最高音
+    pitch_range           音域（半音）
+    mean_interval         隣り合う音の平均の跳躍幅（半音）
+    interval_histogram    跳躍幅の分布（0〜12半音と、オクターブを超える跳躍の14区分。合計1）
+    pitch_class_entropy   ピッチクラスの出現頻度のエントロピー（ビット。最大 log2(12) ≒ 3.58）
+    chord_tone_coverage   その小節のコードトーンである音符の割合
+    chord_tone_ratio      拍の頭の音符のうち、コードトーンである割合
+    note_density          4分音符あたりの音符数
+    syncopation           シンコペーション（拍の頭以外で始まり、次の拍をまたぐ音符）の割合
+    self_similarity       セクション（section_measures 小節ずつ）どうしの類似度の平均（0〜1）
+"""
+from typing import Dict, Iterable
+
+import numpy as np
+
+from melody_generator.utils.note_array import NOTE_DTYPE, notes_to_array
+from .music_theory import resolve_progression
+
+# 曲ごとに1つの値を持つ指標（interval_histogram 以外）
+SCALAR_METRICS = (
+    'notes', 'pitch_min', 'pitch_max', 'pitch_range', 'mean_interval', 'pitch_class_entropy',
+    'chord_tone_coverage', 'chord_tone_ratio', 'note_density', 'syncopation', 'self_similarity',
+)
+
+# 跳躍幅の分布の区分数（0〜12半音 + オクターブ超）
+INTERVAL_BINS = 14
+
+def pack_pieces(pieces: Iterable):
+    """
+    曲の並びを、連結した音符配列と各曲の開始位置に変換します。
+
+    Args:
+        pieces (Iterable): 各曲の音符データ（辞書のリスト、または NOTE_DTYPE の配列）の並び。
+
+    Returns:
+        Tuple[numpy.ndarray, numpy.ndarray]: (NOTE_DTYPE の連結配列, 開始位置の int64 配列（長さは曲数 + 1）)。
+    """
+    arrays = [piece if isinstance(piece, np.ndarray) else notes_to_array(piece) for piece in pieces]
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum([len(array) for array in arrays], out=offsets[1:])
+    notes = np.concatenate(arrays) if arrays else np.empty(0, dtype=NOTE_DTYPE)
+    return notes, offsets
+
+def _piece_context(configs):
+    """各曲の設定から、指標の計算に必要な拍子・コードの情報を配列にまとめます。"""
+    count = len(configs)
+    ticks_per_measure = np.empty(count, dtype=np.int64)
+    ticks_per_beat = np.empty(count, dtype=np.int64)
+    num_measures = np.empty(count, dtype=np.int64)
+    meter_ids = np.empty(count, dtype=np.int64)
+    meters = {}        # 拍子 -> 番号（同じ拍子の曲をまとめて処理する）
+    progressions = {}  # コード進行 -> コードのビットマスクのタプル
+    masks = []
+    for p, config in enumerate(configs):
+        meter = config.meter
+        ticks_per_measure[p] = meter.ticks_per_measure
+        ticks_per_beat[p] = config.ticks_per_beat
+        num_measures[p] = config.num_measures
+        meter_ids[p] = meters.setdefault(meter, len(meters))
+        chord_masks = progressions.get(config.chord_progression)
+        if chord_masks is None:
+            chord_masks = progressions[config.chord_progression] = tuple(
+                chord.mask for chord in resolve_progression(config.chord_progression)
+            )
+        masks.append(chord_masks[:config.num_measures])
+    measure_offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(num_measures, out=measure_offsets[1:])
+    chord_masks = np.fromiter((mask for piece_masks in masks for mask in piece_masks),
+                              dtype=np.int64, count=int(measure_offsets[-1]))
+    return ticks_per_measure, ticks_per_beat, num_measures, meter_ids, list(meters), measure_offsets, chord_masks
+
+def _ratio(numerator, denominator):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator > 0, numerator / np.maximum(denominator, 1), np.nan)
+
+def batch_metrics(notes, offsets, configs, section_measures: int = 2) -> Dict[str, np.ndarray]:
+    """
+    曲の集合の品質指標をまとめて計算します。
+
+    Args:
+        notes (numpy.ndarray): 全曲のメロディーを連結した NOTE_DTYPE の配列（各曲の中は時間順）。
+        offsets (numpy.ndarray): 各曲の開始位置（長さは曲数 + 1）。pack_pieces() の結果をそのまま渡せます。
+        configs (Sequence[MelodyConfig]): 各曲の生成に使った設定（拍子とコード進行を参照します）。
+        section_measures (int): 自己類似度を計算するセクションの長さ（小節数）。
+
+    Returns:
+        Dict[str, numpy.ndarray]: 指標名 -> 曲ごとの値の配列（interval_histogram は (曲数, 14) の配列）。
+                                  音符のない曲など、計算できない値は NaN です。
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    count = len(offsets) - 1
+    if len(configs) != count:
+        raise ValueError(f"設定の数 ({len(configs)}) と曲の数 ({count}) が一致しません。")
+    (ticks_per_measure, ticks_per_beat, num_measures, meter_ids, meters,
+     measure_offsets, chord_masks) = _piece_context(configs)
+
+    counts = np.diff(offsets)
+    piece = np.repeat(np.arange(count), counts)  # 各音符の曲番号
+    pitch = notes['pitch'].astype(np.int64)
+    time = notes['time'].astype(np.int64)
+    duration = notes['duration'].astype(np.int64)
+    pitch_class = pitch % 12
+    measure = np.minimum(time // ticks_per_measure[piece], num_measures[piece] - 1)
+    result = {'notes': counts.astype(np.float64)}
+
+    # 音域（音符のある曲だけを reduceat で集計する）
+    nonempty = counts > 0
+    pitch_min = np.full(count, np.nan)
+    pitch_max = np.full(count, np.nan)
+    if nonempty.any():
+        starts = offsets[:-1][nonempty]
+        pitch_min[nonempty] = np.minimum.reduceat(pitch, starts)
+        pitch_max[nonempty] = np.maximum.reduceat(pitch, starts)
+    result['pitch_min'] = pitch_min
+    result['pitch_max'] = pitch_max
+    result['pitch_range'] = pitch_max - pitch_min
+
+    # 跳躍（曲の境界をまたぐ組は除く）
+    same_piece = piece[1:] == piece[:-1]
+    interval = np.abs(np.diff(pitch))[same_piece]
+    interval_piece = piece[1:][same_piece]
+    interval_counts = np.bincount(interval_piece, minlength=count)
+    result['mean_interval'] = _ratio(np.bincount(interval_piece, weights=interval, minlength=count), interval_counts)
+    histogram = np.bincount(interval_piece * INTERVAL_BINS + np.minimum(interval, INTERVAL_BINS - 1),
+                            minlength=count * INTERVAL_BINS).reshape(count, INTERVAL_BINS).astype(np.float64)
+    result['interval_histogram'] = histogram / np.maximum(interval_counts, 1)[:, None]
+
+    # ピッチクラスのエントロピー
+    pc_histogram = np.bincount(piece * 12 + pitch_class, minlength=count * 12).reshape(count, 12)
+    probability = pc_histogram / np.maximum(counts, 1)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = -np.where(probability > 0, probability * np.log2(probability), 0.0).sum(axis=1)
+    result['pitch_class_entropy'] = np.where(nonempty, entropy, np.nan)
+
+    # コードトーン
+    chord_tone = (chord_masks[measure_offsets[piece] + measure] >> pitch_class) & 1 == 1
+    result['chord_tone_coverage'] = _ratio(np.bincount(piece, weights=chord_tone, minlength=count), counts)
+
+    # 拍の位置（同じ拍子の曲ごとにまとめて計算する）
+    on_beat = np.zeros(len(notes), dtype=bool)
+    syncopated = np.zeros(len(notes), dtype=bool)
+    note_meter = meter_ids[piece]
+    for meter_id, meter in enumerate(meters):
+        selected = np.flatnonzero(note_meter == meter_id)
+        if not len(selected):
+            continue
+        index, is_on_beat = meter.beat_index_array(time[selected])
+        next_beat = np.append(meter.beat_starts, meter.ticks_per_measure)[index + 1]
+        position = time[selected] % meter.ticks_per_measure
+        on_beat[selected] = is_on_beat
+        syncopated[selected] = ~is_on_beat & (position + duration[selected] > next_beat)
+    result['chord_tone_ratio'] = _ratio(np.bincount(piece, weights=chord_tone & on_beat, minlength=count),
+                                        np.bincount(piece, weights=on_beat, minlength=count))
+    result['syncopation'] = _ratio(np.bincount(piece, weights=syncopated, minlength=count), counts)
+    result['note_density'] = counts / (num_measures * ticks_per_measure / ticks_per_beat)
+
+    # 自己類似度: セクションごとの（長さで重み付けした）ピッチクラス分布の、全ペアのコサイン類似度の平均
+    sections = -(-num_measures // section_measures)
+    section_offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(sections, out=section_offsets[1:])
+    section = section_offsets[piece] + measure // section_measures
+    profile = np.bincount(section * 12 + pitch_class, weights=duration,
+                          minlength=int(section_offsets[-1]) * 12).reshape(-1, 12)
+    norm = np.linalg.norm(profile, axis=1)
+    unit = profile / np.where(norm > 0, norm, 1.0)[:, None]
+    total = np.add.reduceat(unit, section_offsets[:-1], axis=0) if count else np.empty((0, 12))
+    self_norms = np.add.reduceat((norm > 0).astype(np.float64), section_offsets[:-1]) if count else np.empty(0)
+    pair_sum = ((total ** 2).sum(axis=1) - self_norms) / 2
+    result['self_similarity'] = _ratio(pair_sum, sections * (sections - 1) / 2)
+    return result
+
+def piece_metrics(config, melody_data, section_measures: int = 2) -> Dict[str, float]:
+    """1曲分の指標を計算し、指標名 -> 値（float。interval_histogram はリスト）の辞書で返します。"""
+    notes, offsets = pack_pieces([melody_data])
+    metrics = batch_metrics(notes, offsets, [config], section_measures)
+    return {name: values[0].tolist() for name, values in metrics.items()}
+
+def summarize(metrics: Dict[str, np.ndarray]) -> Dict[str, Dict[str, float]]:
+    """
+    曲ごとの指標を、集合全体の統計量（平均・標準偏差・最小・中央値・最大）にまとめます（NaN は除外）。
+    生成戦略どうしを比較するベンチマークの集計に使います。
+    """
+    summary = {}
+    for name in SCALAR_METRICS:
+        values = metrics[name][~np.isnan(metrics[name])]
+        if not len(values):
+            summary[name] = {key: float('nan') for key in ('mean', 'std', 'min', 'median', 'max')}
+            continue
+        summary[name] = {
+            'mean': float(values.mean()), 'std': float(values.std()), 'min': float(values.min()),
+            'median': float(np.median(values)), 'max': float(values.max()),
+        }
+    summary['interval_histogram'] = metrics['interval_histogram'].mean(axis=0).tolist() if len(
+        metrics['interval_histogram']) else []
+    return summary
+
+def select(metrics: Dict[str, np.ndarray], bounds: Dict[str, tuple]) -> np.ndarray:
+    """
+    すべての指標が範囲内に収まる曲を表すブール配列を返します（バッチ生成のフィルター用）。
+
+    Args:
+        metrics (Dict[str, numpy.ndarray]): batch_metrics() の結果。
+        bounds (Dict[str, tuple]): 指標名 -> (下限, 上限)。None の側は制限しません。NaN の曲は範囲外とみなします。
+
+    Example:
+        keep = select(metrics, {'chord_tone_coverage': (0.7, None), 'pitch_range': (None, 19)})
+    """
+    unknown = set(bounds) - set(SCALAR_METRICS)
+    if unknown:
+        raise ValueError(f"未知の指標があります: {sorted(unknown)}。利用可能な指標: {list(SCALAR_METRICS)}")
+    keep = np.ones(len(metrics['notes']), dtype=bool)
+    for name, (low, high) in bounds.items():
+        values = metrics[name]
+        keep &= ~np.isnan(values)
+        if low is not None:
+            keep &= values >= low
+        if high is not None:
+            keep &= values <= high
+    return keep
+
+def within_bounds(values: Dict[str, float], bounds: Dict[str, tuple]) -> bool:
+    """piece_metrics() の結果が、bounds（select() と同じ形式）の範囲にすべて収まるかを返します。"""
+    return bool(select({name: np.array([value]) for name, value in values.items()
+                        if name in SCALAR_METRICS}, bounds)[0])
@@ -1,30 +1,281 @@
 """
 音楽理論に関する定義とヘルパー関数をまとめたモジュール。
+
+スケールとコードは12音すべてのルートについてプログラムで生成し、
+ピッチクラスのビットマスク（ビットiがピッチクラスiを表す12ビット整数）として
+事前計算しておきます。これにより、ホットループ内での参照や補正が O(1) で行えます。
 """
+import re
+from functools import lru_cache
+
+# --- 音名とピッチクラス ---
+
+# UIなどで表示する標準的なルート音名（ピッチクラス 0〜11 の順）
+NOTE_NAMES = ['C', 'Db', 'D', 'Eb', 'E', 'F', 'F#', 'G', 'Ab', 'A', 'Bb', 'B']
+
+# 移調後の音名を綴るための表記（シャープ系／フラット系）
+SHARP_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+FLAT_NAMES = ['C', 'Db', 'D', 'Eb', 'E', 'F', 'Gb', 'G', 'Ab', 'A', 'Bb', 'B']
+
+# 幹音のピッチクラス
+_NATURAL_PITCH_CLASSES = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+
+# 異名同音を含む、受け付けるすべてのルート音名
+ROOT_SPELLINGS = sorted(set(SHARP_NAMES + FLAT_NAMES), key=lambda n: (len(n), n))
+
+def note_name_to_pitch_class(name):
+    """
+    音名（例: 'C', 'F#', 'Bb'）をピッチクラス（0〜11）に変換します。
+
+    Raises:
+        ValueError: 音名として解釈できない場合。
+    """
+    if not name or name[0] not in _NATURAL_PITCH_CLASSES or any(c not in '#b' for c in name[1:]):
+        raise ValueError(f"音名 '{name}' を解釈できません。")
+    return (_NATURAL_PITCH_CLASSES[name[0]] + name.count('#') - name.count('b')) % 12
+
+# --- スケール ---
+
+# モードごとの主音からの音程（半音数）
+MODE_INTERVALS = {
+    'major':          (0, 2, 4, 5, 7, 9, 11),  # 長音階（イオニアン）
+    'minor':          (0, 2, 3, 5, 7, 8, 10),  # 自然的短音階（エオリアン）
+    'harmonic_minor': (0, 2, 3, 5, 7, 8, 11),  # 和声的短音階
+    'melodic_minor':  (0, 2, 3, 5, 7, 9, 11),  # 旋律的短音階（上行形）
+    'dorian':         (0, 2, 3, 5, 7, 9, 10),
+    'phrygian':       (0, 1, 3, 5, 7, 8, 10),
+    'lydian':         (0, 2, 4, 6, 7, 9, 11),
+    'mixolydian':     (0, 2, 4, 5, 7, 9, 10),
+    'locrian':        (0, 1, 3, 5, 6, 8, 10),
+}
+
+def _tonic_pitch(root_pc):
+    """主音のMIDIノート番号を、中央のC(60)付近（54〜65）に配置します。"""
+    return 60 + root_pc if root_pc < 6 else 48 + root_pc
 
-# 主要なキーのスケール（音階）をMIDIノート番号で定義します。
+def pitch_class_mask(pitches):
+    """MIDIノート番号（またはピッチクラス）の並びから12ビットのピッチクラスマスクを作ります。"""
+    mask = 0
+    for pitch in pitches:
+        mask |= 1 << (pitch % 12)
+    return mask
+
+def _build_scale_tables():
+    scales, masks = {}, {}
+    for root_name in ROOT_SPELLINGS:
+        root_pc = note_name_to_pitch_class(root_name)
+        tonic = _tonic_pitch(root_pc)
+        for mode, intervals in MODE_INTERVALS.items():
+            key = f"{root_name}_{mode}"
+            scales[key] = [tonic + interval for interval in intervals]
+            masks[key] = pitch_class_mask(scales[key])
+    return scales, masks
+
+# キー名（例: 'C_major', 'F#_dorian'）ごとのスケールをMIDIノート番号で定義します。
 # リストの最初の音（例: C_majorの60）がそのキーの主音（トニック）です。
-SCALES = {
-    'C_major': [60, 62, 64, 65, 67, 69, 71],  # ハ長調
-    'G_major': [55, 57, 59, 60, 62, 64, 66],  # ト長調
-    'D_major': [62, 64, 66, 67, 69, 71, 73],  # ニ長調
-    'A_minor': [57, 59, 60, 62, 64, 65, 67],  # イ短調 (自然的短音階)
+SCALES, SCALE_MASKS = _build_scale_tables()
+
+# UIで選択肢として表示するキー名（異名同音は標準的な表記のみ）
+KEY_NAMES = [f"{root}_{mode}" for mode in MODE_INTERVALS for root in NOTE_NAMES]
+
+# --- コード ---
+
+# コードの種類（シンボルの接尾辞）ごとのルートからの音程（半音数）
+CHORD_QUALITIES = {
+    # トライアド
+    '':      (0, 4, 7),
+    'm':     (0, 3, 7),
+    'dim':   (0, 3, 6),
+    'aug':   (0, 4, 8),
+    'sus2':  (0, 2, 7),
+    'sus4':  (0, 5, 7),
+    # 6th / 7th
+    '6':     (0, 4, 7, 9),
+    'm6':    (0, 3, 7, 9),
+    '7':     (0, 4, 7, 10),
+    'maj7':  (0, 4, 7, 11),
+    'm7':    (0, 3, 7, 10),
+    'mM7':   (0, 3, 7, 11),
+    'm7b5':  (0, 3, 6, 10),
+    'dim7':  (0, 3, 6, 9),
+    '7sus4': (0, 5, 7, 10),
+    # テンション
+    'add9':  (0, 4, 7, 14),
+    '9':     (0, 4, 7, 10, 14),
+    'maj9':  (0, 4, 7, 11, 14),
+    'm9':    (0, 3, 7, 10, 14),
 }
 
-# Cメジャーキーでよく使われるコードの構成音を定義します。
-# ルート音(根音)を基準とした相対的な音程ではなく、MIDIノート番号で直接定義します。
-CHORDS = {
-    # ダイアトニックコード
-    'C':    [60, 64, 67],  # ド, ミ, ソ (I)
-    'Dm':   [62, 65, 69],  # レ, ファ, ラ (ii)
-    'Em':   [64, 67, 71],  # ミ, ソ, シ (iii)
-    'F':    [65, 69, 72],  # ファ, ラ, ド (IV)
-    'G':    [67, 71, 74],  # ソ, シ, レ (V)
-    'Am':   [69, 72, 76],  # ラ, ド, ミ (vi)
-    # セカンダリ・ドミナントなど
-    'G7':   [67, 71, 74, 78], # ソ, シ, レ, ファ (V7)
+# 表記ゆれを正規の接尾辞に揃えるための別名
+CHORD_QUALITY_ALIASES = {
+    'M': '', 'maj': '',
+    'min': 'm', '-': 'm',
+    '+': 'aug', 'o': 'dim', '°': 'dim',
+    'sus': 'sus4',
+    'M7': 'maj7', 'Maj7': 'maj7', 'Δ7': 'maj7',
+    'min7': 'm7', '-7': 'm7',
+    'ø': 'm7b5', 'ø7': 'm7b5',
+    'o7': 'dim7', '°7': 'dim7',
+    'mmaj7': 'mM7', 'minmaj7': 'mM7',
+    'M9': 'maj9',
 }
 
+_CHORD_SYMBOL_PATTERN = re.compile(r'^([A-G][#b]*)([^/]*)(?:/([A-G][#b]*))?$')
+
+@lru_cache(maxsize=None)
+def parse_chord_symbol(symbol):
+    """
+    コードシンボルを解析し、構成要素に分解します。
+    トライアド、セブンス、テンション、分数コード（例: 'C/E'）に対応します。
+
+    Args:
+        symbol (str): コードシンボル (例: 'Am', 'G7', 'Bbmaj7', 'C/E')。
+
+    Returns:
+        tuple: (ルートのピッチクラス, 正規化したコードの種類, ベースのピッチクラスまたはNone)。
+
+    Raises:
+        ValueError: シンボルを解釈できない場合。
+    """
+    match = _CHORD_SYMBOL_PATTERN.match(symbol.strip()) if symbol else None
+    if not match:
+        raise ValueError(f"コード '{symbol}' を解釈できません。")
+    root_name, quality, bass_name = match.groups()
+    quality = CHORD_QUALITY_ALIASES.get(quality, quality)
+    if quality not in CHORD_QUALITIES:
+        raise ValueError(f"コード '{symbol}' の種類 '{quality}' は定義されていません。")
+    root_pc = note_name_to_pitch_class(root_name)
+    bass_pc = note_name_to_pitch_class(bass_name) if bass_name else None
+    return root_pc, quality, bass_pc
+
+def build_chord_voicing(root_pc, quality, bass_pc=None):
+    """
+    コードの基本形のボイシングをMIDIノート番号で生成します。
+    ルートは C4(60)〜B4(71) に置き、分数コードのベース音はルートの下に加えます。
+    """
+    root_pitch = 60 + root_pc
+    voicing = [root_pitch + interval for interval in CHORD_QUALITIES[quality]]
+    if bass_pc is not None and bass_pc != root_pc:
+        voicing.insert(0, root_pitch - ((root_pc - bass_pc) % 12))
+    return voicing
+
+def _build_chord_tables():
+    chords, masks = {}, {}
+    for root_name in ROOT_SPELLINGS:
+        root_pc = note_name_to_pitch_class(root_name)
+        for quality in CHORD_QUALITIES:
+            voicing = build_chord_voicing(root_pc, quality)
+            chords[root_name + quality] = voicing
+            masks[root_name + quality] = pitch_class_mask(voicing)
+    return chords, masks
+
+# 全12ルート × 全コードの種類について、構成音（MIDIノート番号）とピッチクラスマスクを事前計算します。
+# 分数コードや別名表記は get_chord で必要になった時点で解析し、Chord としてキャッシュします。
+CHORDS, CHORD_MASKS = _build_chord_tables()
+
+class Chord:
+    """
+    解析済みのコードを表す値オブジェクト。
+    get_chord() によってシンボルごとに一度だけ生成・共有（インターン）されるため、
+    小節ごとの処理では属性参照だけで構成音やマスクを取得できます。
+
+    Attributes:
+        symbol (str): コードシンボル (例: 'Am7')。
+        root (int): ルートのピッチクラス (0〜11)。
+        quality (str): 正規化したコードの種類 (CHORD_QUALITIES のキー)。
+        bass (int or None): 分数コードのベースのピッチクラス。
+        mask (int): 構成音のピッチクラスマスク。
+        voicing (tuple): 基本ボイシングのMIDIノート番号（低い順）。
+    """
+    __slots__ = ('symbol', 'root', 'quality', 'bass', 'mask', 'voicing')
+
+    def __init__(self, symbol, root, quality, bass, voicing):
+        self.symbol = symbol
+        self.root = root
+        self.quality = quality
+        self.bass = bass
+        self.voicing = tuple(voicing)
+        self.mask = pitch_class_mask(self.voicing)
+
+    def __repr__(self):
+        return f"Chord({self.symbol!r})"
+
+    def transpose(self, semitones):
+        """指定した半音数だけ移調したコードを返します。"""
+        return get_chord(transpose_chord_symbol(self.symbol, semitones))
+
+# シンボル文字列 -> Chord のインターン表
+_CHORD_CACHE = {}
+
+def get_chord(symbol):
+    """
+    コードシンボルに対応する Chord を返します。同じシンボルには常に同じインスタンスを返します。
+
+    Raises:
+        ValueError: シンボルを解釈できない場合。
+    """
+    chord = _CHORD_CACHE.get(symbol)
+    if chord is None:
+        root, quality, bass = parse_chord_symbol(symbol)
+        voicing = CHORDS.get(symbol) or build_chord_voicing(root, quality, bass)
+        chord = _CHORD_CACHE[symbol] = Chord(symbol, root, quality, bass, voicing)
+    return chord
+
+def resolve_progression(chord_symbols):
+    """
+    コード進行（シンボルのリスト）を Chord のリストに一括変換します。
+
+    Raises:
+        ValueError: 解釈できないコードが含まれている場合。
+    """
+    return [get_chord(symbol) for symbol in chord_symbols]
+
+def transpose_chord_symbol(symbol, semitones, prefer_flats=None):
+    """
+    コードシンボルを指定した半音数だけ移調したシンボルを返します。
+
+    Args:
+        symbol (str): 移調元のコードシンボル (例: 'C/E')。
+        semitones (int): 移調する半音数（負の値で下方向）。
+        prefer_flats (bool, optional): フラット表記を使うか。Noneの場合は元のルート表記に合わせる。
+
+    Returns:
+        str: 移調後のコードシンボル (例: 'D/F#')。
+    """
+    root_pc, quality, bass_pc = parse_chord_symbol(symbol)
+    if prefer_flats is None:
+        prefer_flats = 'b' in symbol.split('/')[0][1:2]
+    names = FLAT_NAMES if prefer_flats else SHARP_NAMES
+    transposed = names[(root_pc + semitones) % 12] + quality
+    if bass_pc is not None:
+        transposed += '/' + names[(bass_pc + semitones) % 12]
+    return transposed
+
+# --- 音の補正 ---
+
+@lru_cache(maxsize=None)
+def _snap_offsets(mask):
+    """
+    ピッチクラスマスクに対し、各ピッチクラスから最も近い構成音までの移動量（半音数）の表を返します。
+    等距離の場合は下側の音を優先します。マスクごとに一度だけ計算されます。
+    """
+    if not mask:
+        return (0,) * 12
+    offsets = []
+    for pc in range(12):
+        for dist in range(7):
+            if mask >> ((pc - dist) % 12) & 1:
+                offsets.append(-dist)
+                break
+            if mask >> ((pc + dist) % 12) & 1:
+                offsets.append(dist)
+                break
+    return tuple(offsets)
+
+def snap_to_mask(pitch, mask):
+    """指定された音(pitch)を、ピッチクラスマスクに含まれる最も近い音に O(1) で補正します。"""
+    return pitch + _snap_offsets(mask)[pitch % 12]
+
 def snap_to_scale(pitch, scale_notes):
     """指定された音(pitch)を、スケール内で最も近い音に補正するヘルパー関数。"""
     min_dist = float('inf')
@@ -43,14 +294,4 @@ def snap_to_chord(pitch, chord_notes):
     """指定された音(pitch)を、コード構成音(chord_notes)の中で最も近い音に補正するヘルパー関数。"""
     if not chord_notes:
         return pitch
-
-    min_dist = float('inf')
-    best_pitch = pitch
-    for chord_note_base in chord_notes:
-        for oct_offset in range(-2, 3):
-            current_chord_note = chord_note_base + 12 * oct_offset
-            dist = abs(pitch - current_chord_note)
-            if dist < min_dist:
-                min_dist = dist
-                best_pitch = current_chord_note
-    return best_pitch
\ No newline at end of file
+    return snap_to_mask(pitch, pitch_class_mask(chord_notes))
@@ -0,0 +1,282 @@
+"""
+設定プロファイル（TOML / JSON ファイル）の読み込みと、変更の自動反映（ホットリロード）を行うモジュール。
+
+プロファイルは MelodyConfig の各項目と出力先などを書いたファイルで、名前（拡張子を除いたファイル名）で
+選択します。次のディレクトリを順に探し、同じ名前があれば後のものが優先されます。
+
+    1. パッケージ同梱のプロファイル（melody_generator/profiles/）
+    2. ~/.melody_generator/profiles/
+    3. 環境変数 MELODY_GENERATOR_PROFILE_DIR（os.pathsep 区切りで複数指定可）
+
+`extends = "default"` と書くと、別のプロファイルの値を引き継いで差分だけを書けます。
+
+ProfileStore は、プロファイルを取得するたびに（check_interval 秒に一度だけ）元のファイルの
+更新時刻を確認し、変わっていれば読み込み直します。生成に使う MelodyConfig は取得時に作った
+値のコピーとしてワーカーへ渡るため、実行中のワーカープールを作り直す必要はありません。
+"""
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python 3.10 以前
+    tomllib = None
+
+from .melody_config import MelodyConfig, _INIT_FIELDS
+from .log_events import log_event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_NAME = 'default'
+PROFILE_DIR_ENV = 'MELODY_GENERATOR_PROFILE_DIR'
+BUILTIN_PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'profiles')
+USER_PROFILE_DIR = os.path.join('~', '.melody_generator', 'profiles')
+PROFILE_EXTENSIONS = ('.toml', '.json')
+
+# 項目名 -> 許可する型。MelodyConfig の項目に加えて、アプリケーション側の設定を持てます。
+PROFILE_SCHEMA = {
+    'key': str,
+    'chord_progression': list,
+    'num_measures': int,
+    'ticks_per_beat': int,
+    'beats_per_measure': int,
+    'motif_notes': list,
+    'play_chords': bool,
+    'accompaniment_generator': str,
+    'humanize': bool,
+    'seed': int,
+    'beat_unit': int,
+    'beat_grouping': list,
+    'strategy': str,
+    'melody_mode': str,
+    # --- MelodyConfig 以外の項目 ---
+    'output_path': str,
+    'description': str,
+    'extends': str,
+}
+
+# MelodyConfig に渡す項目
+CONFIG_KEYS = tuple(f.name for f in _INIT_FIELDS)
+
+class ProfileError(ValueError):
+    """プロファイルの読み込み・検証に失敗したことを表すエラー。"""
+
+@dataclass(frozen=True)
+class Profile:
+    """
+    読み込んだプロファイル。
+
+    Attributes:
+        name (str): プロファイル名。
+        settings (Mapping): 検証済みの設定（extends を解決した後の値）。
+        sources (Tuple[Tuple[str, float], ...]): 読み込んだファイルとその更新時刻（extends の元を含む）。
+    """
+    name: str
+    settings: Mapping = field(repr=False)
+    sources: Tuple[Tuple[str, float], ...] = field(repr=False)
+
+    @property
+    def path(self) -> str:
+        return self.sources[0][0]
+
+    @property
+    def description(self) -> str:
+        return self.settings.get('description', '')
+
+    @property
+    def output_path(self) -> Optional[str]:
+        path = self.settings.get('output_path')
+        return os.path.expanduser(path) if path else None
+
+    def config_values(self) -> dict:
+        """MelodyConfig に渡す項目だけの辞書を返します。"""
+        return {name: self.settings[name] for name in CONFIG_KEYS if name in self.settings}
+
+    def config(self, **overrides) -> MelodyConfig:
+        """プロファイルの値から MelodyConfig を作ります。overrides の値はプロファイルより優先されます。"""
+        values = self.config_values()
+        values.update(overrides)
+        return MelodyConfig(**values)
+
+    def is_stale(self) -> bool:
+        """元のファイル（extends の元を含む）のいずれかが、読み込み後に変更・削除されたかどうか。"""
+        for path, mtime in self.sources:
+            try:
+                if os.stat(path).st_mtime != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+def profile_dirs() -> List[str]:
+    """プロファイルを探すディレクトリのリスト（優先度の低い順）。"""
+    dirs = [BUILTIN_PROFILE_DIR, os.path.expanduser(USER_PROFILE_DIR)]
+    dirs.extend(d for d in os.environ.get(PROFILE_DIR_ENV, '').split(os.pathsep) if d)
+    return dirs
+
+def _read_file(path) -> dict:
+    """TOML または JSON のファイルを辞書として読み込みます。"""
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == '.toml':
+            if tomllib is None:
+                raise ProfileError(f"TOML のプロファイルには Python 3.11 以降が必要です（JSON を使ってください）: {path}")
+            with open(path, 'rb') as f:
+                data = tomllib.load(f)
+        elif extension == '.json':
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            raise ProfileError(f"プロファイルの形式は {PROFILE_EXTENSIONS} のいずれかである必要があります: {path}")
+    except (OSError, ValueError) as e:
+        if isinstance(e, ProfileError):
+            raise
+        raise ProfileError(f"プロファイル '{path}' を読み込めませんでした: {e}") from e
+    if not isinstance(data, dict):
+        raise ProfileError(f"プロファイル '{path}' の内容がキーと値の組ではありません。")
+    return data
+
+def validate_settings(settings: dict, source: str = '') -> dict:
+    """
+    設定の辞書をスキーマ（PROFILE_SCHEMA）と MelodyConfig の検証で確認し、正規化した辞書を返します。
+
+    Raises:
+        ProfileError: 未知の項目、型の誤り、または MelodyConfig として不正な値がある場合。
+    """
+    where = f"プロファイル '{source}'" if source else "プロファイル"
+    unknown = set(settings) - set(PROFILE_SCHEMA)
+    if unknown:
+        raise ProfileError(f"{where} に未知の項目があります: {sorted(unknown)}")
+    for name, value in settings.items():
+        expected = PROFILE_SCHEMA[name]
+        # bool は int のサブクラスなので、int の項目に true/false が書かれた場合も誤りとする
+        if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            raise ProfileError(f"{where} の '{name}' は {expected.__name__} である必要があります: {value!r}")
+    try:
+        config = MelodyConfig(**{name: settings[name] for name in CONFIG_KEYS if name in settings})
+    except (TypeError, ValueError) as e:
+        raise ProfileError(f"{where} の設定が不正です: {e}") from e
+    normalized = dict(settings)
+    normalized.update(config.to_dict())
+    # 明示されていない項目は MelodyConfig の既定値になるが、extends の差分と区別するため元の項目だけを残す
+    return {name: normalized[name] for name in settings}
+
+class ProfileStore:
+    """
+    プロファイルを名前で取得し、ファイルの変更を自動で反映するストア。
+
+    Example:
+        store = ProfileStore()
+        config = store.get('waltz').config(seed=1)
+    """
+
+    def __init__(self, dirs: Optional[List[str]] = None, check_interval: float = 1.0):
+        """
+        Args:
+            dirs (List[str], optional): プロファイルを探すディレクトリ（優先度の低い順）。省略時は profile_dirs()。
+            check_interval (float): ファイルの更新時刻を確認する最短の間隔（秒）。0 なら毎回確認します。
+        """
+        self._dirs = dirs
+        self.check_interval = check_interval
+        self._profiles: Dict[str, Profile] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def dirs(self) -> List[str]:
+        return self._dirs if self._dirs is not None else profile_dirs()
+
+    def find(self, name) -> str:
+        """プロファイル名からファイルのパスを探します。"""
+        found = None
+        for directory in self.dirs:
+            for extension in PROFILE_EXTENSIONS:
+                path = os.path.join(directory, name + extension)
+                if os.path.isfile(path):
+                    found = path
+        if found is None:
+            raise ProfileError(f"プロファイル '{name}' は見つかりません。利用可能なプロファイル: {self.names()}")
+        return found
+
+    def names(self) -> List[str]:
+        """利用可能なプロファイル名の一覧（名前順）。"""
+        names = set()
+        for directory in self.dirs:
+            if os.path.isdir(directory):
+                names.update(os.path.splitext(entry)[0] for entry in os.listdir(directory)
+                             if os.path.splitext(entry)[1].lower() in PROFILE_EXTENSIONS)
+        return sorted(names)
+
+    def get(self, name: str = DEFAULT_PROFILE_NAME) -> Profile:
+        """
+        プロファイルを取得します。読み込み済みの場合、元のファイルが変更されていれば読み込み直します。
+        変更後のファイルが不正な場合は警告を出し、直前に読み込めた内容を返し続けます。
+        """
+        with self._lock:
+            profile = self._profiles.get(name)
+            now = time.monotonic()
+            if profile is not None:
+                if now - self._checked_at.get(name, 0.0) < self.check_interval:
+                    return profile
+                self._checked_at[name] = now
+                if not profile.is_stale():
+                    return profile
+                try:
+                    profile = self._load(name)
+                except ProfileError as e:
+                    log_event(logger, 'profile_reload_failed',
+                              "プロファイル '%(profile)s' の再読み込みに失敗したため、以前の内容を使います: %(error)s",
+                              level=logging.WARNING, profile=name, error=e)
+                    return profile
+                log_event(logger, 'profile_reloaded', "プロファイル '%(profile)s' の変更を読み込みました。", profile=name)
+            else:
+                profile = self._load(name)
+                self._checked_at[name] = now
+            self._profiles[name] = profile
+            return profile
+
+    def _load(self, name, chain=()) -> Profile:
+        if name in chain:
+            raise ProfileError(f"プロファイルの extends が循環しています: {' -> '.join(chain + (name,))}")
+        path = self.find(name)
+        mtime = os.stat(path).st_mtime
+        data = _read_file(path)
+        settings = {}
+        sources = [(path, mtime)]
+        base_name = data.get('extends')
+        if base_name is not None:
+            if not isinstance(base_name, str):
+                raise ProfileError(f"プロファイル '{path}' の 'extends' は str である必要があります: {base_name!r}")
+            base = self._load(base_name, chain + (name,))
+            settings.update(base.settings)
+            settings.pop('extends', None)
+            sources.extend(base.sources)
+        settings.update(data)
+        return Profile(name, MappingProxyType(validate_settings(settings, path)), tuple(sources))
+
+_default_store = None
+
+def default_store() -> ProfileStore:
+    """プロセス共通の ProfileStore を返します。"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ProfileStore()
+    return _default_store
+
+def get_profile(name: str = DEFAULT_PROFILE_NAME) -> Profile:
+    """プロセス共通のストアからプロファイルを取得します。"""
+    return default_store().get(name)
+
+def load_profile(path: str) -> Profile:
+    """
+    ファイルのパスを指定してプロファイルを読み込みます（extends は同じディレクトリと既定の場所から探します）。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    name = os.path.splitext(os.path.basename(path))[0]
+    return ProfileStore(dirs=profile_dirs() + [directory], check_interval=0.0).get(name)
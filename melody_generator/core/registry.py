@@ -0,0 +1,148 @@
+"""
+変換操作（transform）と生成戦略（strategy）のレジストリ。
+
+各変換操作は、性質を表すメタデータ（TransformInfo）と一緒に登録されます。
+生成エンジンはこの性質を見て、決定的な変換チェーンの結果をキャッシュするなどの最適化を行います。
+
+サードパーティのプラグインは、パッケージのエントリーポイントとして次のグループに登録できます。
+プラグインは名前で参照されたとき・一覧が必要になったときに初めて読み込まれるため、起動は遅くなりません。
+
+    [project.entry-points."melody_generator.transforms"]
+    my_transform = "my_package.module:MY_TRANSFORM_INFO"   # TransformInfo または変換関数
+
+    [project.entry-points."melody_generator.strategies"]
+    my_strategy = "my_package.module:my_strategy"         # (num_measures, rng=None) を受け取る生成戦略の関数
+"""
+import logging
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from typing import Callable, Optional, Tuple
+
+from . import transformations as t
+from .log_events import log_event
+
+TRANSFORM_ENTRY_POINT_GROUP = 'melody_generator.transforms'
+STRATEGY_ENTRY_POINT_GROUP = 'melody_generator.strategies'
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class TransformInfo:
+    """
+    変換操作とその性質。
+
+    Attributes:
+        name (str): 登録名。
+        func (Callable): 変換関数 (measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None) -> measure_data。
+        stochastic (bool): 乱数を使うかどうか。False の変換は同じ入力に対して常に同じ結果を返す（純粋）ため、
+                           結果をキャッシュできます。
+        affects (Tuple[str, ...]): 変更する要素。'pitch'（音高のみ）、'time'（発音時刻・長さのみ）、
+                                   両方、または空（何も変えない）。
+        categories (Tuple[str, ...]): 生成戦略が候補を選ぶときのカテゴリ名。
+        vectorized (Callable, optional): NOTE_DTYPE の構造化配列を受け取るベクトル版の実装（あれば）。
+    """
+    name: str
+    func: Callable
+    stochastic: bool = False
+    affects: Tuple[str, ...] = ('pitch', 'time')
+    categories: Tuple[str, ...] = ()
+    vectorized: Optional[Callable] = None
+
+    @property
+    def pure(self) -> bool:
+        return not self.stochastic
+
+    @property
+    def pitch_only(self) -> bool:
+        return self.affects == ('pitch',)
+
+    @property
+    def time_only(self) -> bool:
+        return self.affects == ('time',)
+
+# --- 変換操作のカタログ ---
+
+# 登録名 -> TransformInfo（登録順を保持し、カテゴリ内の候補の順序として使う）
+TRANSFORM_REGISTRY = {}
+# 変換関数 -> TransformInfo（構成レシピ中の関数から性質を引くため）
+_INFO_BY_FUNC = {}
+
+def register_transform(info: TransformInfo):
+    """変換操作をレジストリに登録します。同じ名前の登録は上書きされます。"""
+    TRANSFORM_REGISTRY[info.name] = info
+    _INFO_BY_FUNC[info.func] = info
+    return info
+
+for _info in [
+    TransformInfo('identity', t.transform_identity, affects=()),
+    TransformInfo('retrograde', t.transform_retrograde, categories=('development',)),
+    TransformInfo('ending', t.transform_ending, affects=('pitch',)),
+    TransformInfo('rhythm_staccato', t.transform_rhythm_staccato, affects=('time',),
+                  categories=('development', 'aaba_development')),
+    TransformInfo('rhythm_double_time', t.transform_rhythm_double_time, affects=('time',), categories=('development',)),
+    TransformInfo('rhythm_dotted', t.transform_rhythm_dotted, affects=('time',),
+                  categories=('development', 'aaba_development')),
+    TransformInfo('rhythm_triplet', t.transform_rhythm_triplet, stochastic=True, affects=('time',),
+                  categories=('development', 'aaba_development')),
+    TransformInfo('syncopation_push', t.transform_syncopation_push, affects=('time',), categories=('development',)),
+    TransformInfo('syncopation_pull', t.transform_syncopation_pull, affects=('time',), categories=('development',)),
+    TransformInfo('transpose_up', t.transform_transpose_up, affects=('pitch',),
+                  categories=('development', 'aaba_development')),
+    TransformInfo('transpose_down', t.transform_transpose_down, affects=('pitch',),
+                  categories=('development', 'aaba_development')),
+    TransformInfo('slight_variation', t.transform_slight_variation, stochastic=True, affects=('pitch',),
+                  categories=('variation',)),
+    TransformInfo('add_passing_notes', t.transform_add_passing_notes, categories=('variation',)),
+]:
+    register_transform(_info)
+
+# --- プラグインの遅延読み込み ---
+
+_loaded_groups = set()
+
+def load_entry_points(group, register):
+    """エントリーポイントのグループを（プロセスごとに一度だけ）読み込み、各オブジェクトを register に渡します。"""
+    if group in _loaded_groups:
+        return
+    _loaded_groups.add(group)
+    for entry_point in entry_points(group=group):
+        try:
+            register(entry_point.name, entry_point.load())
+        except Exception as e:
+            log_event(logger, 'plugin_load_failed', "プラグイン '%(plugin)s' (%(group)s) を読み込めませんでした: %(error)s",
+                      level=logging.WARNING, plugin=entry_point.name, group=group, error=e)
+
+def _register_plugin_transform(name, obj):
+    if isinstance(obj, TransformInfo):
+        register_transform(obj)
+    elif callable(obj):
+        # 性質が宣言されていない関数は、最適化の対象にならないよう最も保守的に扱う
+        register_transform(TransformInfo(name, obj, stochastic=True))
+    else:
+        raise TypeError(f"TransformInfo または関数である必要があります: {obj!r}")
+
+def load_transform_plugins():
+    """変換操作のプラグインを読み込みます。"""
+    load_entry_points(TRANSFORM_ENTRY_POINT_GROUP, _register_plugin_transform)
+
+def get_transform(name) -> TransformInfo:
+    """登録名から変換操作を取得します。未登録の名前の場合はプラグインを読み込んでから探します。"""
+    if name not in TRANSFORM_REGISTRY:
+        load_transform_plugins()
+    if name not in TRANSFORM_REGISTRY:
+        raise ValueError(f"変換操作 '{name}' は定義されていません。利用可能な変換操作: {list(TRANSFORM_REGISTRY)}")
+    return TRANSFORM_REGISTRY[name]
+
+def transform_info(func) -> TransformInfo:
+    """変換関数の性質を返します。登録されていない関数は、乱数を使う可能性があるものとして扱います。"""
+    info = _INFO_BY_FUNC.get(func)
+    return info if info is not None else TransformInfo(func.__name__, func, stochastic=True)
+
+def transforms_in(category):
+    """カテゴリに属する変換関数のリストを登録順に返します（プラグインを含む）。"""
+    load_transform_plugins()
+    return [info.func for info in TRANSFORM_REGISTRY.values() if category in info.categories]
+
+def is_pure_chain(chain):
+    """変換チェーンがすべて決定的（乱数を使わない）かどうかを返します。"""
+    return all(transform_info(func).pure for func in chain)
@@ -0,0 +1,26 @@
+"""
+1つのシードから、用途ごとに独立した乱数のシードを導出するためのモジュール。
+
+曲全体を1つの乱数列で生成すると、ある小節の設定を変えただけで以降の小節の乱数がずれてしまいます。
+構成の決定や各小節の変換にはそれぞれ derive_seed() で導出したシードの乱数を使うことで、
+ほかの小節の変更や生成の順序（並列化など）に影響されない結果になります。
+"""
+import hashlib
+import random
+
+def derive_seed(seed, *path) -> int:
+    """
+    seed と path（用途を表す文字列や整数の並び）から、64ビットのシードを導出します。
+    同じ引数からは、プロセスや実行をまたいでも常に同じ値が得られます。
+
+    Example:
+        derive_seed(42, 'measure', 3)
+    """
+    data = repr((seed,) + path).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+def derived_random(seed, *path):
+    """derive_seed() で導出したシードの random.Random を返します。seed が None の場合は None を返します。"""
+    if seed is None:
+        return None
+    return random.Random(derive_seed(seed, *path))
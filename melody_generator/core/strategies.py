@@ -3,62 +3,43 @@
 """
 import random
 from .music_theory import SCALES, CHORDS, snap_to_chord
-from .transformations import (
-    transform_identity, transform_retrograde, transform_ending, transform_rhythm_dotted, transform_add_passing_notes,
-    transform_rhythm_triplet, transform_slight_variation,
-    transform_rhythm_staccato, transform_rhythm_double_time, transform_syncopation_push,
-    transform_syncopation_pull, transform_transpose_up, transform_transpose_down
-)
+from .transformations import transform_identity, transform_ending
+from .registry import STRATEGY_ENTRY_POINT_GROUP, load_entry_points, transforms_in
 
-def strategy_random_choice(num_measures=4):
+def strategy_random_choice(num_measures=4, rng=None):
     """
     生成戦略: 変換操作をランダムに組み合わせて構成レシピを生成する。
+    rng（random.Random）を渡すと、その乱数で構成を決める。
     - 1小節目: 提示
     - 中間: 展開
     - 最終小節: 解決
     """
     if num_measures < 2:
         raise ValueError("生成する小節数は2以上である必要があります。")
+    rng = rng or random
 
-    # 展開に利用する変換操作のリスト
-    development_transforms = [
-        transform_retrograde,
-        transform_rhythm_staccato,
-        transform_rhythm_double_time,
-        transform_rhythm_dotted,
-        transform_rhythm_triplet,
-        transform_syncopation_push,
-        transform_syncopation_pull,
-        transform_transpose_up,
-        transform_transpose_down,
-    ]
+    # 展開に利用する変換操作のリスト（レジストリの 'development' カテゴリ。プラグインも含む）
+    development_transforms = transforms_in('development')
 
     # 指定された小節数で構成を動的に定義
     composition = []
     composition.append([transform_identity])
     for _ in range(num_measures - 2):
-        composition.append([random.choice(development_transforms)])
+        composition.append([rng.choice(development_transforms)])
     composition.append([transform_ending])
 
     return composition
 
-def strategy_chord_progression(num_measures=8):
+def strategy_chord_progression(num_measures=8, rng=None):
     """
     生成戦略: AA'BA''形式で、コード進行に沿ったメロディーを生成するための構成レシピを返す。
+    rng（random.Random）を渡すと、その乱数で構成を決める。
     """
+    rng = rng or random
 
-    # --- フィルタのカタログを定義 ---
-    development_transforms = [
-        transform_transpose_up,
-        transform_transpose_down,
-        transform_rhythm_staccato,
-        transform_rhythm_dotted,
-        transform_rhythm_triplet,
-    ]
-    subtle_transforms = [
-        transform_slight_variation,
-        transform_add_passing_notes,
-    ]
+    # --- フィルタのカタログ（レジストリのカテゴリから取得。プラグインも含む）---
+    development_transforms = transforms_in('aaba_development')
+    subtle_transforms = transforms_in('variation')
     
     if num_measures != 8:
         raise ValueError(f"AABA形式は現在8小節でのみサポートされています。num_measuresを8に設定してください。")
@@ -67,18 +48,44 @@ def strategy_chord_progression(num_measures=8):
     composition = []
     # Aセクション (1-2小節): a - a'
     composition.append([transform_identity])
-    composition.append([random.choice(subtle_transforms)])
+    composition.append([rng.choice(subtle_transforms)])
     # A'セクション (3-4小節): a - a'' (a'とは別のバリエーション)
     composition.append([transform_identity])
-    composition.append([random.choice(subtle_transforms)])
+    composition.append([rng.choice(subtle_transforms)])
     # Bセクション (5-6小節) - 展開（フィルタチェーンを生成）
     # 1つまたは2つのフィルタをランダムに組み合わせる
-    b1_chain = random.sample(development_transforms, k=random.randint(1, 2))
-    b2_chain = random.sample(development_transforms, k=random.randint(1, 2))
+    b1_chain = rng.sample(development_transforms, k=rng.randint(1, 2))
+    b2_chain = rng.sample(development_transforms, k=rng.randint(1, 2))
     composition.append(b1_chain)
     composition.append(b2_chain)
     # A''セクション (7-8小節) - 再現と解決
     composition.append([transform_identity])
     composition.append([transform_ending])
 
-    return composition
\ No newline at end of file
+    return composition
+
+# --- 生成戦略のカタログ ---
+
+# 戦略名 -> 生成戦略の関数。MelodyConfig.strategy で名前を指定して選択します。
+STRATEGY_MAP = {
+    'chord_progression': strategy_chord_progression,
+    'random_choice': strategy_random_choice,
+}
+
+def _register_plugin_strategy(name, func):
+    if not callable(func):
+        raise TypeError(f"生成戦略は関数である必要があります: {func!r}")
+    STRATEGY_MAP[name] = func
+
+def get_strategy(name):
+    """
+    戦略名から生成戦略の関数を取得します。未登録の名前の場合はプラグインを読み込んでから探します。
+
+    Raises:
+        ValueError: 該当する生成戦略がない場合。
+    """
+    if name not in STRATEGY_MAP:
+        load_entry_points(STRATEGY_ENTRY_POINT_GROUP, _register_plugin_strategy)
+    if name not in STRATEGY_MAP:
+        raise ValueError(f"生成戦略 '{name}' は定義されていません。利用可能な生成戦略: {list(STRATEGY_MAP)}")
+    return STRATEGY_MAP[name]
@@ -0,0 +1,259 @@
+"""
+生成設定のパラメータスイープ（グリッドサーチ・ランダムサーチ）を行うモジュール。
+
+パラメータ空間を MelodyConfig の変種に展開し、プロセスプールで並行して生成します。
+結果は1設定につき1行ずつ CSV に追記し、途中で落ちても同じ出力先で再実行すれば
+完了済みの設定（config_hash で判定）を飛ばして続きから再開します。
+
+Example:
+    base = MelodyConfig(key='C_major', chord_progression=[...], ...)
+    space = {'key': KEY_NAMES, 'accompaniment_generator': ACCOMPANIMENT_STYLES, 'seed': range(100)}
+    run_sweep(expand_grid(base, space), 'sweep_out')
+"""
+import csv
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from .melody_config import MelodyConfig
+from .metrics import piece_metrics, within_bounds
+from .log_events import log_event, new_run_id
+
+RESULTS_FILENAME = 'results.csv'
+
+# 結果の CSV の列（設定の各項目の列は、これらの後ろに続く）
+# 品質指標の列（core/metrics.py の指標。音符数は melody_notes 列と同じなので除く）
+METRIC_COLUMNS = [
+    'pitch_min', 'pitch_max', 'pitch_range', 'mean_interval', 'pitch_class_entropy', 'chord_tone_coverage',
+    'chord_tone_ratio', 'note_density', 'syncopation', 'self_similarity', 'interval_histogram',
+]
+
+RESULT_COLUMNS = [
+    'config_hash', 'status', 'error', 'seconds',
+    'melody_notes', 'accompaniment_notes', *METRIC_COLUMNS,
+    'midi_path',
+]
+
+def expand_grid(base: MelodyConfig, space: dict):
+    """
+    パラメータ空間の全組み合わせ（直積）を、base から派生した設定として順に返します。
+    組み合わせは遅延生成されるため、大きな空間でもメモリを消費しません。
+
+    Args:
+        base (MelodyConfig): 変更しない項目の値を持つ基準の設定。
+        space (dict): 項目名 -> 候補値の並び。
+
+    Yields:
+        MelodyConfig: 各組み合わせの設定。
+    """
+    names = list(space)
+    for values in itertools.product(*(space[name] for name in names)):
+        yield base.replace(**dict(zip(names, values)))
+
+def sample_random(base: MelodyConfig, space: dict, n: int, seed=None):
+    """
+    パラメータ空間から各項目の値を独立にランダムに選んだ設定を n 個返します。
+
+    Args:
+        base (MelodyConfig): 変更しない項目の値を持つ基準の設定。
+        space (dict): 項目名 -> 候補値の並び。
+        n (int): 生成する設定の数。
+        seed (int, optional): 乱数のシード。同じシードなら同じ設定の並びになります。
+
+    Yields:
+        MelodyConfig: ランダムに選んだ設定。
+    """
+    rng = random.Random(seed)
+    choices = {name: list(values) for name, values in space.items()}
+    for _ in range(n):
+        yield base.replace(**{name: rng.choice(values) for name, values in choices.items()})
+
+# 再開時に完了済みとして扱う status（'filtered' も生成と評価には成功しており、再実行しても同じ結果になる）
+DONE_STATUSES = ('ok', 'filtered')
+
+def load_completed(results_path):
+    """
+    結果の CSV から、すでに処理が終わった設定の config_hash の集合を読み込みます。
+    失敗した（status が 'error' の）設定は含めないため、再開時にもう一度実行されます。
+    """
+    if not os.path.exists(results_path):
+        return set()
+    with open(results_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    # 書き込み途中で落ちた最終行（改行で終わっていない行）は、最終列の途中で落ちると列がそろってしまうため除く
+    if rows and not _ends_with_newline(results_path):
+        rows.pop()
+    # 列が欠けた（DictReader が None で埋めた）行や、列が多すぎる行も読み飛ばす
+    return {row['config_hash'] for row in rows
+            if None not in row and None not in row.values() and row['status'] in DONE_STATUSES}
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+def _trim_partial_row(results_path):
+    """結果の CSV の末尾にある、改行で終わっていない（書き込み途中で落ちた）行を削除します。"""
+    if not os.path.exists(results_path):
+        return
+    with open(results_path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        keep = 0
+        position = end
+        # 最後の改行を末尾から少しずつ探す（大きな CSV を全部読まないため）
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            index = f.read(position - start).rfind(b'\n')
+            if index >= 0:
+                keep = start + index + 1
+                break
+            position = start
+        if keep < end:
+            f.truncate(keep)
+
+def _quality_metrics(config, melody_data):
+    """メロディーの品質指標（core/metrics.py）を、CSV に書き出す形（小数4桁、計算できない値は空欄）で返します。"""
+    metrics = piece_metrics(config, melody_data)
+    row = {}
+    for name in METRIC_COLUMNS:
+        value = metrics[name]
+        if name == 'interval_histogram':
+            row[name] = json.dumps([round(v, 4) for v in value])
+        else:
+            row[name] = '' if math.isnan(value) else round(value, 4)
+    return row, metrics
+
+def run_config(config: MelodyConfig, output_dir=None, metric_bounds=None, midi_path=None):
+    """
+    1つの設定でメロディーを生成し、結果の1行分の辞書を返します（ワーカープロセスで実行されます）。
+    生成中の例外は行の 'error' 列に記録し、スイープ全体は止めません。
+
+    Args:
+        config (MelodyConfig): 生成に使う設定。
+        output_dir (str, optional): 指定した場合、MIDIファイルを output_dir/midi/<config_hash>.mid に保存します。
+        metric_bounds (dict, optional): 品質指標の範囲（metrics.select() と同じ形式）。範囲外の曲は
+                                        status を 'filtered' とし、MIDIファイルを保存しません。
+        midi_path (str, optional): MIDIファイルの保存先のパス。指定した場合は output_dir より優先します
+                                   （GUI のバッチ生成のように、ファイル名を決めて保存する場合に使います）。
+
+    Returns:
+        dict: RESULT_COLUMNS と設定の各項目を列に持つ1行分の辞書。
+    """
+    from .generator import MelodyGenerator
+
+    row = {'config_hash': config.config_hash, 'status': 'ok', 'error': '', 'midi_path': ''}
+    for name, value in config.to_dict().items():
+        row[name] = json.dumps(value) if isinstance(value, (list, dict)) or value is None else value
+    start = time.perf_counter()
+    try:
+        generator = MelodyGenerator(config)
+        generator.generate()
+        row['seconds'] = round(time.perf_counter() - start, 6)
+        row['melody_notes'] = len(generator.melody_data)
+        row['accompaniment_notes'] = len(generator.accompaniment_data)
+        metric_row, metrics = _quality_metrics(config, generator.melody_data)
+        row.update(metric_row)
+        if metric_bounds and not within_bounds(metrics, metric_bounds):
+            row['status'] = 'filtered'
+        elif midi_path is not None or output_dir is not None:
+            midi_path = midi_path or os.path.join(output_dir, 'midi', f"{config.config_hash}.mid")
+            generator.save_midi(midi_path)
+            row['midi_path'] = midi_path
+    except Exception as e:
+        row.update(status='error', error=f"{type(e).__name__}: {e}", seconds=round(time.perf_counter() - start, 6))
+    return row
+
+def run_sweep(configs, output_dir, max_workers=None, save_midi=True, logger=None, progress_interval=1000,
+              metric_bounds=None):
+    """
+    設定の並びをプロセスプールで並行して生成し、結果を output_dir/results.csv に追記します。
+
+    同じ output_dir で再実行すると、CSV に記録済みの設定は飛ばして続きから再開します（失敗した設定は再実行します）。
+    実行中の設定の数は一定（ワーカー数の数倍）に抑えるため、10万件規模の設定でもメモリを消費しません。
+
+    Args:
+        configs (iterable): MelodyConfig の並び（expand_grid / sample_random の結果など）。
+        output_dir (str): 結果の CSV と MIDIファイルの出力先ディレクトリ。
+        max_workers (int, optional): ワーカープロセス数。省略時は CPU 数。
+        save_midi (bool): 各設定のMIDIファイルを保存するかどうか。
+        logger (logging.Logger, optional): 進捗を出力するロガー。
+        progress_interval (int): 何件ごとに進捗をログに出すか。
+        metric_bounds (dict, optional): 品質指標の範囲。範囲外の曲は CSV に 'filtered' として記録し、
+                                        MIDIファイルは保存しません（例: {'chord_tone_coverage': (0.7, None)}）。
+
+    Returns:
+        dict: {'completed': 今回処理した件数, 'skipped': 再開により飛ばした件数, 'errors': 失敗した件数,
+               'filtered': 品質指標の範囲外だった件数}
+    """
+    logger = logger or logging.getLogger(__name__)
+    # スイープ1回分のログを追えるよう、すべての進捗イベントに同じ実行IDを付ける
+    run_id = new_run_id()
+    os.makedirs(os.path.join(output_dir, 'midi') if save_midi else output_dir, exist_ok=True)
+    results_path = os.path.join(output_dir, RESULTS_FILENAME)
+    # 途中で落ちた行は完了扱いにせず、追記する行とつながらないよう先に取り除く
+    _trim_partial_row(results_path)
+    completed = load_completed(results_path)
+    if completed:
+        log_event(logger, 'sweep_resumed', "チェックポイントから再開します（完了済み: %(completed)d件）",
+                  run_id=run_id, completed=len(completed))
+
+    stats = {'completed': 0, 'skipped': 0, 'errors': 0, 'filtered': 0}
+    midi_dir = output_dir if save_midi else None
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_workers * 4
+    configs = iter(configs)
+    start = time.perf_counter()
+
+    with open(results_path, 'a', newline='', encoding='utf-8') as f, \
+            ProcessPoolExecutor(max_workers=max_workers) as executor:
+        writer = None
+        if f.tell() > 0:
+            with open(results_path, newline='', encoding='utf-8') as existing:
+                # 以前の版で作られた CSV には、後から追加した指標の列がないため無視する
+                writer = csv.DictWriter(f, fieldnames=next(csv.reader(existing)), extrasaction='ignore')
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            # 実行中の件数が上限に達するまで、未処理の設定を投入する
+            while not exhausted and len(pending) < max_pending:
+                config = next(configs, None)
+                if config is None:
+                    exhausted = True
+                elif config.config_hash in completed:
+                    stats['skipped'] += 1
+                else:
+                    completed.add(config.config_hash)  # 同じ設定の重複投入も防ぐ
+                    pending.add(executor.submit(run_config, config, midi_dir, metric_bounds))
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                row = future.result()
+                if writer is None:
+                    fieldnames = RESULT_COLUMNS + [k for k in row if k not in RESULT_COLUMNS]
+                    writer = csv.DictWriter(f, fieldnames=fieldnames)
+                    writer.writeheader()
+                writer.writerow(row)
+                stats['completed'] += 1
+                if row['status'] == 'filtered':
+                    stats['filtered'] += 1
+                elif row['status'] != 'ok':
+                    stats['errors'] += 1
+                if stats['completed'] % progress_interval == 0:
+                    elapsed = time.perf_counter() - start
+                    log_event(logger, 'sweep_progress', "  %(completed)d件完了 (%(rate).1f件/秒, エラー %(errors)d件)",
+                              run_id=run_id, completed=stats['completed'], errors=stats['errors'],
+                              filtered=stats['filtered'], rate=stats['completed'] / elapsed)
+            # 1行ごとに書き出しておき、落ちても完了分はチェックポイントとして残す
+            f.flush()
+
+    log_event(logger, 'sweep_finished', "スイープが完了しました: %(stats)s", run_id=run_id, stats=stats,
+              elapsed_ms=round((time.perf_counter() - start) * 1000, 3))
+    return stats
@@ -2,6 +2,7 @@
 メロディーを1小節単位で加工する「変換操作」のカタログ。
 """
 from .music_theory import snap_to_scale
+from .meter import get_meter
 import random
 
 # 各変換操作（フィルタ）は、1小節分のメロディーデータを受け取り、
@@ -10,15 +11,41 @@ import random
 # 入出力形式: [{'pitch': int, 'time': int, 'duration': int}, ...]
 #
 # これにより、フィルタチェーン（複数のフィルタの連続適用）が容易になります。
+#
+# リズムに関わる変換は、拍子を表す meter（Meter）の拍位置や細分グリッドを参照します。
+# meter を省略した場合は ticks_per_beat の 4/4 拍子として扱います。
+#
+# 乱数を使う変換は、rng（random.Random）が渡されればその乱数を使います。小節ごとに別の乱数を渡すと、
+# ほかの小節の変更に影響されない結果になります。省略時は random モジュールの乱数を使います。
+
+def _resolve_meter(meter, ticks_per_beat):
+    return meter if meter is not None else get_meter(4, 4, ticks_per_beat)
 
-def transform_identity(measure_data, key, scale, ticks_per_beat=480):
+def _split_evenly(note, unit, parts, new_measure_data):
+    """
+    音符を unit ごとに parts 等分した音符の並びに置き換えます。端数は各単位の最後の音符と、
+    最後に追加する音符で吸収するため、元の音符の長さは変わりません。
+    """
+    step = unit // parts
+    current_time = note['time']
+    end_time = note['time'] + note['duration']
+    for _ in range(note['duration'] // unit):
+        unit_end = current_time + unit
+        for i in range(parts):
+            duration = step if i < parts - 1 else unit_end - current_time
+            new_measure_data.append({'pitch': note['pitch'], 'time': current_time, 'duration': duration})
+            current_time += duration
+    if current_time < end_time:
+        new_measure_data.append({'pitch': note['pitch'], 'time': current_time, 'duration': end_time - current_time})
+
+def transform_identity(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
     変換操作: モチーフをそのまま演奏する。
     入力データをそのまま返す、最も基本的なフィルタ。
     """
-    return measure_data[:] # コピーを返す
+    return [note.copy() for note in measure_data] # 呼び出し元の音符を共有しないよう、各音符をコピーして返す
 
-def transform_retrograde(measure_data, key, scale, ticks_per_beat=480):
+def transform_retrograde(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
     変換操作: モチーフを逆行させる（音の順番を逆にする）。
     """
@@ -31,7 +58,7 @@ def transform_retrograde(measure_data, key, scale, ticks_per_beat=480):
         current_time += note['duration']
     return new_measure_data
 
-def transform_ending(measure_data, key, scale, ticks_per_beat=480):
+def transform_ending(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
     変換操作: モチーフを演奏し、最後を主音で解決させる。
     """
@@ -46,53 +73,63 @@ def transform_ending(measure_data, key, scale, ticks_per_beat=480):
         new_measure_data.append({'pitch': final_pitch, 'time': note['time'], 'duration': note['duration']})
     return new_measure_data
 
-def transform_rhythm_staccato(measure_data, key, scale, ticks_per_beat=480):
+def transform_rhythm_staccato(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
-    変換操作: 各音符を「8分音符 + 8分休符」のスタッカートにする。
+    変換操作: 各音符を「拍の分割単位（4/4なら8分音符） + 休符」のスタッカートにする。
+    元の音符が分割単位より短い場合は、次の音符と重ならないよう元の長さのままにする。
     """
     new_measure_data = []
-    note_duration = ticks_per_beat // 2  # 8分音符の長さ
+    note_duration = _resolve_meter(meter, ticks_per_beat).division_ticks  # 4/4なら8分音符の長さ
 
     for note in measure_data:
-        new_measure_data.append({'pitch': note['pitch'], 'time': note['time'], 'duration': note_duration})
+        new_measure_data.append({'pitch': note['pitch'], 'time': note['time'], 'duration': min(note['duration'], note_duration)})
     return new_measure_data
 
-def transform_rhythm_double_time(measure_data, key, scale, ticks_per_beat=480):
+def transform_rhythm_double_time(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
     変換操作: 各音符を半分の長さの音符2つに分割する（倍速化）。
     """
     new_measure_data = []
     for note in measure_data:
         half_duration = note['duration'] // 2
+        if half_duration == 0:  # これ以上分割できない音符はそのまま
+            new_measure_data.append(note.copy())
+            continue
         # 1つ目の8分音符
         new_measure_data.append({'pitch': note['pitch'], 'time': note['time'], 'duration': half_duration})
-        # 2つ目の8分音符
-        new_measure_data.append({'pitch': note['pitch'], 'time': note['time'] + half_duration, 'duration': half_duration})
+        # 2つ目の8分音符（長さが奇数の場合の端数もこちらに含める）
+        new_measure_data.append({'pitch': note['pitch'], 'time': note['time'] + half_duration, 'duration': note['duration'] - half_duration})
     return new_measure_data
 
-def transform_syncopation_push(measure_data, key, scale, ticks_per_beat=480):
+def transform_syncopation_push(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
-    変換操作: 各音符を8分音符分「前」にずらす（食い気味のシンコペーション）。
+    変換操作: 各音符を拍の分割単位（4/4なら8分音符）分「前」にずらす（食い気味のシンコペーション）。
     """
     new_measure_data = []
-    push_amount = ticks_per_beat // 2  # 8分音符分ずらす
+    push_amount = _resolve_meter(meter, ticks_per_beat).division_ticks  # 4/4なら8分音符分ずらす
 
     for note in measure_data:
-        # 8分音符分、前にずらす。ただし小節の頭(time=0)より前には行かない。
+        # 分割単位分、前にずらす。ただし小節の頭(time=0)より前には行かない。
         start_time = max(0, note['time'] - push_amount)
         new_measure_data.append({'pitch': note['pitch'], 'time': start_time, 'duration': note['duration']})
-    return new_measure_data
 
-def transform_syncopation_pull(measure_data, key, scale, ticks_per_beat=480):
+    # 頭が詰まった音符と重ならないよう、前の音符を次の音符の頭で切る（長さが0になった音符は除く）
+    for note, next_note in zip(new_measure_data, new_measure_data[1:]):
+        note['duration'] = min(note['duration'], next_note['time'] - note['time'])
+    return [note for note in new_measure_data if note['duration'] > 0]
+
+def transform_syncopation_pull(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
-    変換操作: 各音符を8分音符分「後」にずらす（もたらせるシンコペーション）。
+    変換操作: 各音符を拍の分割単位（4/4なら8分音符）分「後」にずらす（もたらせるシンコペーション）。
     """
     new_measure_data = []
-    pull_amount = ticks_per_beat // 2  # 8分音符分ずらす
-    
+    meter = _resolve_meter(meter, ticks_per_beat)
+    pull_amount = meter.division_ticks  # 4/4なら8分音符分ずらす
+
     if not measure_data:
         return []
-    measure_duration = max(n['time'] + n['duration'] for n in measure_data)
+    # 小節線を越えないよう、モチーフの終わりと小節の長さの短い方で打ち切る
+    measure_duration = min(max(n['time'] + n['duration'] for n in measure_data), meter.ticks_per_measure)
 
     for note in measure_data:
         start_time = note['time'] + pull_amount
@@ -106,7 +143,7 @@ def transform_syncopation_pull(measure_data, key, scale, ticks_per_beat=480):
             new_measure_data.append({'pitch': note['pitch'], 'time': start_time, 'duration': adjusted_duration})
     return new_measure_data
 
-def transform_transpose_up(measure_data, key, scale, ticks_per_beat=480):
+def transform_transpose_up(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
     変換操作: モチーフをスケールに沿って2音上に移高する。
     """
@@ -117,7 +154,7 @@ def transform_transpose_up(measure_data, key, scale, ticks_per_beat=480):
         new_measure_data.append({'pitch': transposed_pitch, 'time': note['time'], 'duration': note['duration']})
     return new_measure_data
 
-def transform_transpose_down(measure_data, key, scale, ticks_per_beat=480):
+def transform_transpose_down(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
     変換操作: モチーフをスケールに沿って2音下に移高する。
     """
@@ -128,68 +165,69 @@ def transform_transpose_down(measure_data, key, scale, ticks_per_beat=480):
         new_measure_data.append({'pitch': transposed_pitch, 'time': note['time'], 'duration': note['duration']})
     return new_measure_data
 
-def transform_rhythm_dotted(measure_data, key, scale, ticks_per_beat=480):
+def transform_rhythm_dotted(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
-    変換操作: 各音符を「付点8分音符 + 16分音符」のリズムパターンに変換する。
+    変換操作: 各音符を「付点8分音符 + 16分音符」（拍の3/4 + 1/4）のリズムパターンに変換する。
     元の音符1つが、同じピッチの2つの音符（タータ）に置き換わります。
+    1拍で割り切れない残りの長さは、同じピッチの音符として最後に残します。
     """
     new_measure_data = []
-    dotted_eighth_duration = int(ticks_per_beat * 0.75)  # 付点8分音符
-    sixteenth_duration = int(ticks_per_beat * 0.25)      # 16分音符
+    beat_ticks = _resolve_meter(meter, ticks_per_beat).beat_lengths[0]
+    dotted_eighth_duration = beat_ticks * 3 // 4  # 4/4なら付点8分音符
+    sixteenth_duration = beat_ticks - dotted_eighth_duration  # 4/4なら16分音符
 
     for note in measure_data:
         # 元の音符の長さが1拍以上の場合に適用
-        if note['duration'] >= ticks_per_beat:
-            num_beats = note['duration'] // ticks_per_beat
+        if note['duration'] >= beat_ticks:
+            num_beats = note['duration'] // beat_ticks
             current_time = note['time']
             for _ in range(num_beats):
                 new_measure_data.append({'pitch': note['pitch'], 'time': current_time, 'duration': dotted_eighth_duration})
                 current_time += dotted_eighth_duration
                 new_measure_data.append({'pitch': note['pitch'], 'time': current_time, 'duration': sixteenth_duration})
                 current_time += sixteenth_duration
+            remainder = note['time'] + note['duration'] - current_time
+            if remainder > 0:
+                new_measure_data.append({'pitch': note['pitch'], 'time': current_time, 'duration': remainder})
         else: # 1拍未満の音符はそのまま
             new_measure_data.append(note.copy())
     return new_measure_data
 
-def transform_rhythm_triplet(measure_data, key, scale, ticks_per_beat=480):
+def transform_rhythm_triplet(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
-    変換操作: モチーフ内の長い音符(1拍以上)をランダムに1つ選び、8分音符の3連符に変換する。
+    変換操作: モチーフ内の長い音符(1拍以上)をランダムに1つ選び、1拍を3分割した連符に変換する。
     """
     new_measure_data = []
-    triplet_duration = ticks_per_beat // 3 # 1拍を3分割した長さ
+    beat_ticks = _resolve_meter(meter, ticks_per_beat).beat_lengths[0]
 
     # 1. 1拍以上の長い音符のインデックスをリストアップ
-    long_note_indices = [i for i, note in enumerate(measure_data) if note['duration'] >= ticks_per_beat]
+    long_note_indices = [i for i, note in enumerate(measure_data) if note['duration'] >= beat_ticks]
 
     # 2. 変換対象の音符をランダムに1つ選ぶ
-    note_to_transform_index = random.choice(long_note_indices) if long_note_indices else -1
+    note_to_transform_index = (rng or random).choice(long_note_indices) if long_note_indices else -1
 
     # 3. モチーフを処理
     for i, note in enumerate(measure_data):
         if i == note_to_transform_index:
-            # 選ばれた音符を3連符に変換
-            num_beats = note['duration'] // ticks_per_beat
-            current_time = note['time']
-            for _ in range(num_beats):
-                for _ in range(3):
-                    new_measure_data.append({'pitch': note['pitch'], 'time': current_time, 'duration': triplet_duration})
-                    current_time += triplet_duration
+            # 選ばれた音符を3連符に変換（1拍で割り切れない残りはそのままの音符として残す）
+            _split_evenly(note, beat_ticks, 3, new_measure_data)
         else:
             # それ以外の音符はそのまま追加
             new_measure_data.append(note.copy())
     return new_measure_data
 
-def transform_add_passing_notes(measure_data, key, scale, ticks_per_beat=480):
+def transform_add_passing_notes(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
     変換操作: モチーフ内の音符間に経過音を挿入する。
-    音符間に3度以上の跳躍があり、かつ元の音符が4分音符以上の場合に、間のスケール音を8分音符で埋める。
+    音符間に3度以上の跳躍があり、かつ元の音符が1拍以上の場合に、間のスケール音を拍の分割単位（4/4なら8分音符）で埋める。
     """
     if not measure_data:
         return []
 
     new_measure_data = []
-    passing_note_duration = ticks_per_beat // 2  # 8分音符
-    min_duration_for_passing_note = ticks_per_beat # 4分音符以上の長さを持つ音符を対象とする
+    meter = _resolve_meter(meter, ticks_per_beat)
+    passing_note_duration = meter.division_ticks  # 4/4なら8分音符
+    min_duration_for_passing_note = meter.beat_lengths[0] # 1拍以上の長さを持つ音符を対象とする
 
     for i in range(len(measure_data)):
         current_note = measure_data[i].copy()
@@ -214,7 +252,7 @@ def transform_add_passing_notes(measure_data, key, scale, ticks_per_beat=480):
 
     return new_measure_data
 
-def transform_slight_variation(measure_data, key, scale, ticks_per_beat=480):
+def transform_slight_variation(measure_data, key, scale, ticks_per_beat=480, meter=None, rng=None):
     """
     変換操作: モチーフの最後の音をスケールに沿って1音上または下にずらす。
     Aセクション内のマイナーチェンジ(a -> a')を表現するために使用する。
@@ -222,9 +260,9 @@ def transform_slight_variation(measure_data, key, scale, ticks_per_beat=480):
     if not measure_data:
         return []
 
-    new_measure_data = measure_data[:] # コピーを作成
+    new_measure_data = [note.copy() for note in measure_data] # 呼び出し元の音符を書き換えないよう各音符をコピー
     if new_measure_data:
         last_note = new_measure_data[-1]
-        direction = random.choice([-1, 1])
+        direction = (rng or random).choice([-1, 1])
         last_note['pitch'] = snap_to_scale(last_note['pitch'] + direction, scale)
     return new_measure_data
\ No newline at end of file
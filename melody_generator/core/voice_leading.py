@@ -0,0 +1,146 @@
+"""
+声部連結（ボイスリーディング）を考慮したボイシング選択。
+
+コード進行全体について、各コードの転回形・オクターブ配置の候補から
+声部の移動量の合計が最小になる組み合わせを動的計画法（ビタビアルゴリズム）で選びます。
+候補とコード間の移動コスト行列はコードごと・コードの組ごとにキャッシュされるため、
+計算量は O(小節数 × 候補数²) で、数千コードの進行でも数ミリ秒程度で処理できます。
+"""
+import numpy as np
+
+# 伴奏ボイシングを配置する既定の音域 (C3〜C5)
+DEFAULT_LOW = 48
+DEFAULT_HIGH = 72
+
+# 音域の中心から離れたボイシングに課す、1半音あたりのペナルティ
+# （移動量が同じ候補の中で、音域が上下に流れていくのを防ぎます）
+REGISTER_WEIGHT = 0.1
+
+# (Chord, low, high) -> (候補数, 最大声部数) の配列（空き声部は NaN）
+_CANDIDATE_CACHE = {}
+# (Chord, Chord, low, high) -> 候補間の移動コスト行列
+_TRANSITION_CACHE = {}
+
+def _stack_close_position(pitch_classes, bottom_pc, low):
+    """指定したピッチクラスを低い方から密集配置で積み上げます。最低音は low 以上に置きます。"""
+    pitch = low + (bottom_pc - low) % 12
+    voicing = [pitch]
+    for pc in pitch_classes[1:]:
+        pitch += (pc - pitch) % 12 or 12
+        voicing.append(pitch)
+    return voicing
+
+def candidate_voicings(chord, low=DEFAULT_LOW, high=DEFAULT_HIGH):
+    """
+    コードのボイシング候補（転回形 × オクターブ配置）を返します。
+    分数コードの場合は、指定されたベース音を常に最低音に置きます。
+
+    Args:
+        chord (Chord): 対象のコード。
+        low (int): 最低音の下限（MIDIノート番号）。
+        high (int): 最高音の上限（MIDIノート番号）。
+
+    Returns:
+        numpy.ndarray: 形状 (候補数, 声部数) の配列。声部数が揃わない部分は NaN。
+    """
+    cache_key = (chord, low, high)
+    cached = _CANDIDATE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # 構成音のピッチクラスを重複なしでコードの積み順に並べる（分数コードのベース音は除く）
+    bass_pc = chord.bass if chord.bass is not None and chord.bass != chord.root else None
+    tones = []
+    for pitch in chord.voicing:
+        if pitch % 12 not in tones and pitch % 12 != bass_pc:
+            tones.append(pitch % 12)
+
+    candidates = []
+    for inversion in range(len(tones)):
+        rotated = tones[inversion:] + tones[:inversion]
+        for octave in range(0, high - low + 1, 12):
+            upper = _stack_close_position(rotated, rotated[0], low + octave)
+            voicing = upper
+            if bass_pc is not None:
+                bass_pitch = upper[0] - ((upper[0] - bass_pc) % 12 or 12)
+                if bass_pitch < low:
+                    continue
+                voicing = [bass_pitch] + upper
+            if voicing[-1] <= high:
+                candidates.append(voicing)
+    if not candidates:
+        # 音域が狭すぎる場合は、基本形を音域の下端に置いたものだけを候補にする
+        candidates.append(_stack_close_position(tones, tones[0], low))
+
+    width = max(len(v) for v in candidates)
+    table = np.full((len(candidates), width), np.nan)
+    for i, voicing in enumerate(candidates):
+        table[i, :len(voicing)] = voicing
+    _CANDIDATE_CACHE[cache_key] = table
+    return table
+
+def _register_cost(table, low, high):
+    """各候補が音域の中心からどれだけ離れているかのペナルティ。"""
+    center = (low + high) / 2
+    return REGISTER_WEIGHT * np.abs(np.nanmean(table, axis=1) - center)
+
+def _motion_cost(a, b):
+    """
+    候補集合 a, b 間の移動コスト行列を計算します。
+    各声部から相手側の最も近い音までの距離を、双方向に合計したものをコストとします。
+    """
+    diff = np.abs(a[:, None, :, None] - b[None, :, None, :])  # (Na, Nb, Ka, Kb)
+    diff = np.where(np.isnan(diff), np.inf, diff)
+    forward = diff.min(axis=3)   # a の各声部 -> b の最も近い音
+    backward = diff.min(axis=2)  # b の各声部 -> a の最も近い音
+    forward = np.where(np.isnan(a)[:, None, :], 0.0, forward).sum(axis=2)
+    backward = np.where(np.isnan(b)[None, :, :], 0.0, backward).sum(axis=2)
+    return forward + backward
+
+def _transition_cost(prev_chord, next_chord, low, high):
+    cache_key = (prev_chord, next_chord, low, high)
+    cost = _TRANSITION_CACHE.get(cache_key)
+    if cost is None:
+        cost = _motion_cost(
+            candidate_voicings(prev_chord, low, high), candidate_voicings(next_chord, low, high)
+        ) + _register_cost(candidate_voicings(next_chord, low, high), low, high)[None, :]
+        _TRANSITION_CACHE[cache_key] = cost
+    return cost
+
+def choose_voicings(chords, low=DEFAULT_LOW, high=DEFAULT_HIGH):
+    """
+    コード進行全体で声部の移動量が最小となるボイシングの列を選びます。
+
+    Args:
+        chords (List[Chord]): コード進行。
+        low (int): 最低音の下限（MIDIノート番号）。
+        high (int): 最高音の上限（MIDIノート番号）。
+
+    Returns:
+        List[List[int]]: 各コードに対して選ばれたボイシング（MIDIノート番号のリスト）。
+    """
+    if not chords:
+        return []
+
+    # 1. 前向き計算: 各候補に到達する最小コストと、その直前の候補を記録する
+    score = _register_cost(candidate_voicings(chords[0], low, high), low, high)
+    backpointers = []
+    for prev_chord, next_chord in zip(chords, chords[1:]):
+        total = score[:, None] + _transition_cost(prev_chord, next_chord, low, high)
+        best_prev = total.argmin(axis=0)
+        backpointers.append(best_prev)
+        score = total.min(axis=0)
+
+    # 2. 後ろ向きにたどって最適な候補の列を復元する
+    choice = int(score.argmin())
+    choices = [choice]
+    for best_prev in reversed(backpointers):
+        choice = int(best_prev[choice])
+        choices.append(choice)
+    choices.reverse()
+
+    voicings = []
+    for chord, choice in zip(chords, choices):
+        row = candidate_voicings(chord, low, high)[choice]
+        voicings.append([int(p) for p in row[~np.isnan(row)]])
+    return voicings
@@ -10,36 +10,79 @@ from melody_generator.core.generator import MelodyGenerator # このファイル
 # UIコンポーネントをインポート
 from melody_generator.gui.settings_panel import SettingsPanel
 from melody_generator.gui.action_panel import ActionPanel
+from melody_generator.gui.piano_roll import PianoRoll
+from melody_generator.gui.history_panel import HistoryPanel
+from melody_generator.gui.batch_panel import BatchPanel
+from melody_generator.core.profiles import DEFAULT_PROFILE_NAME
 from melody_generator.gui.controller import AppController
 
+# ライブモードで、最後の編集からこの時間（ミリ秒）入力がなければ再生成する
+LIVE_DEBOUNCE_MS = 150
+
 class MelodyGeneratorApp(tk.Tk):
     """メロディー生成ツールのGUIアプリケーション"""
 
-    def __init__(self):
+    def __init__(self, profile_name=DEFAULT_PROFILE_NAME):
         super().__init__()
 
         self.title("メロディー生成ツール")
-        self.geometry("800x600")
+        self.geometry("1150x780")
         self.minsize(600, 400)
 
         # --- コントローラーの初期化 ---
-        self.controller = AppController(self)
+        self.controller = AppController(self, profile_name)
+
+        # --- 下部のピアノロール（ライブモードの表示先）---
+        self.piano_roll = PianoRoll(self)
+        self.piano_roll.pack(side=tk.BOTTOM, fill=tk.X, padx=15, pady=(0, 10))
 
         # --- メインフレームの作成 ---
         main_frame = ttk.Frame(self, padding="10")
         main_frame.pack(fill=tk.BOTH, expand=True)
 
         # --- 左側の設定パネル ---
-        self.settings_panel = SettingsPanel(main_frame)
+        self.settings_panel = SettingsPanel(
+            main_frame,
+            profile_names=self.controller.profile_store.names(),
+            profile_command=self.controller.handle_select_profile
+        )
         self.settings_panel.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-        # --- 右側の操作・出力パネル ---
-        self.action_panel = ActionPanel(
+        # --- 右端の履歴パネル ---
+        self.history_panel = HistoryPanel(
             main_frame,
+            recall_command=self._recall_history,
+            compare_command=self._compare_history,
+            export_command=self._export_history
+        )
+        self.history_panel.pack(side=tk.RIGHT, fill=tk.Y, padx=5, pady=5)
+
+        # --- 右側の操作・出力パネル（1曲の生成とバッチ生成をタブで切り替える）---
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.action_panel = ActionPanel(
+            notebook,
             generate_command=self._generate_melody,
             browse_command=self._browse_output_file
         )
-        self.action_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        notebook.add(self.action_panel, text="生成")
+        self.batch_panel = BatchPanel(
+            notebook,
+            start_command=self._start_batch,
+            cancel_command=self.controller.handle_cancel_batch,
+            browse_command=self._browse_batch_dir
+        )
+        notebook.add(self.batch_panel, text="バッチ生成")
+
+        # 終了時は実行中のバッチ生成を取り消す
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        # --- ライブモード: 設定の編集を監視し、入力が落ち着いてから再生成する ---
+        self._live_job = None
+        self.settings_panel.bind_changes(self._schedule_live_update)
+
+        # --- 起動時のプロファイルを読み込む ---
+        self.controller.handle_select_profile(profile_name)
 
     def log(self, message):
         """ログエリアにメッセージを追記する"""
@@ -68,24 +111,92 @@ class MelodyGeneratorApp(tk.Tk):
         if filename:
             self.action_panel.output_path_var.set(filename)
 
-    def _generate_melody(self):
-        """「生成＆保存」ボタンの処理。メロディー生成ロジックを呼び出す。"""
-        # 1. UIパネルから現在の設定値を取得
-        settings_data = {
+    def _browse_batch_dir(self):
+        """バッチパネルの「参照」ボタンの処理。出力先フォルダの選択ダイアログを開く。"""
+        directory = filedialog.askdirectory(initialdir=self.batch_panel.output_dir_var.get() or '.')
+        if directory:
+            self.batch_panel.output_dir_var.set(directory)
+
+    def _start_batch(self):
+        """「バッチ生成を開始」ボタンの処理。"""
+        batch_settings = {
+            'count_var': self.batch_panel.count_var.get(),
+            'seed_start_var': self.batch_panel.seed_start_var.get(),
+            'output_dir_var': self.batch_panel.output_dir_var.get(),
+            'template_var': self.batch_panel.template_var.get(),
+        }
+        self.controller.handle_start_batch(self._collect_settings(), batch_settings)
+
+    def _on_close(self):
+        self.controller.handle_cancel_batch()
+        self.destroy()
+
+    def _recall_history(self):
+        """「呼び出し」ボタンの処理。選択した履歴の曲を表示し、その設定を設定パネルに戻す。"""
+        selected = self.history_panel.selected_indices()
+        if selected:
+            self.controller.handle_recall_history(selected[-1])
+
+    def _compare_history(self):
+        """「A/B 比較」ボタンの処理。選択した2つの履歴で異なる小節を強調表示する。"""
+        selected = self.history_panel.selected_indices()
+        if len(selected) != 2:
+            messagebox.showinfo("A/B 比較", "比較する履歴を2つ選択してください（Ctrl + クリック）。")
+            return
+        self.controller.handle_compare_history(selected[0], selected[1])
+
+    def _export_history(self):
+        """「書き出し...」ボタンの処理。選択した履歴の曲をMIDIファイルとして保存する。"""
+        selected = self.history_panel.selected_indices()
+        if not selected:
+            return
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".mid",
+            filetypes=[("MIDI files", "*.mid"), ("All files", "*.*")]
+        )
+        if filename:
+            self.controller.handle_export_history(selected[-1], filename)
+
+    def _collect_settings(self):
+        """UIパネルから現在の設定値を取得する"""
+        return {
             'key_var': self.settings_panel.key_var.get(),
             'chord_prog_text': self.settings_panel.chord_text.get("1.0", tk.END),
             'motif_text': self.settings_panel.motif_text.get("1.0", tk.END),
             'measures_var': self.settings_panel.measures_var.get(),
             'accomp_var': self.settings_panel.accomp_var.get(),
+            'live_var': self.settings_panel.live_var.get(),
         }
+
+    def _schedule_live_update(self):
+        """設定が編集されたときの処理。連続した編集はまとめ、最後の編集から少し待って再生成する。"""
+        if self._live_job is not None:
+            self.after_cancel(self._live_job)
+            self._live_job = None
+        if self.settings_panel.live_var.get():
+            self._live_job = self.after(LIVE_DEBOUNCE_MS, self._live_update)
+
+    def _live_update(self):
+        self._live_job = None
+        self.controller.handle_live_update(self._collect_settings())
+
+    def _generate_melody(self):
+        """「生成＆保存」ボタンの処理。メロディー生成ロジックを呼び出す。"""
+        # 1. UIパネルから現在の設定値を取得
+        settings_data = self._collect_settings()
         output_path = self.action_panel.output_path_var.get()
 
         # 2. コントローラーに処理を委譲
         self.controller.handle_generate_melody(settings_data, output_path)
 
-def start_app():
-    """アプリケーションを起動する"""
-    app = MelodyGeneratorApp()
+def start_app(profile_name=DEFAULT_PROFILE_NAME):
+    """
+    アプリケーションを起動する
+
+    Args:
+        profile_name (str): 起動時に読み込むプロファイル名。
+    """
+    app = MelodyGeneratorApp(profile_name)
     app.mainloop()
 
 if __name__ == '__main__':
@@ -0,0 +1,136 @@
+import tkinter as tk
+from tkinter import ttk
+
+from melody_generator.core.batch import DEFAULT_FILENAME_TEMPLATE, FILENAME_FIELDS
+
+# 結果の表の列: (列名, 見出し, 幅, 結果の行のキー)
+RESULT_TABLE_COLUMNS = [
+    ('index', '#', 40, 'index'),
+    ('seed', 'シード', 70, 'seed'),
+    ('file', 'ファイル', 170, 'file'),
+    ('status', '状態', 50, 'status'),
+    ('notes', '音符数', 55, 'melody_notes'),
+    ('chord_tone_ratio', 'コードトーン率', 90, 'chord_tone_ratio'),
+    ('pitch_range', '音域', 45, 'pitch_range'),
+    ('pitch_class_entropy', 'エントロピー', 80, 'pitch_class_entropy'),
+    ('syncopation', 'シンコペーション', 95, 'syncopation'),
+    ('self_similarity', '反復度', 55, 'self_similarity'),
+    ('seconds', '秒', 60, 'seconds'),
+]
+
+class BatchPanel(ttk.Frame):
+    """シードを変えた曲をまとめてフォルダへ生成するパネル（進捗表示・取り消し・結果の一覧）"""
+
+    def __init__(self, parent, start_command, cancel_command, browse_command, *args, **kwargs):
+        super().__init__(parent, padding="10", *args, **kwargs)
+
+        self.columnconfigure(1, weight=1)
+
+        # 件数とシードの範囲
+        ttk.Label(self, text="曲数:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        range_frame = ttk.Frame(self)
+        range_frame.grid(row=0, column=1, columnspan=2, sticky=tk.W, pady=2)
+        self.count_var = tk.StringVar(value='100')
+        ttk.Spinbox(range_frame, from_=1, to=100000, textvariable=self.count_var, width=8).pack(side=tk.LEFT)
+        ttk.Label(range_frame, text="開始シード:").pack(side=tk.LEFT, padx=(10, 2))
+        self.seed_start_var = tk.StringVar(value='0')
+        ttk.Entry(range_frame, textvariable=self.seed_start_var, width=10).pack(side=tk.LEFT)
+        self.seed_range_label = ttk.Label(range_frame, text="")
+        self.seed_range_label.pack(side=tk.LEFT, padx=(10, 0))
+        for var in (self.count_var, self.seed_start_var):
+            var.trace_add('write', lambda *args: self._update_seed_range())
+        self._update_seed_range()
+
+        # 出力先フォルダ
+        ttk.Label(self, text="出力フォルダ:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        self.output_dir_var = tk.StringVar(value='batch_output')
+        ttk.Entry(self, textvariable=self.output_dir_var).grid(row=1, column=1, sticky=(tk.W, tk.E), padx=(0, 5), pady=2)
+        ttk.Button(self, text="参照...", command=browse_command).grid(row=1, column=2, sticky=tk.E, pady=2)
+
+        # ファイル名のテンプレート
+        ttk.Label(self, text="ファイル名:").grid(row=2, column=0, sticky=tk.W, pady=2)
+        self.template_var = tk.StringVar(value=DEFAULT_FILENAME_TEMPLATE)
+        ttk.Entry(self, textvariable=self.template_var).grid(row=2, column=1, columnspan=2, sticky=(tk.W, tk.E), pady=2)
+        fields = ", ".join(f"{{{name}}}" for name in FILENAME_FIELDS)
+        ttk.Label(self, text=f"使える項目: {fields}", foreground='gray').grid(row=3, column=1, columnspan=2, sticky=tk.W)
+
+        # 開始・取り消しボタン
+        button_frame = ttk.Frame(self)
+        button_frame.grid(row=4, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(8, 4))
+        button_frame.columnconfigure(0, weight=1)
+        button_frame.columnconfigure(1, weight=1)
+        self.start_button = ttk.Button(button_frame, text="バッチ生成を開始", command=start_command)
+        self.start_button.grid(row=0, column=0, sticky=(tk.W, tk.E), ipady=4)
+        self.cancel_button = ttk.Button(button_frame, text="取り消し", command=cancel_command, state='disabled')
+        self.cancel_button.grid(row=0, column=1, sticky=(tk.W, tk.E), ipady=4)
+
+        # 進捗
+        self.progress = ttk.Progressbar(self, mode='determinate')
+        self.progress.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=2)
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(self, textvariable=self.status_var).grid(row=6, column=0, columnspan=3, sticky=tk.W)
+
+        # 結果の一覧（見出しをクリックするとその列で並べ替える）
+        table_frame = ttk.Frame(self)
+        table_frame.grid(row=7, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(5, 0))
+        table_frame.columnconfigure(0, weight=1)
+        table_frame.rowconfigure(0, weight=1)
+        self.rowconfigure(7, weight=1)
+        self.table = ttk.Treeview(table_frame, columns=[c[0] for c in RESULT_TABLE_COLUMNS], show='headings', height=8)
+        for column, heading, width, _ in RESULT_TABLE_COLUMNS:
+            self.table.heading(column, text=heading, command=lambda c=column: self.sort_by(c))
+            self.table.column(column, width=width, anchor=tk.W if column == 'file' else tk.E, stretch=column == 'file')
+        self.table.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.table.yview)
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.table['yscrollcommand'] = scrollbar.set
+        self._sort_column = None
+        self._sort_reverse = False
+
+    def _update_seed_range(self):
+        try:
+            count = int(self.count_var.get())
+            start = int(self.seed_start_var.get())
+        except ValueError:
+            self.seed_range_label.config(text="")
+            return
+        self.seed_range_label.config(text=f"（シード {start}〜{start + count - 1}）" if count > 0 else "")
+
+    def set_running(self, running):
+        """実行中かどうかに合わせて、開始・取り消しボタンの有効・無効を切り替えます。"""
+        self.start_button.config(state='disabled' if running else 'normal')
+        self.cancel_button.config(state='normal' if running else 'disabled')
+
+    def set_progress(self, done, total, message):
+        """進捗バーと状態の表示を更新します。"""
+        self.progress.config(maximum=max(total, 1), value=done)
+        self.status_var.set(message)
+
+    def clear_results(self):
+        """結果の一覧を空にします。"""
+        self.table.delete(*self.table.get_children())
+
+    def add_results(self, rows):
+        """完了した曲の結果（BatchJob.poll() の行）を一覧に追加し、現在の並び順を保ちます。"""
+        for row in rows:
+            self.table.insert('', tk.END, values=[row.get(key, '') for _, _, _, key in RESULT_TABLE_COLUMNS])
+        if rows and self._sort_column is not None:
+            self._sort(self._sort_column, self._sort_reverse)
+
+    def sort_by(self, column):
+        """列 column で並べ替えます。同じ列をもう一度選ぶと昇順と降順を切り替えます。"""
+        reverse = not self._sort_reverse if column == self._sort_column else False
+        self._sort(column, reverse)
+
+    def _sort(self, column, reverse):
+        def sort_key(item):
+            value = self.table.set(item, column)
+            try:
+                return (0, float(value), '')
+            except ValueError:
+                return (1, 0.0, value)  # 数値でない値（空欄を含む）は文字列として後ろに並べる
+        items = sorted(self.table.get_children(), key=sort_key, reverse=reverse)
+        for position, item in enumerate(items):
+            self.table.move(item, '', position)
+        self._sort_column = column
+        self._sort_reverse = reverse
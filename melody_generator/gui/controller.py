@@ -2,26 +2,185 @@ import tkinter as tk
 from tkinter import messagebox
 import io
 import logging
+import multiprocessing
+import random
 
-from melody_generator import config
 from melody_generator.core.generator import MelodyGenerator
 from melody_generator.core.melody_config import MelodyConfig # MelodyConfigを新しいファイルからインポート
+from melody_generator.core.live import LiveSession
+from melody_generator.core.history import SessionHistory
+from melody_generator.core.profiles import DEFAULT_PROFILE_NAME, ProfileError, default_store
+from melody_generator.core.batch import BatchJob, batch_configs
 # データ変換ユーティリティをインポート
 from melody_generator.gui.gui_utils import parse_chord_progression, parse_motif, ParsingError
 
+# 履歴に保持する曲の数（超えた分は古いものから破棄）
+HISTORY_MAX_ENTRIES = 200
+# 生成のログを GUI に表示するためのロガー名
+GUI_LOGGER_NAME = 'MelodyGeneratorLogger'
+# バッチ生成の進捗を確認する間隔（ミリ秒）
+BATCH_POLL_MS = 100
+
 class AppController:
     """
     アプリケーションのロジックを管理するコントローラー。
     View (GUI) からの指示を受け、Model (Generator) を操作し、結果をViewに反映する。
     """
-    def __init__(self, view):
+    def __init__(self, view, profile_name=DEFAULT_PROFILE_NAME):
         """
         コントローラーを初期化します。
 
         Args:
             view (MelodyGeneratorApp): 操作対象のViewインスタンス。
+            profile_name (str): 起動時に選択するプロファイル名。
         """
         self.view = view
+        # プロファイルは生成のたびにストアから取得し、ファイルの変更を自動で反映する
+        self.profile_store = default_store()
+        self.profile_name = profile_name
+        # ライブモードのセッション（シードと生成済みの小節を保持し、変わった小節だけを再生成する）
+        self.live_session = LiveSession()
+        # 生成した曲の履歴（変わらなかった小節は履歴全体で共有される）
+        self.history = SessionHistory(max_entries=HISTORY_MAX_ENTRIES)
+        # 生成のログをメモリ上にキャプチャするハンドラ。起動時に一度だけ取り付け、生成ごとにバッファを空にして使う
+        # （ロガーの他のハンドラ、例えば JSON Lines の出力先はそのまま残る）
+        self.log_capture = io.StringIO()
+        self.log_handler = logging.StreamHandler(self.log_capture)
+        self.log_handler.setFormatter(logging.Formatter('%(message)s'))
+        self.logger = logging.getLogger(GUI_LOGGER_NAME)
+        self.logger.addHandler(self.log_handler)
+        self.logger.setLevel(logging.INFO)
+        # 実行中（または直前）のバッチ生成
+        self.batch_job = None
+
+    def _build_config_dict(self, settings_data):
+        """Viewから受け取った設定値を解析し、MelodyConfig に渡す辞書を構築します。"""
+        chord_progression = parse_chord_progression(settings_data['chord_prog_text'])
+        motif_notes = parse_motif(settings_data['motif_text'])
+        num_measures = int(settings_data['measures_var'])
+        # 画面にない項目（拍子や分解能など）は、選択中のプロファイルの値を使う
+        app_config_dict = self.profile_store.get(self.profile_name).config_values()
+        app_config_dict.update({
+            'motif_notes': motif_notes,
+            'key': settings_data['key_var'],
+            'chord_progression': chord_progression,
+            'num_measures': num_measures,
+            'accompaniment_generator': settings_data['accomp_var'],
+        })
+        if settings_data.get('live_var'):
+            # ライブモード中は、ピアノロールに表示している曲と同じものを保存する
+            app_config_dict['seed'] = self.live_session.seed
+        else:
+            # 履歴から同じ曲を再現できるよう、毎回シードを決めて記録する
+            app_config_dict['seed'] = random.randrange(2 ** 32)
+        return app_config_dict
+
+    def handle_select_profile(self, profile_name):
+        """
+        プロファイルを選択し、その値を設定パネルと出力先に読み込みます。
+
+        Args:
+            profile_name (str): プロファイル名。
+        """
+        try:
+            profile = self.profile_store.get(profile_name)
+        except ProfileError as e:
+            messagebox.showerror("プロファイルのエラー", str(e))
+            return
+        self.profile_name = profile_name
+        self.view.settings_panel.profile_var.set(profile_name)
+        self.view.settings_panel.set_values(profile.config())
+        if profile.output_path:
+            self.view.action_panel.output_path_var.set(profile.output_path)
+        self.view.piano_roll.set_status(f"プロファイル '{profile_name}' を読み込みました。{profile.description}")
+
+    def _record_history(self, generator):
+        """生成結果を履歴に追加し、履歴パネルとピアノロールを更新します。"""
+        melody_config = generator.config
+        entry = self.history.record(
+            melody_config, generator.melody_data, generator.accompaniment_data,
+            label=f"{melody_config.key} {' '.join(melody_config.chord_progression)}"
+        )
+        self.view.history_panel.set_entries([self._history_label(e) for e in self.history])
+        self.view.piano_roll.draw(generator.melody_data, generator.accompaniment_data,
+                                  melody_config.meter.ticks_per_measure, melody_config.num_measures)
+        return entry
+
+    @staticmethod
+    def _history_label(entry):
+        return f"#{entry.entry_id} {entry.label} (シード: {entry.seed})"
+
+    def handle_recall_history(self, index):
+        """
+        履歴の曲をピアノロールに表示し、その設定を設定パネルに戻します。
+        ライブモードのシードも履歴のものに切り替えるため、続けて編集すればその曲を起点に変化します。
+
+        Args:
+            index (int): 履歴パネルでの位置（古い順、0始まり）。
+        """
+        entry = self.history[index]
+        self.live_session.reset(seed=entry.seed)
+        self.view.settings_panel.set_values(entry.config)
+        self.view.piano_roll.draw(entry.melody_data(), entry.accompaniment_data(),
+                                  entry.config.meter.ticks_per_measure, entry.config.num_measures)
+        self.view.piano_roll.set_status(f"履歴 #{entry.entry_id} を表示しています (シード: {entry.seed})")
+
+    def handle_compare_history(self, index_a, index_b):
+        """
+        2つの履歴を比較し、後者（B）をピアノロールに表示して、A と異なる小節を強調表示します。
+
+        Args:
+            index_a (int): 比較元（A）の履歴パネルでの位置。
+            index_b (int): 比較先（B）の履歴パネルでの位置。
+        """
+        entry_a, entry_b = self.history[index_a], self.history[index_b]
+        changed = self.history.diff(entry_a, entry_b)
+        self.view.piano_roll.draw(entry_b.melody_data(), entry_b.accompaniment_data(),
+                                  entry_b.config.meter.ticks_per_measure, entry_b.config.num_measures,
+                                  changed_measures=changed)
+        self.view.piano_roll.set_status(
+            f"A: #{entry_a.entry_id} / B: #{entry_b.entry_id} を表示中 - {len(changed)}小節が異なります"
+        )
+
+    def handle_export_history(self, index, output_path):
+        """
+        履歴の曲をMIDIファイルとして保存します。
+
+        Args:
+            index (int): 履歴パネルでの位置（古い順、0始まり）。
+            output_path (str): 出力ファイルパス。
+        """
+        entry = self.history[index]
+        try:
+            entry.to_generator().save_midi(output_path)
+        except Exception as e:
+            messagebox.showerror("エラー", f"書き出しに失敗しました: {type(e).__name__}: {e}")
+            return
+        self.view.log(f"\n>>> 履歴 #{entry.entry_id} を '{output_path}' に書き出しました。\n")
+
+    def handle_live_update(self, settings_data):
+        """
+        ライブモードで設定が編集されたときに、変わった小節だけを再生成してピアノロールに表示します。
+        編集途中の入力はエラーになりやすいため、ダイアログは出さずにステータス表示だけを更新します。
+
+        Args:
+            settings_data (dict): Viewから受け取った設定値の辞書。
+        """
+        piano_roll = self.view.piano_roll
+        try:
+            melody_config = MelodyConfig(**self._build_config_dict(settings_data))
+            result = self.live_session.update(melody_config)
+        except (ParsingError, ValueError) as e:
+            piano_roll.set_status(f"入力値のエラー: {e}")
+            return
+
+        piano_roll.draw(result.melody_data, result.accompaniment_data,
+                        result.config.meter.ticks_per_measure, result.config.num_measures,
+                        changed_measures=result.changed_measures)
+        piano_roll.set_status(
+            f"{len(result.changed_measures)}/{result.config.num_measures}小節を更新しました "
+            f"({result.elapsed * 1000:.1f} ms, シード: {result.config.seed})"
+        )
 
     def handle_generate_melody(self, settings_data, output_path):
         """
@@ -38,48 +197,25 @@ class AppController:
             # 1. GUIから受け取った設定値をユーティリティ関数で解析・変換する
             self.view.log("1. GUIから設定を読み込み中...")
 
-            # ユーティリティ関数を呼び出す
-            chord_progression = parse_chord_progression(settings_data['chord_prog_text'])
-            motif_notes = parse_motif(settings_data['motif_text'])
-            
-            # 小節数
-            num_measures = int(settings_data['measures_var'])
-
-            # 2. MelodyGeneratorに渡すconfig辞書を構築
-            app_config_dict = {
-                'motif_notes': motif_notes,
-                'key': settings_data['key_var'],
-                'chord_progression': chord_progression,
-                'num_measures': num_measures,
-                'ticks_per_beat': config.TICKS_PER_BEAT,
-                'beats_per_measure': config.BEATS_PER_MEASURE,
-                'play_chords': config.PLAY_CHORDS, # config.pyから取得
-                'accompaniment_generator': settings_data['accomp_var'],
-            }
+            # 2. ユーティリティ関数で解析し、MelodyGeneratorに渡すconfig辞書を構築
+            app_config_dict = self._build_config_dict(settings_data)
             self.view.log("設定の読み込み完了。\n")
 
-            # 3. ロギングのセットアップ
-            # io.StringIOをハンドラとして使用し、ログをメモリ上にキャプチャする
-            log_capture = io.StringIO()
-            # GUIにログを流すためのカスタムハンドラ
-            handler = logging.StreamHandler(log_capture)
-            # ログのフォーマットは不要（メッセージのみ表示するため）
-            handler.setFormatter(logging.Formatter('%(message)s'))
-            
-            logger = logging.getLogger('MelodyGeneratorLogger')
-            logger.handlers = [handler] # 既存のハンドラをクリアして設定
-            logger.setLevel(logging.INFO)
-            
+            # 3. 前回の生成のログを消す
+            self.log_capture.seek(0)
+            self.log_capture.truncate()
+
             # 4. MelodyGeneratorのインスタンスを生成し、実行
             self.view.log("\n2. MelodyGeneratorを初期化し、メロディーと伴奏を生成中...\n")
             melody_config = MelodyConfig(**app_config_dict)
-            generator = MelodyGenerator(config=melody_config, logger=logger)
+            generator = MelodyGenerator(config=melody_config, logger=self.logger)
             try:
                 generator.generate()
                 generator.save_midi(output_path)
+                self._record_history(generator)
             finally:
                 # generatorからのログをGUIに表示
-                self.view.log(log_capture.getvalue())
+                self.view.log(self.log_capture.getvalue())
 
             self.view.log(f"\n>>> 完了: MIDIファイルを '{output_path}' に保存しました。\n")
             messagebox.showinfo("成功", f"メロディーの生成が完了しました。\nファイル: {output_path}")
@@ -91,4 +227,56 @@ class AppController:
         except Exception as e: # その他の予期せぬエラー
             error_message = f"エラーが発生しました: {type(e).__name__}: {e}"
             self.view.log(f"\n!!! {error_message}")
-            messagebox.showerror("エラー", error_message)
\ No newline at end of file
+            messagebox.showerror("エラー", error_message)
+
+    def handle_start_batch(self, settings_data, batch_settings):
+        """
+        設定パネルの設定からシードだけを変えた曲を、ワーカープロセスでまとめて生成します。
+        進捗は BATCH_POLL_MS ごとに確認するため、生成中も画面は操作できます。
+
+        Args:
+            settings_data (dict): Viewから受け取った設定値の辞書。
+            batch_settings (dict): バッチパネルの設定値（曲数、開始シード、出力フォルダ、ファイル名のテンプレート）。
+        """
+        if self.batch_job is not None and not self.batch_job.finished:
+            return
+        panel = self.view.batch_panel
+        try:
+            base_config = MelodyConfig(**self._build_config_dict(settings_data))
+            configs = batch_configs(base_config, int(batch_settings['count_var']), int(batch_settings['seed_start_var']))
+            # Tk を動かしているプロセスを fork しないよう、ワーカーは spawn で起動する
+            job = BatchJob(configs, batch_settings['output_dir_var'], batch_settings['template_var'],
+                           mp_context=multiprocessing.get_context('spawn'))
+            job.start()
+        except (ParsingError, ValueError) as e:
+            messagebox.showerror("入力エラー", f"入力値のエラー: {e}")
+            return
+        except OSError as e:
+            messagebox.showerror("エラー", f"出力フォルダを作成できませんでした: {e}")
+            return
+        self.batch_job = job
+        panel.clear_results()
+        panel.set_running(True)
+        panel.set_progress(0, job.total, f"0/{job.total}曲 ワーカーを起動しています...")
+        self.view.after(BATCH_POLL_MS, self._poll_batch)
+
+    def _poll_batch(self):
+        """バッチ生成の完了した曲を一覧に加え、進捗の表示を更新します。"""
+        job = self.batch_job
+        panel = self.view.batch_panel
+        panel.add_results(job.poll())
+        if job.finished:
+            state = "取り消しました" if job.cancelled else "完了しました"
+            message = f"{state}: {job.completed}/{job.total}曲 (エラー {job.errors}件) 保存先: {job.output_dir}"
+            panel.set_running(False)
+        else:
+            message = f"{job.completed}/{job.total}曲 ({job.rate:.1f}曲/秒, エラー {job.errors}件)"
+            if job.cancelled:
+                message += " 実行中の曲の完了を待っています..."
+            self.view.after(BATCH_POLL_MS, self._poll_batch)
+        panel.set_progress(job.completed, job.total, message)
+
+    def handle_cancel_batch(self):
+        """実行中のバッチ生成を取り消します（実行中の曲は最後まで生成されます）。"""
+        if self.batch_job is not None and not self.batch_job.finished:
+            self.batch_job.cancel()
@@ -0,0 +1,41 @@
+import tkinter as tk
+from tkinter import ttk
+
+class HistoryPanel(ttk.LabelFrame):
+    """生成した曲の履歴を一覧表示し、呼び出し・比較・書き出しを行うパネル"""
+
+    def __init__(self, parent, recall_command, compare_command, export_command, *args, **kwargs):
+        super().__init__(parent, text="[E] 履歴", padding="10", *args, **kwargs)
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        # 履歴の一覧（A/B 比較のため複数選択できるようにする）
+        self.listbox = tk.Listbox(self, selectmode=tk.EXTENDED, exportselection=False, width=32)
+        self.listbox.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.listbox.bind('<Double-Button-1>', lambda event: recall_command())
+        scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.listbox.yview)
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.listbox['yscrollcommand'] = scrollbar.set
+
+        # 操作ボタン
+        button_frame = ttk.Frame(self)
+        button_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        for column in range(3):
+            button_frame.columnconfigure(column, weight=1)
+        ttk.Button(button_frame, text="呼び出し", command=recall_command).grid(row=0, column=0, sticky=(tk.W, tk.E))
+        ttk.Button(button_frame, text="A/B 比較", command=compare_command).grid(row=0, column=1, sticky=(tk.W, tk.E))
+        ttk.Button(button_frame, text="書き出し...", command=export_command).grid(row=0, column=2, sticky=(tk.W, tk.E))
+
+    def set_entries(self, labels):
+        """一覧の表示を labels（古い順）で置き換え、最新のエントリを選択します。"""
+        self.listbox.delete(0, tk.END)
+        for label in labels:
+            self.listbox.insert(tk.END, label)
+        if labels:
+            self.listbox.selection_set(tk.END)
+            self.listbox.see(tk.END)
+
+    def selected_indices(self):
+        """選択されているエントリの位置（一覧の上から0始まり）のリストを返します。"""
+        return [int(index) for index in self.listbox.curselection()]
@@ -0,0 +1,222 @@
+import tkinter as tk
+from tkinter import ttk
+
+class _ItemPool:
+    """
+    同じ種類のキャンバスアイテムを使い回すためのプール。
+
+    描画のたびにアイテムを作り直すのではなく、前回のアイテムの座標と色だけを変更し、
+    余ったアイテムは非表示にします。アイテム数は画面に見えている分だけに保たれます。
+    """
+
+    def __init__(self, canvas, kind, tag, **options):
+        self.canvas = canvas
+        self.kind = kind          # 'rectangle' または 'line'
+        self.tag = tag            # 重なり順をまとめて変更するためのタグ
+        self.options = options    # 作成時の共通オプション
+        self.items = []
+        self.used = 0
+        self.created = False      # 今回の描画で新しいアイテムを作ったかどうか
+
+    def begin(self):
+        self.used = 0
+        self.created = False
+
+    def take(self, coords, **options):
+        """アイテムを1つ取り出して coords と options を設定します（足りなければ作成します）。"""
+        if self.used < len(self.items):
+            item = self.items[self.used]
+            self.canvas.coords(item, *coords)
+            self.canvas.itemconfigure(item, state='normal', **options)
+        else:
+            create = getattr(self.canvas, f'create_{self.kind}')
+            item = create(*coords, tags=self.tag, **self.options, **options)
+            self.items.append(item)
+            self.created = True
+        self.used += 1
+        return item
+
+    def end(self):
+        """今回の描画で使わなかったアイテムを非表示にします。"""
+        for item in self.items[self.used:]:
+            self.canvas.itemconfigure(item, state='hidden')
+
+class PianoRoll(ttk.LabelFrame):
+    """
+    生成結果をピアノロール形式で表示するパネル。
+
+    音符は小節ごとのバケットに振り分けて保持し、描画するのは表示範囲（ビューポート）に入る小節の
+    音符だけです。キャンバスのアイテムはスクロールやズームのたびに作り直さず、プールから使い回すため、
+    数万音の曲でもアイテム数は画面に見えている音符の数に抑えられます。
+
+    操作: マウスホイールで横スクロール、Ctrl + マウスホイールで横方向のズーム。
+    """
+
+    DEFAULT_MEASURE_WIDTH = 160   # 1小節あたりの横幅の初期値（ピクセル）
+    MIN_MEASURE_WIDTH = 8
+    MAX_MEASURE_WIDTH = 1280
+    ZOOM_STEP = 1.25
+    PITCH_PADDING = 2     # 表示する音域の上下の余白（半音）
+    MELODY_COLOR = '#e07b39'
+    ACCOMPANIMENT_COLOR = '#7fa7d9'
+    CHANGED_COLOR = '#fff4c2'  # 直前の更新で変わった小節の背景色
+    BAR_LINE_COLOR = '#c0c0c0'
+
+    def __init__(self, parent, *args, **kwargs):
+        super().__init__(parent, text="[D] ピアノロール", padding="5", *args, **kwargs)
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.canvas = tk.Canvas(self, height=180, background='white', highlightthickness=0)
+        self.canvas.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        # 小節数が多い場合は横にスクロールできるようにする
+        scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self._on_xview)
+        scrollbar.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        self.canvas['xscrollcommand'] = scrollbar.set
+
+        # 更新にかかった時間や入力エラーの表示
+        self.status_var = tk.StringVar(value="ライブモードを有効にすると、設定の変更がここに表示されます。")
+        ttk.Label(self, textvariable=self.status_var).grid(row=2, column=0, sticky=tk.W)
+
+        # 重なり順は下から 背景 -> 小節線 -> 伴奏 -> メロディー（_redraw で新しいアイテムを作ったときに揃える）
+        self._highlight_pool = _ItemPool(self.canvas, 'rectangle', 'changed', fill=self.CHANGED_COLOR, outline='')
+        self._bar_pool = _ItemPool(self.canvas, 'line', 'bar', fill=self.BAR_LINE_COLOR)
+        self._note_pools = {
+            False: _ItemPool(self.canvas, 'rectangle', 'accompaniment', fill=self.ACCOMPANIMENT_COLOR, outline=''),
+            True: _ItemPool(self.canvas, 'rectangle', 'melody', fill=self.MELODY_COLOR, outline=''),
+        }
+
+        # 表示中の曲
+        self.measure_width = self.DEFAULT_MEASURE_WIDTH
+        self._buckets = []          # 小節ごとの [(開始tick, 終了tick, 音高, メロディーか), ...]
+        self._ticks_per_measure = 1
+        self._changed = frozenset()
+        self._low = self._high = 0
+        self._redraw_job = None
+
+        self.canvas.bind('<Configure>', lambda event: self._schedule_redraw())
+        self.canvas.bind('<MouseWheel>', self._on_wheel)
+        self.canvas.bind('<Control-MouseWheel>', self._on_zoom)
+        # X11 ではホイールがボタン4/5として通知される
+        self.canvas.bind('<Button-4>', lambda event: self._scroll(-1))
+        self.canvas.bind('<Button-5>', lambda event: self._scroll(1))
+        self.canvas.bind('<Control-Button-4>', lambda event: self._zoom(self.ZOOM_STEP, event.x))
+        self.canvas.bind('<Control-Button-5>', lambda event: self._zoom(1 / self.ZOOM_STEP, event.x))
+
+    def set_status(self, message):
+        self.status_var.set(message)
+
+    def draw(self, melody_data, accompaniment_data, ticks_per_measure, num_measures, changed_measures=()):
+        """
+        表示する音符データを設定し、表示範囲を描画します。
+
+        Args:
+            melody_data (list): メロディーの音符データ。
+            accompaniment_data (list): 伴奏の音符データ。
+            ticks_per_measure (int): 1小節のTick数。
+            num_measures (int): 小節数。
+            changed_measures (Iterable[int]): 背景を強調表示する（直前の更新で変わった）小節の番号。
+        """
+        buckets = [[] for _ in range(num_measures)]
+        pitches = []
+        for notes_data, is_melody in ((accompaniment_data, False), (melody_data, True)):
+            for note in notes_data or []:
+                start = note['time']
+                measure = min(start // ticks_per_measure, num_measures - 1)
+                buckets[measure].append((start, start + note['duration'], note['pitch'], is_melody))
+                pitches.append(note['pitch'])
+
+        self._buckets = buckets
+        self._ticks_per_measure = ticks_per_measure
+        self._changed = frozenset(changed_measures)
+        if pitches:
+            self._low = min(pitches) - self.PITCH_PADDING
+            self._high = max(pitches) + self.PITCH_PADDING
+        self._update_scrollregion()
+        self._redraw()
+
+    # --- スクロールとズーム ---
+
+    def _on_xview(self, *args):
+        self.canvas.xview(*args)
+        self._redraw()
+
+    def _on_wheel(self, event):
+        self._scroll(-1 if event.delta > 0 else 1)
+
+    def _scroll(self, direction):
+        self.canvas.xview_scroll(direction, 'units')
+        self._redraw()
+
+    def _on_zoom(self, event):
+        self._zoom(self.ZOOM_STEP if event.delta > 0 else 1 / self.ZOOM_STEP, event.x)
+
+    def _zoom(self, factor, anchor_x):
+        """マウス位置（anchor_x）の時刻が同じ位置に留まるように、横方向に拡大・縮小します。"""
+        width = min(self.MAX_MEASURE_WIDTH, max(self.MIN_MEASURE_WIDTH, self.measure_width * factor))
+        if width == self.measure_width:
+            return
+        anchor_measure = self.canvas.canvasx(anchor_x) / self.measure_width
+        self.measure_width = width
+        self._update_scrollregion()
+        total = max(1.0, len(self._buckets) * width)
+        self.canvas.xview_moveto(max(0.0, (anchor_measure * width - anchor_x) / total))
+        self._redraw()
+
+    def _update_scrollregion(self):
+        self.canvas.configure(scrollregion=(0, 0, len(self._buckets) * self.measure_width, self._height()))
+
+    # --- 描画 ---
+
+    def _height(self):
+        return max(self.canvas.winfo_height(), int(self.canvas['height']))
+
+    def _schedule_redraw(self):
+        # ウィンドウのリサイズ中は <Configure> が連続するため、アイドル時に1回だけ描画する
+        if self._redraw_job is None:
+            self._redraw_job = self.after_idle(self._redraw)
+
+    def _visible_measures(self):
+        """表示範囲に入る小節の範囲 (first, last) を返します（last は含まない）。"""
+        left = self.canvas.canvasx(0)
+        right = left + max(self.canvas.winfo_width(), 1)
+        first = max(0, int(left // self.measure_width))
+        last = min(len(self._buckets), int(right // self.measure_width) + 1)
+        return first, last
+
+    def _redraw(self):
+        self._redraw_job = None
+        pools = [self._highlight_pool, self._bar_pool, *self._note_pools.values()]
+        for pool in pools:
+            pool.begin()
+
+        if self._buckets:
+            height = self._height()
+            row_height = height / (self._high - self._low + 1)
+            x_scale = self.measure_width / self._ticks_per_measure
+            first, last = self._visible_measures()
+
+            for i in range(first, last):
+                x = i * self.measure_width
+                if i in self._changed:
+                    self._highlight_pool.take((x, 0, x + self.measure_width, height))
+                self._bar_pool.take((x, 0, x, height))
+            end_x = last * self.measure_width
+            self._bar_pool.take((end_x, 0, end_x, height))
+
+            # 前の小節から伸びてくる音符も描くため、1つ前のバケットから見る
+            for bucket in self._buckets[max(0, first - 1):last]:
+                for start, end, pitch, is_melody in bucket:
+                    x0 = start * x_scale
+                    y0 = (self._high - pitch) * row_height
+                    self._note_pools[is_melody].take(
+                        (x0, y0, x0 + max(1.0, (end - start) * x_scale), y0 + row_height)
+                    )
+
+        for pool in pools:
+            pool.end()
+        if any(pool.created for pool in pools):
+            for pool in pools:
+                self.canvas.tag_raise(pool.tag)
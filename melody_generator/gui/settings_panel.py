@@ -3,48 +3,87 @@ from tkinter import ttk
 
 # 既存のファイルから設定値や選択肢をインポート
 from melody_generator import config
-from melody_generator.core.music_theory import SCALES
+from melody_generator.core.music_theory import KEY_NAMES
 from melody_generator.core.accompaniment import ACCOMPANIMENT_STYLES
+from melody_generator.core.profiles import DEFAULT_PROFILE_NAME
 
 class SettingsPanel(ttk.LabelFrame):
     """設定関連のウィジェットをまとめたパネル"""
 
-    def __init__(self, parent, *args, **kwargs):
+    def __init__(self, parent, profile_names=(), profile_command=None, *args, **kwargs):
         super().__init__(parent, text="[A] 設定パネル", padding="10", *args, **kwargs)
 
         self.columnconfigure(1, weight=1) # 2列目のテキストボックスが伸びるように設定
 
+        # プロファイル（選択すると、その値を各項目に読み込む）
+        ttk.Label(self, text="プロファイル:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        self.profile_var = tk.StringVar(value=DEFAULT_PROFILE_NAME)
+        profile_combo = ttk.Combobox(self, textvariable=self.profile_var, values=list(profile_names), state='readonly')
+        profile_combo.grid(row=0, column=1, sticky=(tk.W, tk.E), pady=2)
+        if profile_command is not None:
+            profile_combo.bind('<<ComboboxSelected>>', lambda event: profile_command(self.profile_var.get()))
+
         # キー
-        ttk.Label(self, text="キー:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        ttk.Label(self, text="キー:").grid(row=1, column=0, sticky=tk.W, pady=2)
         self.key_var = tk.StringVar(value=config.INPUT_KEY)
-        key_combo = ttk.Combobox(self, textvariable=self.key_var, values=list(SCALES.keys()))
-        key_combo.grid(row=0, column=1, sticky=(tk.W, tk.E), pady=2)
+        key_combo = ttk.Combobox(self, textvariable=self.key_var, values=KEY_NAMES)
+        key_combo.grid(row=1, column=1, sticky=(tk.W, tk.E), pady=2)
 
         # コード進行
-        ttk.Label(self, text="コード進行:").grid(row=1, column=0, sticky=(tk.W, tk.N), pady=2)
+        ttk.Label(self, text="コード進行:").grid(row=2, column=0, sticky=(tk.W, tk.N), pady=2)
         self.chord_text = tk.Text(self, height=5)
         self.chord_text.insert(tk.END, ", ".join(config.INPUT_CHORD_PROGRESSION))
-        self.chord_text.grid(row=1, column=1, sticky=(tk.W, tk.E, tk.N, tk.S), pady=2)
-        self.rowconfigure(1, weight=1) # この行が垂直方向に伸びるように設定
+        self.chord_text.grid(row=2, column=1, sticky=(tk.W, tk.E, tk.N, tk.S), pady=2)
+        self.rowconfigure(2, weight=1) # この行が垂直方向に伸びるように設定
 
         # モチーフ
-        ttk.Label(self, text="モチーフ:").grid(row=2, column=0, sticky=(tk.W, tk.N), pady=2)
+        ttk.Label(self, text="モチーフ:").grid(row=3, column=0, sticky=(tk.W, tk.N), pady=2)
         self.motif_text = tk.Text(self, height=5)
         motif_str = ",\n".join([str(n) for n in config.INPUT_MOTIF])
         self.motif_text.insert(tk.END, motif_str)
-        self.motif_text.grid(row=2, column=1, sticky=(tk.W, tk.E, tk.N, tk.S), pady=2)
-        self.rowconfigure(2, weight=1) # この行が垂直方向に伸びるように設定
+        self.motif_text.grid(row=3, column=1, sticky=(tk.W, tk.E, tk.N, tk.S), pady=2)
+        self.rowconfigure(3, weight=1) # この行が垂直方向に伸びるように設定
 
         # 小節数
-        ttk.Label(self, text="小節数:").grid(row=3, column=0, sticky=tk.W, pady=2)
+        ttk.Label(self, text="小節数:").grid(row=4, column=0, sticky=tk.W, pady=2)
         self.measures_var = tk.StringVar(value=str(config.NUMBER_OF_MEASURES))
         measures_entry = ttk.Entry(self, textvariable=self.measures_var, width=10)
-        measures_entry.grid(row=3, column=1, sticky=tk.W, pady=2)
+        measures_entry.grid(row=4, column=1, sticky=tk.W, pady=2)
 
         # 伴奏スタイル
-        ttk.Label(self, text="伴奏スタイル:").grid(row=4, column=0, sticky=tk.W, pady=2)
+        ttk.Label(self, text="伴奏スタイル:").grid(row=5, column=0, sticky=tk.W, pady=2)
         self.accomp_var = tk.StringVar(value=config.ACCOMPANIMENT_GENERATOR)
         # 'random'も選択肢に含める
         accomp_styles = ['random'] + ACCOMPANIMENT_STYLES
         accomp_combo = ttk.Combobox(self, textvariable=self.accomp_var, values=accomp_styles)
-        accomp_combo.grid(row=4, column=1, sticky=(tk.W, tk.E), pady=2)
\ No newline at end of file
+        accomp_combo.grid(row=5, column=1, sticky=(tk.W, tk.E), pady=2)
+
+        # ライブモード
+        self.live_var = tk.BooleanVar(value=False)
+        live_check = ttk.Checkbutton(self, text="ライブモード（編集するたびにピアノロールを更新）", variable=self.live_var)
+        live_check.grid(row=6, column=0, columnspan=2, sticky=tk.W, pady=2)
+
+    def set_values(self, melody_config):
+        """設定（MelodyConfig）の内容を各ウィジェットに反映します（履歴の呼び出し用）。"""
+        self.key_var.set(melody_config.key)
+        self.chord_text.delete("1.0", tk.END)
+        self.chord_text.insert(tk.END, ", ".join(melody_config.chord_progression))
+        self.motif_text.delete("1.0", tk.END)
+        self.motif_text.insert(tk.END, ",\n".join(str(note) for note in melody_config.motif_notes))
+        self.measures_var.set(str(melody_config.num_measures))
+        self.accomp_var.set(melody_config.accompaniment_generator)
+
+    def bind_changes(self, callback):
+        """設定の値が編集されるたびに callback() を呼ぶようにします（ライブモード用）。"""
+        for var in (self.key_var, self.measures_var, self.accomp_var, self.live_var):
+            var.trace_add('write', lambda *_: callback())
+        for text in (self.chord_text, self.motif_text):
+            text.bind('<<Modified>>', lambda event: self._on_text_modified(event, callback))
+
+    def _on_text_modified(self, event, callback):
+        # 変更フラグを戻しておかないと、次の編集で <<Modified>> が発生しない
+        # （フラグを戻したときにも発生するため、その呼び出しは無視する）
+        if not event.widget.edit_modified():
+            return
+        event.widget.edit_modified(False)
+        callback()
@@ -0,0 +1,165 @@
+"""
+生成したメロディーと伴奏を、LMMS のプロジェクトファイル (.mmp) として書き出すユーティリティ。
+
+既存の .mmp をテンプレートとして読み込み（1テンプレートにつき1回だけ解析してキャッシュ）、
+楽器・BPM・拍子などの設定はテンプレートのものを使います。出力はストリーミング方式の
+XMLライターで直接書き出すため、大量のプロジェクトを書き出す場合もDOMを組み立てるコストがかかりません。
+"""
+import os
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from xml.sax.saxutils import XMLGenerator
+
+# リポジトリに含まれている既定のテンプレート
+DEFAULT_TEMPLATE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'music', 'mymusic.mmp'
+)
+
+# LMMS の分解能（4分音符 = 48 ティック、4/4拍子の1小節 = 192 ティック）
+LMMS_TICKS_PER_BEAT = 48
+
+# LMMS の音量 100 が MIDI ベロシティ 64 に相当するものとして換算する
+LMMS_VOLUME_PER_VELOCITY = 100 / 64
+
+# LMMS の音符の key は MIDI ノート番号より1オクターブ低い（MIDI 60 の C4 が key 48）。key の範囲は 0〜119
+LMMS_KEY_OFFSET = 12
+LMMS_MAX_KEY = 119
+
+# インストゥルメントトラックを表す track 要素の type 属性
+_INSTRUMENT_TRACK_TYPE = '0'
+
+@lru_cache(maxsize=None)
+def load_lmms_template(template_path):
+    """
+    テンプレートの .mmp を解析してキャッシュします。
+
+    Returns:
+        xml.etree.ElementTree.Element: プロジェクトのルート要素（読み取り専用として扱うこと）。
+    """
+    return ET.parse(template_path).getroot()
+
+def _to_lmms_ticks(ticks, ticks_per_beat):
+    return round(ticks * LMMS_TICKS_PER_BEAT / ticks_per_beat)
+
+def _build_patterns(notes_data, ticks_per_beat, ticks_per_measure, chord_progression):
+    """
+    音符データを小節単位の LMMS パターン（名前, 開始位置, 音符属性のリスト）に分割します。
+    """
+    measures = {}
+    for note in notes_data:
+        index = note['time'] // ticks_per_measure
+        offset = note['time'] - index * ticks_per_measure
+        velocity = note.get('velocity', 64)
+        measures.setdefault(index, []).append({
+            'vol': str(min(200, max(0, round(velocity * LMMS_VOLUME_PER_VELOCITY)))),
+            'len': str(max(1, _to_lmms_ticks(note['duration'], ticks_per_beat))),
+            'pos': str(_to_lmms_ticks(offset, ticks_per_beat)),
+            'pan': '0',
+            'key': str(min(LMMS_MAX_KEY, max(0, note['pitch'] - LMMS_KEY_OFFSET))),
+        })
+
+    patterns = []
+    for index in sorted(measures):
+        if chord_progression and index < len(chord_progression):
+            name = chord_progression[index]
+        else:
+            name = str(index + 1)
+        patterns.append((name, _to_lmms_ticks(index * ticks_per_measure, ticks_per_beat), measures[index]))
+    return patterns
+
+def _emit_element(writer, element, attr_overrides, on_track):
+    """テンプレートの要素をストリーミングで書き出します（インストゥルメントトラックは on_track に委ねる）。"""
+    if element.tag == 'track' and element.get('type') == _INSTRUMENT_TRACK_TYPE:
+        on_track(writer, element)
+        return
+    writer.startElement(element.tag, attr_overrides.get(id(element), element.attrib))
+    if element.text and element.text.strip():
+        writer.characters(element.text)
+    for child in element:
+        _emit_element(writer, child, attr_overrides, on_track)
+    writer.endElement(element.tag)
+
+def create_lmms_project(melody_data, output_filename, ticks_per_beat=480, accompaniment_data=None,
+                        chord_progression=None, beats_per_measure=4, beat_unit=4,
+                        template_path=DEFAULT_TEMPLATE_PATH, bpm=None):
+    """
+    メロディーデータからLMMSプロジェクトファイル (.mmp) を生成する関数。
+
+    テンプレートの1つ目のインストゥルメントトラックにメロディー、2つ目に伴奏を、
+    小節ごとのパターン（パターン名はその小節のコード名）として配置します。テンプレートの
+    インストゥルメントトラックがパートより少ない場合は、最後のトラックを複製して残りのパートに使います。
+
+    Args:
+        melody_data (list): 音符の辞書を含むリスト。
+        output_filename (str): 出力する .mmp ファイル名。
+        ticks_per_beat (int): 音符データの1拍あたりのティック数。
+        accompaniment_data (list, optional): 伴奏の音符データのリスト。
+        chord_progression (list, optional): パターン名に使うコード名のリスト。
+        beats_per_measure (int): 拍子の分子。
+        beat_unit (int): 拍子の分母。
+        template_path (str): テンプレートとして使う .mmp ファイルのパス。
+        bpm (int, optional): テンポ。指定しない場合はテンプレートのテンポを使います。
+
+    Raises:
+        ValueError: テンプレートにインストゥルメントトラックが1つもない場合。
+    """
+    template = load_lmms_template(template_path)
+    ticks_per_measure = ticks_per_beat * 4 * beats_per_measure // beat_unit
+    parts = [melody_data]
+    if accompaniment_data:
+        parts.append(accompaniment_data)
+    part_patterns = [_build_patterns(p, ticks_per_beat, ticks_per_measure, chord_progression) for p in parts]
+    steps = str(16 * beats_per_measure // beat_unit)
+
+    # --- テンポと拍子の上書き（head の値と、それを制御するオートメーションの両方）---
+    head_values = {'timesig_numerator': beats_per_measure, 'timesig_denominator': beat_unit}
+    if bpm is not None:
+        head_values['bpm'] = bpm
+    attr_overrides = {}
+    values_by_id = {}
+    head = template.find('head')
+    for tag, value in head_values.items():
+        element = head.find(tag) if head is not None else None
+        if element is not None:
+            attr_overrides[id(element)] = dict(element.attrib, value=str(value))
+            values_by_id[element.get('id')] = str(value)
+    for pattern in template.iter('automationpattern'):
+        target = pattern.find('object')
+        if target is not None and target.get('id') in values_by_id:
+            for point in pattern.findall('time'):
+                attr_overrides[id(point)] = dict(point.attrib, value=values_by_id[target.get('id')])
+
+    # --- インストゥルメントトラックの書き出し ---
+    instrument_tracks = [t for t in template.iter('track') if t.get('type') == _INSTRUMENT_TRACK_TYPE]
+    if not instrument_tracks:
+        raise ValueError(f"テンプレート '{template_path}' にインストゥルメントトラックがありません。")
+
+    def write_track(writer, track):
+        index = instrument_tracks.index(track)
+        if index >= len(part_patterns):
+            return  # 使わないトラックは出力しない
+        write_part(writer, track, part_patterns[index])
+        if index == len(instrument_tracks) - 1:
+            # トラックが足りないパートは、最後のトラック（楽器の設定を含む）を複製して書き出す
+            for patterns in part_patterns[index + 1:]:
+                write_part(writer, track, patterns)
+
+    def write_part(writer, track, patterns):
+        writer.startElement('track', track.attrib)
+        for child in track:
+            if child.tag != 'pattern':
+                _emit_element(writer, child, attr_overrides, write_track)
+        for name, pos, notes in patterns:
+            writer.startElement('pattern', {'muted': '0', 'type': '1', 'name': name, 'pos': str(pos), 'steps': steps})
+            for note_attrs in notes:
+                writer.startElement('note', note_attrs)
+                writer.endElement('note')
+            writer.endElement('pattern')
+        writer.endElement('track')
+
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        writer = XMLGenerator(f, encoding='utf-8', short_empty_elements=True)
+        writer.startDocument()
+        f.write('<!DOCTYPE lmms-project>\n')
+        _emit_element(writer, template, attr_overrides, write_track)
+        writer.endDocument()
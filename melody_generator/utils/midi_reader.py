@@ -0,0 +1,346 @@
+"""
+既存のMIDIファイルを、モチーフやコード進行の素材として読み込むユーティリティ。
+
+Standard MIDI File のバイト列を直接解析し、メッセージごとのオブジェクトを作らずに
+デルタタイムとノートイベントを整数配列へ展開します。フォルダ単位で大量の参考MIDIを
+設定（MelodyConfig）として取り込む用途を想定しています。
+"""
+import glob
+import logging
+import os
+import struct
+from array import array
+from dataclasses import dataclass
+
+import numpy as np
+
+from melody_generator.core.melody_config import MelodyConfig
+from melody_generator.core.music_theory import NOTE_NAMES, SCALE_MASKS, get_chord
+from melody_generator.core.log_events import log_event
+from melody_generator.utils.note_array import NOTE_DTYPE
+
+logger = logging.getLogger(__name__)
+
+# General MIDI のドラムチャンネル（0始まり）。和音推定の対象から除外します。
+DRUM_CHANNEL = 9
+
+# チャンネルメッセージ（上位4ビット）ごとのデータバイト数
+_DATA_LENGTHS = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+# コード推定で候補にするコードの種類
+DEFAULT_CHORD_QUALITIES = ('', 'm', 'dim', '7', 'm7', 'maj7')
+
+@dataclass
+class MidiScore:
+    """
+    MIDIファイルから読み込んだ音符と拍子情報。
+
+    Attributes:
+        ticks_per_beat (int): ファイルの分解能（4分音符あたりのティック数）。
+        numerator (int): 拍子の分子（最初の拍子記号。なければ4）。
+        denominator (int): 拍子の分母（最初の拍子記号。なければ4）。
+        notes (numpy.ndarray): NOTE_DTYPE の音符配列（発音時刻順）。
+        channels (numpy.ndarray): 各音符のMIDIチャンネル。
+        tracks (numpy.ndarray): 各音符が含まれていたトラックの番号（0始まり）。
+    """
+    ticks_per_beat: int
+    numerator: int
+    denominator: int
+    notes: np.ndarray
+    channels: np.ndarray
+    tracks: np.ndarray
+
+    @property
+    def ticks_per_measure(self):
+        return self.ticks_per_beat * 4 * self.numerator // self.denominator
+
+    @property
+    def num_measures(self):
+        if not len(self.notes):
+            return 0
+        end = int((self.notes['time'].astype(np.int64) + self.notes['duration']).max())
+        return -(-end // self.ticks_per_measure)
+
+def _read_varlen(data, pos):
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, pos
+
+def parse_midi_bytes(data):
+    """
+    Standard MIDI File のバイト列を解析します。
+
+    Args:
+        data (bytes): MIDIファイルの内容。
+
+    Returns:
+        MidiScore: 解析結果。
+
+    Raises:
+        ValueError: MIDIファイルとして解釈できない場合。
+    """
+    if data[:4] != b'MThd':
+        raise ValueError("MIDIファイルのヘッダ (MThd) が見つかりません。")
+    header_length, _, num_tracks, division = struct.unpack('>IHHH', data[4:14])
+    if division & 0x8000:
+        raise ValueError("SMPTE形式の時間単位を持つMIDIファイルには対応していません。")
+
+    pitches, starts, durations, velocities = array('h'), array('q'), array('q'), array('h')
+    channels, tracks = array('b'), array('h')
+    numerator, denominator = None, None
+    pos = 8 + header_length
+
+    for track_index in range(num_tracks):
+        if data[pos:pos + 4] != b'MTrk':
+            break
+        track_end = pos + 8 + struct.unpack('>I', data[pos + 4:pos + 8])[0]
+        pos += 8
+        tick = 0
+        status = 0
+        sounding = {}  # (channel << 7 | pitch) -> [(開始時刻, ベロシティ), ...]
+
+        while pos < track_end:
+            delta, pos = _read_varlen(data, pos)
+            tick += delta
+            byte = data[pos]
+            if byte >= 0x80:
+                status = byte
+                pos += 1
+            if status == 0xFF:  # メタイベント
+                meta_type = data[pos]
+                length, pos = _read_varlen(data, pos + 1)
+                if meta_type == 0x58 and numerator is None and length >= 2:
+                    numerator, denominator = data[pos], 2 ** data[pos + 1]
+                pos += length
+                if meta_type == 0x2F:
+                    break
+                continue
+            if status in (0xF0, 0xF7):  # SysEx
+                length, pos = _read_varlen(data, pos)
+                pos += length
+                continue
+
+            kind, channel = status & 0xF0, status & 0x0F
+            if kind in (0x80, 0x90):
+                pitch, velocity = data[pos], data[pos + 1]
+                key = channel << 7 | pitch
+                if kind == 0x90 and velocity > 0:
+                    sounding.setdefault(key, []).append((tick, velocity))
+                elif sounding.get(key):
+                    start, on_velocity = sounding[key].pop(0)
+                    pitches.append(pitch)
+                    starts.append(start)
+                    durations.append(tick - start)
+                    velocities.append(on_velocity)
+                    channels.append(channel)
+                    tracks.append(track_index)
+            pos += _DATA_LENGTHS.get(kind, 0)
+        pos = track_end
+
+    notes = np.empty(len(pitches), dtype=NOTE_DTYPE)
+    notes['pitch'] = np.frombuffer(pitches, dtype=np.int16)
+    notes['time'] = np.frombuffer(starts, dtype=np.int64)
+    notes['duration'] = np.frombuffer(durations, dtype=np.int64)
+    notes['velocity'] = np.frombuffer(velocities, dtype=np.int16)
+    channel_array = np.frombuffer(channels, dtype=np.int8).astype(np.int16)
+    track_array = np.frombuffer(tracks, dtype=np.int16)
+    order = np.argsort(notes['time'], kind='stable')
+    return MidiScore(
+        division, numerator or 4, denominator or 4, notes[order], channel_array[order], track_array[order]
+    )
+
+def read_midi(path):
+    """MIDIファイルを読み込み、MidiScore を返します。"""
+    with open(path, 'rb') as f:
+        return parse_midi_bytes(f.read())
+
+def _pitched_notes(score):
+    """ドラムチャンネル以外の音符だけを返します。"""
+    return score.notes[score.channels != DRUM_CHANNEL]
+
+def find_melody_track(score):
+    """平均ピッチが最も高いトラック（ドラムを除く）をメロディートラックとみなして、その番号を返します。"""
+    pitched = score.channels != DRUM_CHANNEL
+    if not pitched.any():
+        return None
+    tracks = score.tracks[pitched]
+    sums = np.bincount(tracks, weights=score.notes['pitch'][pitched])
+    counts = np.bincount(tracks)
+    return int(np.argmax(np.where(counts > 0, sums / np.maximum(counts, 1), -1)))
+
+def extract_motif(score, start_measure=0, end_measure=1, ticks_per_beat=480, track=None):
+    """
+    指定した小節範囲から、(ピッチ, 長さ) 形式の単旋律モチーフを取り出します。
+    同時に鳴っている音は最も高い音を採用し、休符は直前の音の長さに含めます。
+
+    Args:
+        score (MidiScore): 読み込んだMIDIデータ。
+        start_measure (int): 開始小節（0始まり、この小節を含む）。
+        end_measure (int): 終了小節（この小節を含まない）。
+        ticks_per_beat (int): モチーフの長さを表す分解能（ファイルの分解能から換算します）。
+        track (int, optional): モチーフを取り出すトラック番号。省略時は find_melody_track で選びます。
+
+    Returns:
+        list[tuple[int, int]]: モチーフの音符リスト。
+    """
+    if track is None:
+        track = find_melody_track(score)
+    notes = score.notes[(score.tracks == track) & (score.channels != DRUM_CHANNEL)]
+    range_start = start_measure * score.ticks_per_measure
+    range_end = end_measure * score.ticks_per_measure
+    notes = notes[(notes['time'] >= range_start) & (notes['time'] < range_end)]
+    if not len(notes):
+        return []
+
+    # 発音時刻ごとに最も高い音を残す（時刻昇順・ピッチ降順に並べて各時刻の先頭を取る）
+    order = np.lexsort((-notes['pitch'].astype(np.int32), notes['time']))
+    notes = notes[order]
+    first = np.ones(len(notes), dtype=bool)
+    first[1:] = notes['time'][1:] != notes['time'][:-1]
+    notes = notes[first]
+
+    time = notes['time'].astype(np.int64)
+    last_end = min(int(time[-1] + notes['duration'][-1]), range_end)
+    durations = np.diff(np.append(time, last_end))
+    scale = ticks_per_beat / score.ticks_per_beat
+    return [
+        (int(pitch), max(1, round(int(duration) * scale)))
+        for pitch, duration in zip(notes['pitch'], durations)
+    ]
+
+def _chord_templates(qualities):
+    symbols = [root + quality for quality in qualities for root in NOTE_NAMES]
+    templates = np.zeros((len(symbols), 12))
+    roots = np.zeros(len(symbols), dtype=np.int64)
+    for i, symbol in enumerate(symbols):
+        chord = get_chord(symbol)
+        templates[i] = [(chord.mask >> pc) & 1 for pc in range(12)]
+        roots[i] = chord.root
+    # 構成音の数が多いコードが有利にならないように正規化する
+    templates /= np.linalg.norm(templates, axis=1, keepdims=True)
+    return symbols, templates, roots
+
+def _measure_histograms(notes, ticks_per_measure, num_measures):
+    """小節ごとのピッチクラスヒストグラム（小節内で鳴っている長さで重み付け）を計算します。"""
+    time = notes['time'].astype(np.int64)
+    measure = time // ticks_per_measure
+    weight = np.minimum(notes['duration'], (measure + 1) * ticks_per_measure - time).astype(np.float64)
+    histograms = np.zeros((num_measures, 12))
+    np.add.at(histograms, (measure, notes['pitch'] % 12), weight)
+    return histograms
+
+def infer_chord_progression(score, qualities=DEFAULT_CHORD_QUALITIES, bass_weight=0.1):
+    """
+    小節ごとのピッチクラスヒストグラムとコードのテンプレートを照合して、コード進行を推定します。
+
+    Args:
+        score (MidiScore): 読み込んだMIDIデータ。
+        qualities (tuple): 候補にするコードの種類（CHORD_QUALITIES のキー）。
+        bass_weight (float): 小節の最低音がコードのルートと一致する場合に加える得点。
+
+    Returns:
+        list[str]: 小節ごとのコードシンボル。音のない小節は直前のコードを引き継ぎます。
+    """
+    notes = _pitched_notes(score)
+    num_measures = score.num_measures
+    if not num_measures or not len(notes):
+        return []
+    symbols, templates, roots = _chord_templates(qualities)
+
+    histograms = _measure_histograms(notes, score.ticks_per_measure, num_measures)
+    norms = np.linalg.norm(histograms, axis=1, keepdims=True)
+    scores = (histograms / np.where(norms > 0, norms, 1)) @ templates.T  # (小節数, 候補数)
+
+    # 各小節の最低音のピッチクラス
+    measure = notes['time'].astype(np.int64) // score.ticks_per_measure
+    lowest = np.full(num_measures, 128)
+    np.minimum.at(lowest, measure, notes['pitch'].astype(np.int64))
+    has_bass = lowest < 128
+    scores += bass_weight * (has_bass[:, None] & (roots[None, :] == (lowest[:, None] % 12)))
+
+    best = scores.argmax(axis=1)
+    progression = []
+    for i in range(num_measures):
+        if norms[i, 0] > 0:
+            progression.append(symbols[best[i]])
+        else:
+            progression.append(progression[-1] if progression else symbols[0])
+    return progression
+
+def estimate_key(score, modes=('major', 'minor')):
+    """
+    曲全体のピッチクラス分布に最もよく当てはまるキー名（例: 'G_major'）を推定します。
+    """
+    notes = _pitched_notes(score)
+    histogram = np.bincount(notes['pitch'] % 12, weights=notes['duration'], minlength=12)
+    best_key, best_score = f"C_{modes[0]}", -1.0
+    for mode in modes:
+        for root in NOTE_NAMES:
+            key = f"{root}_{mode}"
+            mask = SCALE_MASKS[key]
+            in_scale = sum(histogram[pc] for pc in range(12) if mask >> pc & 1)
+            # 主音の重みを少し加えて、平行調どうしを区別する
+            fit = in_scale + 0.5 * histogram[(NOTE_NAMES.index(root))]
+            if fit > best_score:
+                best_key, best_score = key, fit
+    return best_key
+
+def config_from_midi(path, motif_measures=(0, 1), num_measures=8, ticks_per_beat=480, key=None, **config_kwargs):
+    """
+    MIDIファイルから、モチーフとコード進行を取り出した MelodyConfig を作成します。
+
+    Args:
+        path (str): MIDIファイルのパス。
+        motif_measures (tuple): モチーフとして取り出す小節範囲 (開始, 終了)。モチーフは1小節分なので、範囲は1小節にしてください。
+        num_measures (int): 生成する小節数。ファイルのコード進行は、短い場合は繰り返して補い、長い場合は切り詰めます。
+        ticks_per_beat (int): 生成時の分解能。
+        key (str, optional): キー。省略時はファイルから推定します。
+        **config_kwargs: MelodyConfig に渡すその他の設定。
+
+    Returns:
+        MelodyConfig: 作成した設定。
+
+    Raises:
+        ValueError: motif_measures が1小節の範囲でない場合、またはファイルから音符を読み取れない場合。
+    """
+    start_measure, end_measure = motif_measures
+    if end_measure - start_measure != 1:
+        raise ValueError(f"モチーフは1小節分である必要があります。motif_measures には (n, n + 1) の形で"
+                         f"1小節の範囲を指定してください: {tuple(motif_measures)}")
+    score = read_midi(path)
+    progression = infer_chord_progression(score)
+    if not progression:
+        raise ValueError(f"'{path}' から音符を読み取れませんでした。")
+    # 伴奏がメロディーより長くならないよう、コード進行はちょうど num_measures 小節にそろえる
+    progression = [progression[i % len(progression)] for i in range(num_measures)]
+    return MelodyConfig(
+        key=key or estimate_key(score),
+        chord_progression=progression,
+        num_measures=num_measures,
+        ticks_per_beat=ticks_per_beat,
+        beats_per_measure=score.numerator,
+        beat_unit=score.denominator,
+        motif_notes=extract_motif(score, start_measure, end_measure, ticks_per_beat=ticks_per_beat),
+        **config_kwargs
+    )
+
+def load_configs_from_folder(folder, pattern='*.mid', **kwargs):
+    """
+    フォルダ内のMIDIファイルをまとめて MelodyConfig に変換します。
+    読み込めなかったファイルは警告を記録してスキップします。
+
+    Returns:
+        dict: ファイルパス -> MelodyConfig の辞書。
+    """
+    configs = {}
+    for path in sorted(glob.glob(os.path.join(folder, pattern))):
+        try:
+            configs[path] = config_from_midi(path, **kwargs)
+        except (ValueError, IndexError, struct.error) as e:
+            log_event(logger, 'midi_load_failed', "'%(path)s' を読み込めませんでした: %(error)s",
+                      level=logging.WARNING, path=path, error=e)
+    return configs
@@ -1,7 +1,7 @@
 import mido
 from melody_generator.core.music_theory import CHORDS
 
-def _create_track_from_notes(notes_data, velocity=64):
+def _create_track_from_notes(notes_data, velocity=64, channel=0):
     """
     音符データのリストからMIDIトラックを生成するヘルパー関数。
     絶対時間で記述された音符リストを、デルタタイムを持つMIDIイベントに変換します。
@@ -9,7 +9,9 @@ def _create_track_from_notes(notes_data, velocity=64):
     Args:
         notes_data (list): 音符の辞書を含むリスト。
             各辞書は {'pitch': int, 'time': int, 'duration': int} の形式。
-        velocity (int): MIDIノートのベロシティ（音の強さ）。
+            'velocity' キーを持つ音符は、そのベロシティで出力されます。
+        velocity (int): 'velocity' キーを持たない音符に使うベロシティ（音の強さ）。
+        channel (int): MIDIチャンネル (0〜15)。
 
     Returns:
         mido.MidiTrack: 生成されたMIDIトラック。
@@ -19,8 +21,9 @@ def _create_track_from_notes(notes_data, velocity=64):
 
     # 1. 音符データを note_on/note_off イベントに変換
     for note in notes_data:
-        midi_events.append({'type': 'note_on', 'pitch': note['pitch'], 'velocity': velocity, 'time': note['time']})
-        midi_events.append({'type': 'note_off', 'pitch': note['pitch'], 'velocity': velocity, 'time': note['time'] + note['duration']})
+        note_velocity = note.get('velocity', velocity)
+        midi_events.append({'type': 'note_on', 'pitch': note['pitch'], 'velocity': note_velocity, 'time': note['time']})
+        midi_events.append({'type': 'note_off', 'pitch': note['pitch'], 'velocity': note_velocity, 'time': note['time'] + note['duration']})
 
     # 2. イベントを時間順にソート
     midi_events.sort(key=lambda x: x['time'])
@@ -30,13 +33,25 @@ def _create_track_from_notes(notes_data, velocity=64):
     for event in midi_events:
         delta_time = int(event['time'] - last_event_time)
         track.append(mido.Message(
-            event['type'], note=event['pitch'], velocity=event['velocity'], time=delta_time
+            event['type'], note=event['pitch'], velocity=event['velocity'], time=delta_time, channel=channel
         ))
         last_event_time = event['time']
 
     return track
 
-def create_midi_file(melody_data, output_filename, ticks_per_beat=480, accompaniment_data=None):
+def _insert_text_events(track, text_events):
+    """トラックの先頭（時刻0）にテキストのメタイベントを挿入します。"""
+    for i, text in enumerate(text_events):
+        track.insert(i, mido.MetaMessage('text', text=text, time=0))
+
+def _insert_time_signature(track, time_signature):
+    """トラックの先頭（時刻0）に拍子のメタイベントを挿入します。time_signature が None なら何もしません。"""
+    if time_signature is not None:
+        numerator, denominator = time_signature
+        track.insert(0, mido.MetaMessage('time_signature', numerator=numerator, denominator=denominator, time=0))
+
+def create_midi_file(melody_data, output_filename, ticks_per_beat=480, accompaniment_data=None, text_events=(),
+                     time_signature=None):
     """
     メロディーデータからMIDIファイルを生成する関数。
 
@@ -45,12 +60,17 @@ def create_midi_file(melody_data, output_filename, ticks_per_beat=480, accompani
         output_filename (str): 出力するMIDIファイル名。
         ticks_per_beat (int): 1拍あたりのティック数。
         accompaniment_data (list, optional): 伴奏の音符データのリスト。指定された場合、伴奏トラックを追加する。
+        text_events (list): メロディートラックの先頭に入れるテキストイベントの文字列（マニフェストなど）。
+        time_signature (tuple, optional): 拍子 (分子, 分母)。指定された場合、メロディートラックの先頭に書き込む
+                                          （省略時は書き込まず、読み手は4/4として扱う）。
     """
     mid = mido.MidiFile(ticks_per_beat=ticks_per_beat)
 
     # --- メロディートラックの生成 ---
     # ヘルパー関数を使ってメロディートラックを生成
     melody_track = _create_track_from_notes(melody_data, velocity=64)
+    _insert_text_events(melody_track, text_events)
+    _insert_time_signature(melody_track, time_signature)
     mid.tracks.append(melody_track)
 
     # --- 伴奏トラックの生成 (伴奏データが指定されている場合) ---
@@ -59,4 +79,44 @@ def create_midi_file(melody_data, output_filename, ticks_per_beat=480, accompani
         chord_track = _create_track_from_notes(accompaniment_data, velocity=40)
         mid.tracks.append(chord_track)
 
-    mid.save(output_filename)
\ No newline at end of file
+    mid.save(output_filename)
+
+def create_arrangement_midi_file(parts, output_filename, ticks_per_beat=480, text_events=(), time_signature=None):
+    """
+    編曲の各パートを1トラックずつ持つ、フォーマット1のMIDIファイルを生成する関数。
+    全トラックを組み立ててから、一度の書き出しでファイルに保存します。
+
+    Args:
+        parts (list): arrangement.Part のリスト。
+        output_filename (str): 出力するMIDIファイル名。
+        ticks_per_beat (int): 1拍あたりのティック数。
+        text_events (list): 最初のトラックの先頭に入れるテキストイベントの文字列（マニフェストなど）。
+        time_signature (tuple, optional): 拍子 (分子, 分母)。指定された場合、最初のトラックの先頭に書き込む。
+    """
+    mid = mido.MidiFile(type=1, ticks_per_beat=ticks_per_beat)
+
+    for part in parts:
+        track = _create_track_from_notes(part.notes, channel=part.channel)
+        # トラックの先頭にトラック名と音色（プログラムチェンジ）を入れる
+        track.insert(0, mido.MetaMessage('track_name', name=part.name, time=0))
+        track.insert(1, mido.Message('program_change', program=part.program, channel=part.channel, time=0))
+        mid.tracks.append(track)
+    if mid.tracks:
+        _insert_text_events(mid.tracks[0], text_events)
+        _insert_time_signature(mid.tracks[0], time_signature)
+
+    mid.save(output_filename)
+
+def read_text_events(path):
+    """
+    MIDIファイルに含まれるテキストのメタイベントの文字列を、トラック順に返します。
+
+    Args:
+        path (str): MIDIファイルのパス。
+
+    Returns:
+        list: テキストイベントの文字列のリスト。
+    """
+    mid = mido.MidiFile(path)
+    return [message.text for track in mid.tracks for message in track
+            if message.is_meta and message.type == 'text']
@@ -0,0 +1,340 @@
+"""
+大量に生成した曲をまとめて保存するための、チャンク単位の列指向バイナリ形式（ノートアーカイブ）。
+
+1曲ごとに .mid ファイルを作る代わりに、多数の曲を1つのファイルに追記していきます。
+
+ファイルの構成（数値はすべてリトルエンディアン）:
+
+    ファイルヘッダー: マジック 'MGNA', バージョン (uint16), 予約 (uint16)
+    チャンク × n:
+        チャンクヘッダー: マジック 'CHNK', フラグ (uint32), 曲数, 音符数 (uint32),
+                          格納サイズ, 展開後のサイズ (uint64)
+        本体（フラグの bit0 が立っていれば zstd 圧縮）:
+            曲テーブル (PIECE_DTYPE × 曲数)
+            pitch (int16 × 音符数), time (int32 × 音符数), duration (int32 × 音符数), velocity (int16 × 音符数)
+
+各曲の音符はメロディー、伴奏の順に連続して並び、曲テーブルの開始位置と音符数で参照します。
+曲の番号（piece id）はファイル内での追記順の通し番号です。
+
+書き込みはチャンク単位でファイルをロックして末尾に追記するため、複数のワーカープロセスが
+同じアーカイブへ並行して書き込めます。読み込みは mmap で行い、チャンクヘッダーだけを走査して
+索引を作るので、任意の曲を番号で直接取り出せます（非圧縮のチャンクはコピーせずに参照します）。
+"""
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import numpy as np
+
+from .note_array import NOTE_DTYPE, notes_to_array, array_to_notes
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+FILE_MAGIC = b'MGNA'
+CHUNK_MAGIC = b'CHNK'
+FORMAT_VERSION = 1
+_FILE_HEADER = struct.Struct('<4sHH')
+_CHUNK_HEADER = struct.Struct('<4sIIIQQ')
+_FLAG_ZSTD = 1
+
+# 1曲分のメタデータ
+PIECE_DTYPE = np.dtype([
+    # MelodyConfig.config_hash（16バイトの生の値。全バイト0は記録なし）。
+    # 'S16' は末尾の 0x00 を落として読み出すため、バイト列の配列として持つ
+    ('config_hash', 'u1', (16,)),
+    ('seed', '<i8'),
+    ('has_seed', 'u1'),
+    ('ticks_per_beat', '<i4'),
+    ('note_offset', '<i8'),         # チャンク内での最初の音符の位置
+    ('melody_count', '<i4'),
+    ('accompaniment_count', '<i4'),
+])
+
+# 音符の各列（列ごとに連続して格納する）
+_COLUMNS = (('pitch', '<i2'), ('time', '<i4'), ('duration', '<i4'), ('velocity', '<i2'))
+
+@dataclass
+class ArchivedPiece:
+    """
+    アーカイブから取り出した1曲分のデータ。
+
+    Attributes:
+        piece_id (int): アーカイブ内の通し番号。
+        config_hash (str): 生成に使った設定のハッシュ（16進文字列。記録がなければ空文字列）。
+        seed (int or None): 生成に使ったシード。
+        ticks_per_beat (int): 音符データの分解能。
+        melody (numpy.ndarray): メロディーの音符（NOTE_DTYPE）。
+        accompaniment (numpy.ndarray): 伴奏の音符（NOTE_DTYPE）。
+    """
+    piece_id: int
+    config_hash: str
+    seed: object
+    ticks_per_beat: int
+    melody: np.ndarray
+    accompaniment: np.ndarray
+
+    def melody_data(self):
+        return array_to_notes(self.melody)
+
+    def accompaniment_data(self):
+        return array_to_notes(self.accompaniment)
+
+def _require_zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd 圧縮には zstandard パッケージが必要です（pip install zstandard）。") from e
+    return zstandard
+
+@contextmanager
+def _exclusive_lock(path):
+    """アーカイブへの追記を、プロセスをまたいで排他的に行うためのロック（path + '.lock' を使用）。"""
+    with open(path + '.lock', 'a+b') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+        else:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _valid_end(path):
+    """ファイル内で最後まで書き込まれた最後のチャンクの終わりの位置を、チャンクヘッダーをたどって返します。"""
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        position = _FILE_HEADER.size
+        while position + _CHUNK_HEADER.size <= size:
+            f.seek(position)
+            magic, _, _, _, stored_len, _ = _CHUNK_HEADER.unpack(f.read(_CHUNK_HEADER.size))
+            end = position + _CHUNK_HEADER.size + stored_len
+            if magic != CHUNK_MAGIC or end > size:
+                break
+            position = end
+    return position
+
+class NoteArchiveWriter:
+    """
+    ノートアーカイブへ曲を追記するクラス。曲は chunk_size 曲ずつまとめて1チャンクとして書き込みます。
+
+    Example:
+        with NoteArchiveWriter('dataset.mgna', compress=True) as writer:
+            for config in configs:
+                generator = MelodyGenerator(config)
+                generator.generate()
+                generator.save_to_archive(writer)
+    """
+
+    def __init__(self, path, chunk_size=1024, compress=False, compression_level=3):
+        """
+        Args:
+            path (str): アーカイブのファイル名。存在しなければ作成し、存在すれば末尾に追記します。
+            chunk_size (int): 1チャンクにまとめる曲数。
+            compress (bool): チャンクを zstd で圧縮するかどうか（zstandard パッケージが必要）。
+            compression_level (int): zstd の圧縮レベル。
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self._compressor = _require_zstd().ZstdCompressor(level=compression_level) if compress else None
+        self._pieces = []
+        self._notes = []
+
+    def add(self, melody_data, accompaniment_data=None, config_hash='', seed=None, ticks_per_beat=480):
+        """
+        1曲分の音符データを追加します（chunk_size 曲たまるとファイルへ書き込みます）。
+
+        Args:
+            melody_data (list or numpy.ndarray): メロディーの音符データ（辞書のリストまたは NOTE_DTYPE の配列）。
+            accompaniment_data (list or numpy.ndarray, optional): 伴奏の音符データ。
+            config_hash (str): 生成に使った設定のハッシュ（MelodyConfig.config_hash）。
+            seed (int, optional): 生成に使ったシード。
+            ticks_per_beat (int): 音符データの分解能。
+        """
+        melody = melody_data if isinstance(melody_data, np.ndarray) else notes_to_array(melody_data)
+        accompaniment = accompaniment_data if isinstance(accompaniment_data, np.ndarray) \
+            else notes_to_array(accompaniment_data or [])
+        self._pieces.append((bytes.fromhex(config_hash) if config_hash else b'', seed, ticks_per_beat,
+                             len(melody), len(accompaniment)))
+        self._notes.append(melody)
+        self._notes.append(accompaniment)
+        if len(self._pieces) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """たまっている曲を1チャンクとしてファイルの末尾に書き込みます。"""
+        if not self._pieces:
+            return
+        pieces = np.zeros(len(self._pieces), dtype=PIECE_DTYPE)
+        offset = 0
+        for i, (config_hash, seed, ticks_per_beat, melody_count, accompaniment_count) in enumerate(self._pieces):
+            hash_bytes = np.frombuffer(config_hash.ljust(16, b'\0'), dtype=np.uint8)
+            pieces[i] = (hash_bytes, seed or 0, seed is not None, ticks_per_beat, offset, melody_count, accompaniment_count)
+            offset += melody_count + accompaniment_count
+        notes = np.concatenate(self._notes) if self._notes else np.zeros(0, dtype=NOTE_DTYPE)
+        raw = pieces.tobytes() + b''.join(notes[name].astype(dtype).tobytes() for name, dtype in _COLUMNS)
+
+        flags = 0
+        stored = raw
+        if self._compressor is not None:
+            stored = self._compressor.compress(raw)
+            flags |= _FLAG_ZSTD
+        header = _CHUNK_HEADER.pack(CHUNK_MAGIC, flags, len(pieces), len(notes), len(stored), len(raw))
+
+        with _exclusive_lock(self.path):
+            with open(self.path, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(_FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION, 0))
+                else:
+                    # 書き込み途中で落ちたチャンクが末尾に残っていれば、その手前から書き直す
+                    end = _valid_end(self.path)
+                    if end < f.tell():
+                        f.truncate(end)
+                        f.seek(end)
+                f.write(header + stored)
+        self._pieces = []
+        self._notes = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class NoteArchive:
+    """
+    ノートアーカイブを mmap で開き、曲を番号で取り出すクラス。
+
+    Example:
+        with NoteArchive('dataset.mgna') as archive:
+            piece = archive[12345]
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _ = _FILE_HEADER.unpack_from(self._mmap, 0)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"'{path}' はノートアーカイブではありません。")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"未対応のアーカイブのバージョンです: {version}")
+
+        # チャンクヘッダーだけを走査して索引（チャンクの位置と、先頭の曲の番号）を作る
+        self._chunks = []
+        first_piece = [0]
+        position = _FILE_HEADER.size
+        size = len(self._mmap)
+        while position + _CHUNK_HEADER.size <= size:
+            magic, flags, num_pieces, num_notes, stored_len, raw_len = _CHUNK_HEADER.unpack_from(self._mmap, position)
+            body = position + _CHUNK_HEADER.size
+            if magic != CHUNK_MAGIC or body + stored_len > size:
+                break  # 書き込み途中で終わったチャンクは無視する
+            self._chunks.append((body, flags, num_pieces, num_notes, stored_len))
+            first_piece.append(first_piece[-1] + num_pieces)
+            position = body + stored_len
+        self._first_piece = np.asarray(first_piece, dtype=np.int64)
+        self._cached_chunk = (None, None)
+
+    def __len__(self):
+        return int(self._first_piece[-1])
+
+    def _chunk_arrays(self, chunk_index):
+        """チャンクの曲テーブルと各列の配列を返します（圧縮されたチャンクは展開して、直近の1つをキャッシュ）。"""
+        if self._cached_chunk[0] == chunk_index:
+            return self._cached_chunk[1]
+        body, flags, num_pieces, num_notes, stored_len = self._chunks[chunk_index]
+        if flags & _FLAG_ZSTD:
+            buffer = _require_zstd().ZstdDecompressor().decompress(self._mmap[body:body + stored_len])
+            offset = 0
+        else:
+            buffer = self._mmap
+            offset = body
+        pieces = np.frombuffer(buffer, dtype=PIECE_DTYPE, count=num_pieces, offset=offset)
+        offset += pieces.nbytes
+        columns = {}
+        for name, dtype in _COLUMNS:
+            columns[name] = np.frombuffer(buffer, dtype=dtype, count=num_notes, offset=offset)
+            offset += columns[name].nbytes
+        self._cached_chunk = (chunk_index, (pieces, columns))
+        return pieces, columns
+
+    def __getitem__(self, piece_id) -> ArchivedPiece:
+        if piece_id < 0:
+            piece_id += len(self)
+        if not 0 <= piece_id < len(self):
+            raise IndexError(f"曲番号 {piece_id} はアーカイブの範囲外です（曲数: {len(self)}）。")
+        chunk_index = int(np.searchsorted(self._first_piece, piece_id, side='right')) - 1
+        pieces, columns = self._chunk_arrays(chunk_index)
+        piece = pieces[piece_id - self._first_piece[chunk_index]]
+
+        start = int(piece['note_offset'])
+        split = start + int(piece['melody_count'])
+        end = split + int(piece['accompaniment_count'])
+        notes = np.empty(end - start, dtype=NOTE_DTYPE)
+        for name, _ in _COLUMNS:
+            notes[name] = columns[name][start:end]
+        config_hash = piece['config_hash'].tobytes().hex() if piece['config_hash'].any() else ''
+        return ArchivedPiece(
+            piece_id=piece_id,
+            config_hash=config_hash,
+            seed=int(piece['seed']) if piece['has_seed'] else None,
+            ticks_per_beat=int(piece['ticks_per_beat']),
+            melody=notes[:split - start],
+            accompaniment=notes[split - start:],
+        )
+
+    def __iter__(self):
+        for piece_id in range(len(self)):
+            yield self[piece_id]
+
+    def close(self):
+        self._cached_chunk = (None, None)
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# --- MIDIファイルとの相互変換 ---
+
+def archive_to_midi(archive, piece_id, output_filename):
+    """アーカイブの1曲を、メロディーと伴奏の2トラックのMIDIファイルとして書き出します。"""
+    from .midi_utils import create_midi_file
+
+    piece = archive[piece_id]
+    create_midi_file(piece.melody_data(), output_filename, piece.ticks_per_beat, piece.accompaniment_data())
+
+def midi_to_archive(midi_paths, writer):
+    """
+    MIDIファイルをアーカイブに追加します。平均ピッチが最も高いトラックをメロディー、
+    それ以外（ドラムを除く）を伴奏として格納します。
+
+    Args:
+        midi_paths (iterable): MIDIファイルのパスの並び。
+        writer (NoteArchiveWriter): 追記先のライター。
+    """
+    from .midi_reader import DRUM_CHANNEL, find_melody_track, read_midi
+
+    for path in midi_paths:
+        score = read_midi(path)
+        pitched = score.channels != DRUM_CHANNEL
+        is_melody = pitched & (score.tracks == find_melody_track(score))
+        writer.add(score.notes[is_melody], score.notes[pitched & ~is_melody], ticks_per_beat=score.ticks_per_beat)
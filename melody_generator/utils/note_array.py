@@ -0,0 +1,42 @@
+"""
+音符データ（辞書のリスト）と NumPy の構造化配列を相互変換するユーティリティ。
+曲全体の音符をまとめてベクトル演算で処理したい場合に使用します。
+"""
+import numpy as np
+
+# 1音符分のレコード形式
+NOTE_DTYPE = np.dtype([
+    ('pitch', np.int16),
+    ('time', np.int32),
+    ('duration', np.int32),
+    ('velocity', np.int16),
+])
+
+def notes_to_array(notes_data, default_velocity=64):
+    """
+    音符データのリストを構造化配列に変換します。
+
+    Args:
+        notes_data (list): {'pitch', 'time', 'duration'(, 'velocity')} 形式の辞書のリスト。
+        default_velocity (int): 'velocity' キーを持たない音符に設定するベロシティ。
+
+    Returns:
+        numpy.ndarray: NOTE_DTYPE の1次元配列。
+    """
+    array = np.empty(len(notes_data), dtype=NOTE_DTYPE)
+    if len(notes_data):
+        array['pitch'] = [note['pitch'] for note in notes_data]
+        array['time'] = [note['time'] for note in notes_data]
+        array['duration'] = [note['duration'] for note in notes_data]
+        array['velocity'] = [note.get('velocity', default_velocity) for note in notes_data]
+    return array
+
+def array_to_notes(array):
+    """構造化配列を音符データ（辞書）のリストに戻します。"""
+    return [
+        {'pitch': pitch, 'time': time, 'duration': duration, 'velocity': velocity}
+        for pitch, time, duration, velocity in zip(
+            array['pitch'].tolist(), array['time'].tolist(),
+            array['duration'].tolist(), array['velocity'].tolist()
+        )
+    ]
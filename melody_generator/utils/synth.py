@@ -0,0 +1,140 @@
+"""
+生成した音符を外部のDAWなしで試聴するための、簡易ウェーブテーブル・シンセサイザー。
+
+各音色は倍音の振幅から加算合成で作った1周期分の波形テーブルで表し、音符ごとに
+NumPy でまとめて波形を読み出してミックスします。出力は一定長のブロックごとに生成するため、
+曲の長さに関係なくメモリ使用量は一定です。WAVファイルへの書き出しと、メモリ上のPCMバッファの
+両方に対応しています。
+"""
+import wave
+from functools import lru_cache
+
+import numpy as np
+
+# 波形テーブルの長さ（1周期あたりのサンプル数）
+TABLE_SIZE = 2048
+
+# 1ブロックあたりのサンプル数（44.1kHz で約1.5秒）
+DEFAULT_BLOCK_SIZE = 65536
+
+# 音色名 -> (倍音の振幅, アタック秒, リリース秒, 減衰の時定数秒（None なら減衰しない）)
+INSTRUMENTS = {
+    'sine':  ((1.0,), 0.005, 0.05, None),
+    'lead':  ((1.0, 0.5, 0.3, 0.2, 0.1), 0.01, 0.08, None),
+    'organ': ((1.0, 0.8, 0.0, 0.4, 0.0, 0.2), 0.01, 0.05, None),
+    'pad':   ((1.0, 0.3, 0.15), 0.15, 0.3, None),
+    'pluck': ((1.0, 0.6, 0.4, 0.3, 0.2, 0.1), 0.002, 0.05, 0.35),
+}
+
+# ミックス全体にかける音量（複数の音が重なってもクリップしにくい値）
+MASTER_GAIN = 0.35
+
+@lru_cache(maxsize=None)
+def wavetable(instrument):
+    """音色の1周期分の波形テーブルを加算合成で作ります（最大振幅1に正規化、音色ごとにキャッシュ）。"""
+    if instrument not in INSTRUMENTS:
+        raise ValueError(f"音色 '{instrument}' は定義されていません。利用可能な音色: {list(INSTRUMENTS)}")
+    harmonics = INSTRUMENTS[instrument][0]
+    phase = np.arange(TABLE_SIZE) * (2 * np.pi / TABLE_SIZE)
+    table = sum(amp * np.sin((n + 1) * phase) for n, amp in enumerate(harmonics) if amp)
+    return (table / np.max(np.abs(table))).astype(np.float32)
+
+def _prepare_voices(tracks, ticks_per_beat, bpm, sample_rate):
+    """全トラックの音符を、サンプル単位の開始・終了位置や周波数を持つ配列にまとめます。"""
+    seconds_per_tick = 60.0 / (bpm * ticks_per_beat)
+    voices = []
+    for notes_data, instrument in tracks:
+        if not notes_data:
+            continue
+        _, attack, release, decay = INSTRUMENTS[instrument]
+        table = wavetable(instrument)
+        time = np.array([note['time'] for note in notes_data], dtype=np.float64)
+        duration = np.array([note['duration'] for note in notes_data], dtype=np.float64)
+        pitch = np.array([note['pitch'] for note in notes_data], dtype=np.float64)
+        velocity = np.array([note.get('velocity', 64) for note in notes_data], dtype=np.float64)
+
+        start = np.rint(time * seconds_per_tick * sample_rate).astype(np.int64)
+        length = np.maximum(1, np.rint(duration * seconds_per_tick * sample_rate).astype(np.int64))
+        release_samples = max(1, int(release * sample_rate))
+        for i in range(len(notes_data)):
+            voices.append((
+                start[i], length[i], start[i] + length[i] + release_samples,
+                440.0 * 2 ** ((pitch[i] - 69) / 12) * TABLE_SIZE / sample_rate,  # 1サンプルあたりのテーブル位置の進み
+                velocity[i] / 127.0,
+                table, max(1, int(attack * sample_rate)), release_samples,
+                None if decay is None else decay * sample_rate,
+            ))
+    voices.sort(key=lambda voice: voice[0])
+    return voices
+
+def render_blocks(tracks, ticks_per_beat=480, bpm=120, sample_rate=44100, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    トラックの音符をブロックごとにレンダリングして返すジェネレーター。
+
+    Args:
+        tracks (list): (音符データのリスト, 音色名) のタプルのリスト。
+        ticks_per_beat (int): 音符データの1拍あたりのティック数。
+        bpm (float): テンポ。
+        sample_rate (int): サンプリング周波数。
+        block_size (int): 1ブロックのサンプル数。
+
+    Yields:
+        numpy.ndarray: -1.0〜1.0 の float32 のモノラル波形（最後のブロック以外は block_size サンプル）。
+    """
+    for _, instrument in tracks:
+        wavetable(instrument)  # 未知の音色はレンダリング前にエラーにする
+    voices = _prepare_voices(tracks, ticks_per_beat, bpm, sample_rate)
+    total = max((voice[2] for voice in voices), default=0)
+    starts = np.array([voice[0] for voice in voices], dtype=np.int64)
+    active = []  # 現在のブロックで鳴っている可能性のある音
+    next_voice = 0
+
+    for block_start in range(0, total, block_size):
+        block_end = min(block_start + block_size, total)
+        block = np.zeros(block_end - block_start, dtype=np.float32)
+
+        # このブロックで鳴り始める音を加え、鳴り終わった音を除く
+        last = int(np.searchsorted(starts, block_end, side='left'))
+        active.extend(voices[next_voice:last])
+        next_voice = last
+        active = [voice for voice in active if voice[2] > block_start]
+
+        for start, length, end, step, amp, table, attack, release, decay in active:
+            lo, hi = max(start, block_start), min(end, block_end)
+            n = np.arange(lo - start, hi - start, dtype=np.float64)  # 音の頭からのサンプル位置
+            index = (n * step).astype(np.int64) % TABLE_SIZE
+            envelope = np.minimum(1.0, n / attack)
+            envelope *= np.clip((end - start - n) / release, 0.0, 1.0) if hi > start + length else 1.0
+            if decay is not None:
+                envelope *= np.exp(-n / decay)
+            block[lo - block_start:hi - block_start] += (amp * MASTER_GAIN) * table[index] * envelope
+        yield np.tanh(block)  # 音が多く重なった場合も、なめらかに頭打ちにする
+
+def render_pcm(tracks, ticks_per_beat=480, bpm=120, sample_rate=44100, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    トラックの音符を、メモリ上の 16bit PCM バッファとしてレンダリングします。
+
+    Returns:
+        numpy.ndarray: int16 のモノラル波形。
+    """
+    blocks = [_to_int16(block) for block in render_blocks(tracks, ticks_per_beat, bpm, sample_rate, block_size)]
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.int16)
+
+def write_wav(tracks, output_filename, ticks_per_beat=480, bpm=120, sample_rate=44100, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    トラックの音符を 16bit モノラルのWAVファイルに書き出します。ブロックごとに書き込むため、
+    曲全体の波形をメモリに持つことはありません。
+
+    Args:
+        tracks (list): (音符データのリスト, 音色名) のタプルのリスト。
+        output_filename (str): 出力するWAVファイル名。
+    """
+    with wave.open(output_filename, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        for block in render_blocks(tracks, ticks_per_beat, bpm, sample_rate, block_size):
+            wav.writeframes(_to_int16(block).tobytes())
+
+def _to_int16(block):
+    return (block * 32767).astype('<i2')